@@ -1,5 +1,3 @@
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.models import JournalEntry
@@ -7,20 +5,30 @@ from agents.rag_response_agent import generate_rag_response, generate_mood_speci
 from agents.prompts.intent import intent_prompt, intent_with_history_prompt
 from agents.prompts.small_talk import small_talk_prompt
 from agents.prompts.off_topic import off_topic_prompt
+from agents.registry import registry
+from monitoring.metrics import current_intent, timed_stage
 import json
 
-model = OpenAIChat(id="gpt-4o-mini")
+def _is_intent_reply(content: str) -> bool:
+    try:
+        return isinstance(json.loads(content.strip()).get("intent"), str)
+    except (ValueError, AttributeError):
+        return False
 
-intent_agent = Agent(
-    model=model,
+registry.register(
+    "intent",
     description="You are an intent classifier for a psychologist chatbot.",
-    markdown=False
+    markdown=False,
+    cache_ttl=3600,
+    personalized=True,
+    cache_validator=_is_intent_reply,
 )
 
-response_agent = Agent(
-    model=model,
+registry.register(
+    "response",
     description="You are a friendly psychologist chatbot who replies politely and kindly.",
-    markdown=False
+    markdown=False,
+    cache_ttl=24 * 3600
 )
 
 async def get_user_history_context(user_id: str, db: AsyncSession, limit: int = 3) -> str:
@@ -43,30 +51,35 @@ async def get_user_history_context(user_id: str, db: AsyncSession, limit: int =
 def detect_intent(message: str) -> str:
     """Legacy intent detection for backward compatibility"""
     prompt = intent_prompt.format(message=message)
-    response = intent_agent.run(prompt)
+    response = registry.run("intent", prompt)
     return response.content.strip().lower()
 
+@timed_stage("intent_detection")
 async def detect_intent_with_history(message: str, user_id: str, db: AsyncSession) -> dict:
     """Enhanced intent detection with user history context"""
     history_context = await get_user_history_context(user_id, db)
     prompt = intent_with_history_prompt.format(history_context=history_context, message=message)
-    response = intent_agent.run(prompt)
+    response = await registry.arun("intent", prompt)
     try:
-        return json.loads(response.content.strip())
+        intent_data = json.loads(response.content.strip())
     except:
         # Fallback to simple detection
         mood_keywords = ["feel", "mood", "sad", "happy", "angry", "anxious", "depressed", "excited", "worried", "stressed", "upset", "joy", "fear", "love", "hate"]
         is_mood_related = any(word in message.lower() for word in mood_keywords)
-        return {
+        intent_data = {
             "intent": "mood_entry" if is_mood_related else "small_talk",
             "primary_mood": None,
             "confidence": 0.7,
             "reasoning": "fallback keyword detection"
         }
+    # Set before the timed_stage wrapper records, so this stage carries the intent too
+    current_intent.set(intent_data.get("intent", "unknown"))
+    return intent_data
 
-def handle_small_talk(message: str) -> str:
+@timed_stage("small_talk_reply")
+async def handle_small_talk(message: str) -> str:
     """Handle small talk with RAG enhancement"""
-    rag_result = generate_rag_response(
+    rag_result = await generate_rag_response(
         user_message=message,
         user_context="User is engaging in casual conversation",
         use_knowledge_base=True
@@ -74,19 +87,20 @@ def handle_small_talk(message: str) -> str:
     if rag_result["used_knowledge_base"] and rag_result["similarity_score"] > 0.4:
         return rag_result["response"]
     prompt = small_talk_prompt.format(message=message)
-    response = response_agent.run(prompt)
+    response = await registry.arun("response", prompt)
     return response.content.strip()
 
-def handle_off_topic(message: str) -> str:
+@timed_stage("off_topic_reply")
+async def handle_off_topic(message: str) -> str:
     prompt = off_topic_prompt.format(message=message)
-    response = response_agent.run(prompt)
+    response = await registry.arun("response", prompt)
     return response.content.strip()
 
 async def handle_mood_entry_with_rag(message: str, user_id: str, db: AsyncSession, mood: str, sentiment_score: float) -> dict:
     """Handle mood entries with RAG-enhanced responses"""
     history_context = await get_user_history_context(user_id, db)
     
-    rag_result = generate_mood_specific_response(
+    rag_result = await generate_mood_specific_response(
         user_message=message,
         mood=mood,
         sentiment_score=sentiment_score,
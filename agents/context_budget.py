@@ -0,0 +1,251 @@
+"""
+Token budgets for the variable parts of agent prompts.
+
+Agents add their prompt sections (user message, knowledge context, history,
+analytics) to a PromptContext instead of formatting raw strings. Tokens are
+counted locally; each kind of section gets a budget that is shared out over
+its sections and their items (entries, chunks), short ones first so only
+the long ones are cut. If the prompt is still over the total budget, kinds
+are trimmed further in TRIM_ORDER. Tokens saved are logged and exported on
+/metrics.
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Union
+
+PROMPT_TOKEN_BUDGETS = {
+    "user_message": int(os.getenv("PROMPT_BUDGET_USER_MESSAGE", "600")),
+    "knowledge": int(os.getenv("PROMPT_BUDGET_KNOWLEDGE", "700")),
+    "history": int(os.getenv("PROMPT_BUDGET_HISTORY", "500")),
+    "analytics": int(os.getenv("PROMPT_BUDGET_ANALYTICS", "400")),
+}
+PROMPT_TOTAL_BUDGET = int(os.getenv("PROMPT_BUDGET_TOTAL", "2000"))
+# tiktoken encoding for the gpt-4o family; "estimate" skips tiktoken and uses ~4 characters per token
+PROMPT_ENCODING = os.getenv("PROMPT_TOKEN_ENCODING", "o200k_base")
+# Lowest priority first: what gets cut when the whole prompt is over budget
+TRIM_ORDER = ("history", "analytics", "knowledge", "user_message")
+# Items cut below this are dropped rather than kept as a stub
+MIN_ITEM_TOKENS = 12
+ELLIPSIS = " …"
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    """tiktoken if it is installed and its encoding can be loaded, otherwise None"""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        with _encoder_lock:
+            if not _encoder_loaded and PROMPT_ENCODING != "estimate":
+                try:
+                    import tiktoken
+                    _encoder = tiktoken.get_encoding(PROMPT_ENCODING)
+                except Exception as e:
+                    print(f"⚠️ tiktoken unavailable ({e}); estimating prompt tokens from length")
+            _encoder_loaded = True
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    encoder = _get_encoder()
+    if encoder is None:
+        return len(text) // 4 + 1 if text else 0
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, keep_tail: bool = False) -> str:
+    """
+    Cut text to about max_tokens. With keep_tail, the last third of the
+    budget is spent on the end of the text, which for journal entries often
+    carries the point.
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoder = _get_encoder()
+    head_tokens = max_tokens * 2 // 3 if keep_tail else max_tokens
+    tail_tokens = max_tokens - head_tokens
+    if encoder is None:
+        head = text[:head_tokens * 4]
+        tail = text[len(text) - tail_tokens * 4:] if tail_tokens else ""
+    else:
+        tokens = encoder.encode(text, disallowed_special=())
+        head = encoder.decode(tokens[:head_tokens])
+        tail = encoder.decode(tokens[len(tokens) - tail_tokens:]) if tail_tokens else ""
+    # Don't end on half a word
+    head = head.rsplit(" ", 1)[0] if " " in head else head
+    if tail:
+        tail = tail.split(" ", 1)[1] if " " in tail else tail
+        return f"{head}{ELLIPSIS} {tail}"
+    return head + ELLIPSIS
+
+
+def _shares(sizes: Sequence[int], budget: int) -> List[int]:
+    """Split a budget so small parts keep all they need and the rest is shared equally"""
+    allotted = [0] * len(sizes)
+    remaining = budget
+    pending = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    while pending:
+        share = remaining // len(pending)
+        index = pending[0]
+        if sizes[index] > share:
+            # Everything left is at least this big: equal shares
+            for i in pending:
+                allotted[i] = share
+            break
+        allotted[index] = sizes[index]
+        remaining -= sizes[index]
+        pending.pop(0)
+    return allotted
+
+
+def compact(value) -> str:
+    """Render analysis dicts as compact JSON with floats to 2 decimals instead of str() dumps"""
+    def round_floats(v):
+        if isinstance(v, float):
+            return round(v, 2)
+        if isinstance(v, dict):
+            return {k: round_floats(x) for k, x in v.items()}
+        if isinstance(v, (list, tuple)):
+            return [round_floats(x) for x in v]
+        return v
+    return json.dumps(round_floats(value), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class _Section:
+    def __init__(self, name: str, items: List[str], kind: Optional[str], keep_tail: bool, separator: str):
+        self.name = name
+        self.items = items
+        self.kind = kind
+        self.keep_tail = keep_tail
+        self.separator = separator
+        self.sizes = [count_tokens(item) for item in items]
+        self.original_tokens = sum(self.sizes)
+        self.text = separator.join(items)
+
+    def fit(self, budget: int) -> int:
+        """Cut items to fit the budget, dropping trailing ones that would be stubs; returns tokens used"""
+        # Too many items for the budget: keep the leading ones at a useful length
+        count = len(self.items)
+        while count > 1 and sum(self.sizes[:count]) > budget and budget // count < MIN_ITEM_TOKENS:
+            count -= 1
+        fitted = []
+        used = 0
+        for item, size, share in zip(self.items[:count], self.sizes[:count], _shares(self.sizes[:count], budget)):
+            if share >= size:
+                fitted.append(item)
+                used += size
+            elif share >= MIN_ITEM_TOKENS:
+                fitted.append(truncate_tokens(item, share, keep_tail=self.keep_tail))
+                used += share
+        self.text = self.separator.join(fitted)
+        return used
+
+
+class PromptContext:
+    """
+    Collects the sections of one prompt and fits them to their budgets.
+
+        context = PromptContext("progress")
+        context.add("formatted", entry_lines, kind="history")
+        context.add("trend_analysis", compact(trends), kind="analytics")
+        prompt = enhanced_progress_prompt.format(**context.build())
+
+    Items of a section are listed most important first; when an item would
+    be cut below MIN_ITEM_TOKENS it is dropped instead. Sections added with
+    kind=None are never trimmed but count towards the total.
+    """
+
+    def __init__(
+        self,
+        agent: str,
+        budgets: Optional[Dict[str, int]] = None,
+        total_budget: int = PROMPT_TOTAL_BUDGET,
+    ):
+        self.agent = agent
+        self.budgets = dict(PROMPT_TOKEN_BUDGETS)
+        self.budgets.update(budgets or {})
+        self.total_budget = total_budget
+        self.sections: List[_Section] = []
+
+    def add(
+        self,
+        name: str,
+        content: Union[str, Sequence[str]],
+        kind: Optional[str] = None,
+        keep_tail: bool = False,
+        separator: str = "\n",
+    ) -> "PromptContext":
+        items = [content] if isinstance(content, str) else [item for item in content if item]
+        self.sections.append(_Section(name, items, kind, keep_tail, separator))
+        return self
+
+    def _fit_kind(self, kind: str, budget: int) -> int:
+        sections = [s for s in self.sections if s.kind == kind]
+        shares = _shares([s.original_tokens for s in sections], budget)
+        return sum(section.fit(share) for section, share in zip(sections, shares))
+
+    def build(self) -> Dict[str, str]:
+        """Section texts by name, ready for str.format"""
+        before = sum(s.original_tokens for s in self.sections)
+        used = {None: sum(s.original_tokens for s in self.sections if s.kind is None)}
+        for kind in {s.kind for s in self.sections if s.kind is not None}:
+            used[kind] = self._fit_kind(kind, self.budgets.get(kind, self.total_budget))
+
+        excess = sum(used.values()) - self.total_budget
+        for kind in TRIM_ORDER:
+            if excess <= 0:
+                break
+            if used.get(kind):
+                trimmed = self._fit_kind(kind, max(used[kind] - excess, 0))
+                excess -= used[kind] - trimmed
+                used[kind] = trimmed
+
+        after = sum(used.values())
+        prompt_budget_stats.record(self.agent, before, after)
+        if after < before:
+            cut = ", ".join(
+                f"{s.name} {s.original_tokens}→{count_tokens(s.text)}"
+                for s in self.sections if s.text != s.separator.join(s.items)
+            )
+            print(f"✂️ {self.agent} prompt context {before} → {after} tokens ({cut})")
+        return {s.name: s.text for s in self.sections}
+
+
+class PromptBudgetStats:
+    """Context tokens before and after budgeting, per agent"""
+
+    def __init__(self):
+        self._totals: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, before: int, after: int):
+        with self._lock:
+            totals = self._totals.setdefault(agent, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += before
+            totals[2] += after
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                agent: {"prompts": t[0], "tokens_before": t[1], "tokens_after": t[2], "tokens_saved": t[1] - t[2]}
+                for agent, t in self._totals.items()
+            }
+
+    def render(self) -> List[str]:
+        lines = [
+            "# HELP coach_prompt_context_tokens_total Variable prompt context tokens, before and after budgeting",
+            "# TYPE coach_prompt_context_tokens_total counter",
+        ]
+        for agent, stats in sorted(self.snapshot().items()):
+            lines.append(f'coach_prompt_context_tokens_total{{agent="{agent}",stage="before"}} {stats["tokens_before"]}')
+            lines.append(f'coach_prompt_context_tokens_total{{agent="{agent}",stage="after"}} {stats["tokens_after"]}')
+        return lines
+
+
+prompt_budget_stats = PromptBudgetStats()
@@ -0,0 +1,245 @@
+"""
+Content-addressed cache of LLM responses shared by every worker on a host.
+
+Responses are stored in a local SQLite file in WAL mode, keyed by a hash of
+(model, agent description, markdown flag, rendered prompt). Agents opt in
+through registry.register(cache_ttl=...) and agents registered as
+personalized are skipped unless LLM_CACHE_PERSONALIZED is set.
+
+Filling is single-flight across processes: the first caller to miss takes a
+lease row for the key and calls the model, while other callers, in this or
+any other worker, poll for the stored response. A lease left behind by a
+crashed worker expires after LLM_CACHE_LEASE_SECONDS.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LLM_CACHE_ENABLED = _env_bool("LLM_CACHE_ENABLED", True)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(project_root, "llm_cache.db"))
+LLM_CACHE_PERSONALIZED = _env_bool("LLM_CACHE_PERSONALIZED", False)
+# Longest a filler may take before others stop waiting and try themselves
+LLM_CACHE_LEASE_SECONDS = float(os.getenv("LLM_CACHE_LEASE_SECONDS", "90"))
+LLM_CACHE_POLL_SECONDS = float(os.getenv("LLM_CACHE_POLL_SECONDS", "0.05"))
+
+
+class CachedResponse:
+    """Stands in for an agno run response on a cache hit"""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.metrics = None
+        self.cached = True
+
+
+def cache_key(model_id: str, description: str, markdown: Optional[bool], prompt: str) -> str:
+    payload = json.dumps([model_id, description, markdown, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, path: str = LLM_CACHE_PATH, lease_seconds: float = LLM_CACHE_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._schema_ready = False
+        # In-process single flight: one task per key talks to SQLite and the model
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self._counts_lock = threading.Lock()
+
+    def _after_fork(self):
+        """A forked worker gets its own lease owner, connections and in-flight calls"""
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._inflight = {}
+        self.counts = {}
+        self._counts_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that opened them
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._schema_ready:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY, agent TEXT NOT NULL, content TEXT NOT NULL,"
+                    " created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS leases ("
+                    " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def _count(self, agent: str, result: str):
+        with self._counts_lock:
+            counts = self.counts.setdefault(agent, {"hit": 0, "miss": 0, "coalesced": 0, "error": 0, "rejected": 0})
+            counts[result] += 1
+
+    # --- blocking SQLite operations, run in a thread ---------------------------
+
+    def _lookup(self, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT content FROM responses WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _try_lease(self, key: str) -> bool:
+        """Take the fill lease for a key unless a live one is held elsewhere"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+            " WHERE leases.expires_at <= ?",
+            (key, self.owner, now + self.lease_seconds, now),
+        )
+        row = conn.execute("SELECT owner FROM leases WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] == self.owner
+
+    def _store(self, key: str, agent: str, content: str, ttl: float):
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, agent, content, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, agent, content, now, now + ttl),
+            )
+            conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _release(self, key: str):
+        self._connection().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        conn = self._connection()
+        removed = conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+        conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counts_lock:
+            counts = {agent: dict(c) for agent, c in sorted(self.counts.items())}
+        return {"path": self.path, "enabled": LLM_CACHE_ENABLED, "agents": counts}
+
+    # --- async API ---------------------------------------------------------------
+
+    async def get_or_call(
+        self,
+        agent: str,
+        key: str,
+        ttl: float,
+        call: Callable[[], Awaitable[Any]],
+        validate: Optional[Callable[[str], bool]] = None,
+    ):
+        """
+        The cached response for key, or call() once across all workers and cache
+        its content. Content that `validate` rejects is returned but not stored.
+        """
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._count(agent, "coalesced")
+            return CachedResponse(await asyncio.shield(inflight))
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response, content = await self._fill(agent, key, ttl, call, validate)
+            future.set_result(content)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't let the loop warn about an unread exception
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _fill(
+        self,
+        agent: str,
+        key: str,
+        ttl: float,
+        call: Callable[[], Awaitable[Any]],
+        validate: Optional[Callable[[str], bool]] = None,
+    ):
+        waited = False
+        while True:
+            try:
+                content = await asyncio.to_thread(self._lookup, key)
+                if content is not None:
+                    self._count(agent, "coalesced" if waited else "hit")
+                    return CachedResponse(content), content
+                leased = await asyncio.to_thread(self._try_lease, key)
+            except sqlite3.Error as e:
+                # A broken cache must never take the agent down with it
+                print(f"⚠️ LLM cache unavailable ({e}); calling {agent} directly")
+                self._count(agent, "error")
+                response = await call()
+                return response, getattr(response, "content", str(response))
+
+            if leased:
+                break
+            # Another worker is filling this key
+            waited = True
+            await asyncio.sleep(LLM_CACHE_POLL_SECONDS)
+
+        self._count(agent, "miss")
+        try:
+            response = await call()
+        except BaseException:
+            # Let the next caller take over rather than wait out the lease
+            try:
+                await asyncio.to_thread(self._release, key)
+            except sqlite3.Error:
+                pass
+            raise
+        content = response.content if hasattr(response, "content") else str(response)
+        if validate is not None and not validate(content):
+            # A malformed reply would otherwise be served until the TTL runs out
+            self._count(agent, "rejected")
+            try:
+                await asyncio.to_thread(self._release, key)
+            except sqlite3.Error:
+                pass
+            return response, content
+        try:
+            await asyncio.to_thread(self._store, key, agent, content, ttl)
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not store {agent} response in the LLM cache: {e}")
+        return response, content
+
+
+llm_cache = LLMResponseCache()
+os.register_at_fork(after_in_child=llm_cache._after_fork)
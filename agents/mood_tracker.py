@@ -1,21 +1,152 @@
 import os
 import json
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
-from agents.prompts.mood import mood_analysis_prompt
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from agents.prompts.mood import mood_analysis_prompt, batch_mood_analysis_prompt
+from agents.registry import registry
+from monitoring.metrics import timed_stage
 
-model = OpenAIChat(id="gpt-4o-mini")
+MOOD_BATCH_MAX_ENTRIES = int(os.getenv("MOOD_BATCH_MAX_ENTRIES", "25"))
+MOOD_BATCH_TOKEN_BUDGET = int(os.getenv("MOOD_BATCH_TOKEN_BUDGET", "3000"))
+MOOD_BATCH_RETRIES = int(os.getenv("MOOD_BATCH_RETRIES", "2"))
 
-agent = Agent(
-    model=model,
+NEUTRAL_MOOD = {"mood": "neutral", "sentiment_score": 0.0}
+
+def _parse_mood(content: str) -> Optional[dict]:
+    try:
+        return _validate_item(json.loads(content.strip()))
+    except ValueError:
+        return None
+
+registry.register(
+    "mood",
     description="You are a mood analyzer. Return a JSON with 'mood' and 'sentiment_score' (-1 to 1).",
+    markdown=False,
+    cache_ttl=7 * 24 * 3600,
+    cache_validator=lambda content: _parse_mood(content) is not None,
+)
+
+registry.register(
+    "mood_batch",
+    description="You are a mood analyzer. Return a JSON array with 'id', 'mood' and 'sentiment_score' (-1 to 1) for every entry.",
     markdown=False
 )
 
-def analyze_mood(text: str) -> dict:
+@timed_stage("mood_analysis")
+async def analyze_mood(text: str) -> dict:
     prompt = mood_analysis_prompt.format(entry=text)
-    response = agent.run(prompt)
+    response = await registry.arun("mood", prompt)
     try:
         return json.loads(response.content.strip())
     except Exception:
-        return {"mood": "neutral", "sentiment_score": 0.0}
+        return dict(NEUTRAL_MOOD)
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token for English)"""
+    return len(text) // 4 + 1
+
+def pack_batches(
+    items: List[Tuple[str, str]],
+    max_entries: int = MOOD_BATCH_MAX_ENTRIES,
+    token_budget: int = MOOD_BATCH_TOKEN_BUDGET,
+) -> List[List[Tuple[str, str]]]:
+    """Greedily group (id, text) pairs so each batch stays under both limits"""
+    batches, current, current_tokens = [], [], 0
+    for item_id, text in items:
+        # id, quotes and JSON punctuation cost a few tokens per entry
+        tokens = estimate_tokens(text) + estimate_tokens(item_id) + 8
+        if current and (len(current) >= max_entries or current_tokens + tokens > token_budget):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append((item_id, text))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def _validate_item(item) -> Optional[dict]:
+    if not isinstance(item, dict):
+        return None
+    mood, score = item.get("mood"), item.get("sentiment_score")
+    if not isinstance(mood, str) or not mood.strip():
+        return None
+    try:
+        score = float(score)
+    except (TypeError, ValueError):
+        return None
+    if not -1.0 <= score <= 1.0:
+        return None
+    return {"mood": mood.strip().lower(), "sentiment_score": score}
+
+async def _analyze_one_batch(batch: List[Tuple[str, str]]) -> Dict[str, dict]:
+    """One LLM call; returns only the items that came back valid"""
+    entries = json.dumps([{"id": item_id, "text": text} for item_id, text in batch], ensure_ascii=False)
+    response = await registry.arun("mood_batch", batch_mood_analysis_prompt.format(entries=entries))
+    content = response.content.strip() if hasattr(response, "content") else str(response)
+    if content.startswith("```"):
+        content = content.strip("`").removeprefix("json").strip()
+    try:
+        parsed = json.loads(content)
+    except ValueError:
+        return {}
+    if isinstance(parsed, dict):
+        parsed = parsed.get("results") or parsed.get("entries") or []
+
+    wanted = {item_id for item_id, _ in batch}
+    results = {}
+    for item in parsed if isinstance(parsed, list) else []:
+        item_id = str(item.get("id")) if isinstance(item, dict) else None
+        valid = _validate_item(item)
+        if item_id in wanted and valid is not None:
+            results[item_id] = valid
+    return results
+
+@timed_stage("mood_analysis_batch")
+async def analyze_mood_batch(
+    items: List[Tuple[str, str]],
+    max_entries: int = MOOD_BATCH_MAX_ENTRIES,
+    token_budget: int = MOOD_BATCH_TOKEN_BUDGET,
+    retries: int = MOOD_BATCH_RETRIES,
+    fallback: bool = True,
+) -> Dict[str, dict]:
+    """
+    Analyse many (id, text) entries with as few LLM calls as possible.
+
+    Entries are packed into batches bounded by `max_entries` and a token
+    budget. Each returned item is validated on its own; items that are
+    missing or malformed are re-batched and retried up to `retries` times,
+    then fall back to a neutral mood like analyze_mood does (with
+    `fallback=False` they are left out of the result instead). A batch call
+    that raises (provider or network error) is retried the same way, but
+    its error is re-raised if it still fails on the last attempt.
+
+    Returns:
+        Mapping of id to {"mood", "sentiment_score"} for every input id,
+        or only the ids that were analysed when `fallback` is False
+    """
+    texts = dict(items)
+    results: Dict[str, dict] = {}
+    pending = list(texts.items())
+    error: Optional[BaseException] = None
+
+    for _ in range(retries + 1):
+        if not pending:
+            break
+        batches = pack_batches(pending, max_entries, token_budget)
+        outcomes = await asyncio.gather(*(_analyze_one_batch(b) for b in batches), return_exceptions=True)
+        error = None
+        for outcome in outcomes:
+            if isinstance(outcome, dict):
+                results.update(outcome)
+            elif isinstance(outcome, Exception):
+                error = outcome
+            else:
+                # Cancellation and the like are not the batch's fault; don't swallow them
+                raise outcome
+        pending = [(item_id, texts[item_id]) for item_id, _ in pending if item_id not in results]
+
+    if pending and error is not None:
+        raise error
+    for item_id, _ in pending if fallback else []:
+        results[item_id] = dict(NEUTRAL_MOOD)
+    return results
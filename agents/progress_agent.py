@@ -1,65 +1,140 @@
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
-from db.crud import get_last_journal_entries, get_user_entries_for_analysis
+import calendar
+import hashlib
+import os
+import numpy as np
+from db.crud import (
+    get_daily_mood,
+    get_last_journal_entries,
+    get_latest_entry_at,
+    get_progress_report,
+    get_user_entry_features,
+    save_progress_report,
+)
+from agents.context_budget import PromptContext, compact
 from agents.prompts.progress import enhanced_progress_prompt
 from collections import defaultdict, Counter
+from operator import attrgetter
 from datetime import datetime, timedelta
 import re
 from typing import Dict, List, Tuple, Optional
 from agents.prompts.progress import description_prompt
+from agents.registry import registry
+from db.features import aggregate_triggers
+from db.rollups import range_start
+from monitoring.metrics import timed_stage
+
+# Entries analysed per summary, newest first; 0 analyses the whole history
+PROGRESS_ANALYSIS_LIMIT = int(os.getenv("PROGRESS_ANALYSIS_LIMIT", "20"))
+# Stored reports (scripts/generate_progress_reports.py) are served while younger than this
+PROGRESS_REPORT_MAX_AGE_HOURS = float(os.getenv("PROGRESS_REPORT_MAX_AGE_HOURS", "36"))
 
-model = OpenAIChat(id="gpt-4o-mini")
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
 
-agent = Agent(
-    model=model,
-    description=description_prompt
+registry.register(
+    "progress",
+    description=description_prompt,
+    markdown=None,
+    personalized=True
 )
 
-def analyze_mood_by_day_of_week(entries: List) -> Dict[str, Dict]:
+class MoodSeries:
+    """
+    A user's entries as contiguous numpy arrays, in the order given.
+
+    Built once per request so every analysis below is a handful of array
+    operations instead of a Python loop over entries.
+    """
+
+    def __init__(self, entries: List):
+        self.n = len(entries)
+        columns = attrgetter("sentiment_score", "timestamp", "weekday", "mood", "trigger_tags")
+        if self.n:
+            sentiments, timestamps, weekdays, moods, self.trigger_tags = zip(*map(columns, entries))
+        else:
+            sentiments = timestamps = weekdays = moods = self.trigger_tags = ()
+
+        self.sentiments = np.array(sentiments, dtype=np.float64)
+        # Integer microseconds since the epoch order exactly like the datetimes
+        self.timestamps = np.fromiter(
+            ((t - _EPOCH) // _MICROSECOND for t in timestamps), dtype=np.int64, count=self.n
+        )
+        self.weekdays = np.fromiter(
+            (w if w is not None else t.weekday() for w, t in zip(weekdays, timestamps)),
+            dtype=np.int64,
+            count=self.n,
+        )
+        # Moods as integer codes in order of first appearance
+        codes: Dict[str, int] = {}
+        self.mood_codes = np.fromiter(
+            (codes.setdefault(m, len(codes)) for m in moods), dtype=np.int64, count=self.n
+        )
+        self.mood_labels: List[str] = list(codes)
+
+    def __len__(self) -> int:
+        return self.n
+
+
+def _as_series(entries) -> MoodSeries:
+    return entries if isinstance(entries, MoodSeries) else MoodSeries(entries)
+
+
+def _sequential_sum(values: np.ndarray) -> float:
+    """Left-to-right sum, bit-identical to Python's sum() (np.sum pairs terms up)"""
+    return float(np.cumsum(values)[-1]) if len(values) else 0.0
+
+
+def analyze_mood_by_day_of_week(entries) -> Dict[str, Dict]:
     """Analyze mood patterns by day of the week"""
-    day_moods = defaultdict(list)
-    day_sentiments = defaultdict(list)
-    
-    for entry in entries:
-        day_name = entry.timestamp.strftime('%A')  # Monday, Tuesday, etc.
-        day_moods[day_name].append(entry.mood)
-        day_sentiments[day_name].append(entry.sentiment_score)
-    
+    series = _as_series(entries)
+    n = series.n
+    if n == 0:
+        return {}
+
+    day_counts = np.bincount(series.weekdays, minlength=7)
+    # bincount accumulates weights in input order, like sum() over each day's list
+    day_sums = np.bincount(series.weekdays, weights=series.sentiments, minlength=7)
+
+    # Most common mood per day; ties go to the mood seen first on that day, as Counter does
+    mood_count = len(series.mood_labels)
+    pairs = series.weekdays * mood_count + series.mood_codes
+    pair_counts = np.bincount(pairs, minlength=7 * mood_count).reshape(7, mood_count)
+    first_seen = np.full(7 * mood_count, n, dtype=np.int64)
+    np.minimum.at(first_seen, pairs, np.arange(n))
+    ranking = pair_counts * (n + 1) + (n - first_seen.reshape(7, mood_count))
+    best_moods = ranking.argmax(axis=1)
+
+    # Days are reported in order of first appearance
+    day_first_seen = np.full(7, n, dtype=np.int64)
+    np.minimum.at(day_first_seen, series.weekdays, np.arange(n))
+
     analysis = {}
-    for day, moods in day_moods.items():
-        if len(moods) >= 2:  # Only analyze if we have at least 2 entries for that day
-            avg_sentiment = sum(day_sentiments[day]) / len(day_sentiments[day])
-            most_common_mood = Counter(moods).most_common(1)[0][0]
-            analysis[day] = {
-                'avg_sentiment': avg_sentiment,
-                'most_common_mood': most_common_mood,
-                'entry_count': len(moods)
+    for day in np.argsort(day_first_seen, kind="stable"):
+        if day_counts[day] >= 2:  # Only analyze if we have at least 2 entries for that day
+            analysis[calendar.day_name[day]] = {
+                'avg_sentiment': float(day_sums[day] / day_counts[day]),
+                'most_common_mood': series.mood_labels[best_moods[day]],
+                'entry_count': int(day_counts[day])
             }
-    
+
     return analysis
 
-def analyze_mood_trends(entries: List, window_size: int = 7) -> Dict:
+def analyze_mood_trends(entries, window_size: int = 7) -> Dict:
     """Analyze mood trends over time using sliding window"""
-    if len(entries) < window_size:
+    series = _as_series(entries)
+    # The moving average needs at least two windows
+    if series.n < window_size or series.n - window_size + 1 < 2:
         return {"trend": "insufficient_data", "direction": "stable"}
-    
-    # Sort entries by timestamp (oldest first)
-    sorted_entries = sorted(entries, key=lambda x: x.timestamp)
-    
-    # Calculate moving average
-    sentiments = [e.sentiment_score for e in sorted_entries]
-    moving_avg = []
-    
-    for i in range(len(sentiments) - window_size + 1):
-        window_avg = sum(sentiments[i:i+window_size]) / window_size
-        moving_avg.append(window_avg)
-    
-    if len(moving_avg) < 2:
-        return {"trend": "insufficient_data", "direction": "stable"}
-    
-    # Determine trend direction
-    first_avg = moving_avg[0]
-    last_avg = moving_avg[-1]
+
+    # Sort by timestamp (oldest first); stable like sorted()
+    sentiments = series.sentiments[np.argsort(series.timestamps, kind="stable")]
+
+    # Only the first and last windows of the moving average decide the trend
+    first_avg = _sequential_sum(sentiments[:window_size]) / window_size
+    last_avg = _sequential_sum(sentiments[-window_size:]) / window_size
+    return _trend_result(first_avg, last_avg)
+
+def _trend_result(first_avg: float, last_avg: float) -> Dict:
     change = last_avg - first_avg
     
     if change > 0.1:
@@ -77,26 +152,7 @@ def analyze_mood_trends(entries: List, window_size: int = 7) -> Dict:
         "last_avg": last_avg
     }
 
-def detect_triggers(entries: List) -> Dict:
-    """Detect common themes and triggers in journal entries"""
-    # Common emotional triggers and themes
-    trigger_keywords = {
-        'work_stress': ['work', 'job', 'boss', 'deadline', 'meeting', 'office', 'colleague'],
-        'relationship': ['partner', 'boyfriend', 'girlfriend', 'husband', 'wife', 'friend', 'family'],
-        'health': ['sick', 'pain', 'doctor', 'medicine', 'sleep', 'exercise', 'diet'],
-        'financial': ['money', 'bills', 'expenses', 'budget', 'debt', 'salary'],
-        'social': ['party', 'social', 'lonely', 'people', 'crowd', 'conversation'],
-        'personal_goals': ['goal', 'achievement', 'success', 'failure', 'progress', 'plan']
-    }
-    
-    all_text = ' '.join([entry.text.lower() for entry in entries])
-    trigger_counts = {}
-    
-    for trigger_type, keywords in trigger_keywords.items():
-        count = sum(1 for keyword in keywords if keyword in all_text)
-        if count > 0:
-            trigger_counts[trigger_type] = count
-    
+def _summarize_triggers(trigger_counts: Dict[str, int], total_entries: int) -> Dict:
     # Find most frequent triggers
     most_frequent = []
     if trigger_counts:
@@ -106,22 +162,34 @@ def detect_triggers(entries: List) -> Dict:
     return {
         "detected_triggers": trigger_counts,
         "most_frequent": most_frequent,
-        "total_entries_analyzed": len(entries)
+        "total_entries_analyzed": total_entries
     }
 
-def calculate_overall_mood_direction(entries: List) -> Dict:
+def detect_triggers(entries) -> Dict:
+    """Detect common themes and triggers in journal entries from their stored trigger tags"""
+    return _summarize_triggers(aggregate_triggers(_as_series(entries).trigger_tags), len(entries))
+
+def calculate_overall_mood_direction(entries) -> Dict:
     """Calculate overall mood direction and stability"""
-    if len(entries) < 3:
+    series = _as_series(entries)
+    n = series.n
+    if n < 3:
         return {"direction": "insufficient_data", "stability": "unknown"}
     
-    sentiments = [e.sentiment_score for e in entries]
+    sentiments = series.sentiments
     
-    # Calculate trend
-    first_third = sum(sentiments[:len(sentiments)//3]) / (len(sentiments)//3)
-    last_third = sum(sentiments[-len(sentiments)//3:]) / (len(sentiments)//3)
+    # Calculate trend; the last slice is ceil(n/3) long but divided by n//3, as it always was
+    first_third = _sequential_sum(sentiments[:n // 3]) / (n // 3)
+    last_third = _sequential_sum(sentiments[-n // 3:]) / (n // 3)
     
-    change = last_third - first_third
+    # Calculate stability (variance). numpy squares with correct rounding where
+    # Python's ** went through libm pow, so this can differ in the last bit.
+    mean_sentiment = _sequential_sum(sentiments) / n
+    variance = _sequential_sum((sentiments - mean_sentiment) ** 2) / n
     
+    return _direction_result(last_third - first_third, variance)
+
+def _direction_result(change: float, variance: float) -> Dict:
     if change > 0.15:
         direction = "significantly_improving"
     elif change > 0.05:
@@ -133,10 +201,6 @@ def calculate_overall_mood_direction(entries: List) -> Dict:
     else:
         direction = "stable"
     
-    # Calculate stability (variance)
-    mean_sentiment = sum(sentiments) / len(sentiments)
-    variance = sum((s - mean_sentiment) ** 2 for s in sentiments) / len(sentiments)
-    
     if variance < 0.1:
         stability = "very_stable"
     elif variance < 0.25:
@@ -151,43 +215,169 @@ def calculate_overall_mood_direction(entries: List) -> Dict:
         "variance": variance
     }
 
-async def get_progress_summary(db, user_id: str):
-    """Enhanced progress summary with deeper personalization"""
-    # Get more entries for comprehensive analysis
-    entries = await get_user_entries_for_analysis(db, user_id=user_id, limit=20)
+def analyze_daily_rollups(days: List, window_size: int = 7) -> Dict:
+    """
+    The same analyses from daily_user_mood rows (oldest first) instead of entries.
+
+    Day-of-week, trigger and variance figures are entry-weighted and match
+    the per-entry analyses up to rounding. Individual entries are not kept in
+    the rollup, so the trend compares the first and last `window_size` days'
+    average sentiment, shrinking the window to half the days on short or
+    sparse ranges so they still report one, and the direction compares the
+    oldest third of the days with the newest third.
+    """
+    counts = np.array([d.entry_count for d in days], dtype=np.float64)
+    sums = np.array([d.sentiment_sum for d in days], dtype=np.float64)
+    square_sums = np.array([d.sentiment_sq_sum for d in days], dtype=np.float64)
+    weekdays = np.array([d.day.weekday() for d in days], dtype=np.int64)
+    total = counts.sum()
+
+    # Day-of-week patterns, days listed newest first like the entry-based analysis
+    day_counts = np.bincount(weekdays, weights=counts, minlength=7)
+    day_sums = np.bincount(weekdays, weights=sums, minlength=7)
+    day_moods: Dict[int, Counter] = {}
+    for day in reversed(days):
+        day_moods.setdefault(day.day.weekday(), Counter()).update(day.mood_counts)
+    day_patterns = {
+        calendar.day_name[weekday]: {
+            'avg_sentiment': float(day_sums[weekday] / day_counts[weekday]),
+            'most_common_mood': moods.most_common(1)[0][0],
+            'entry_count': int(day_counts[weekday])
+        }
+        for weekday, moods in day_moods.items()
+        if day_counts[weekday] >= 2
+    }
+
+    # Trend over daily averages; the two windows never overlap, so a 7d range
+    # compares 3 days with 3 days and two days are the minimum
+    window = min(window_size, len(days) // 2)
+    if window < 1:
+        trend_analysis = {"trend": "insufficient_data", "direction": "stable"}
+    else:
+        daily_means = sums / counts
+        trend_analysis = _trend_result(
+            float(daily_means[:window].mean()), float(daily_means[-window:].mean())
+        )
+        trend_analysis["window_days"] = window
+
+    trigger_counts = aggregate_triggers(d.trigger_counts for d in days)
+    trigger_analysis = _summarize_triggers(trigger_counts, int(total))
+
+    # Direction: first vs last third of the days, weighted by entries
+    if total < 3 or len(days) < 3:
+        mood_direction = {"direction": "insufficient_data", "stability": "unknown"}
+    else:
+        third = len(days) // 3
+        first_third = sums[:third].sum() / counts[:third].sum()
+        last_third = sums[-third:].sum() / counts[-third:].sum()
+        mean_sentiment = sums.sum() / total
+        # Population variance from the sum of squares, as the entry analysis computes it
+        variance = max(float(square_sums.sum() / total - mean_sentiment ** 2), 0.0)
+        mood_direction = _direction_result(float(last_third - first_third), variance)
+
+    return {
+        "day_patterns": day_patterns,
+        "trend_analysis": trend_analysis,
+        "trigger_analysis": trigger_analysis,
+        "mood_direction": mood_direction,
+        "total_entries": int(total)
+    }
+
+@timed_stage("progress")
+async def get_progress_summary(
+    db,
+    user_id: str,
+    before: Optional[datetime] = None,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = PROGRESS_ANALYSIS_LIMIT,
+):
+    """
+    Enhanced progress summary with deeper personalization.
+
+    Analyses the newest `limit` entries (all of them when 0 or None) between
+    `since` and `before`; `before` is also how past summaries are recomputed.
+    """
+    # Get more entries for comprehensive analysis: feature rows only, text is
+    # loaded just for the entries quoted to the LLM
+    entries = await get_user_entry_features(db, user_id=user_id, limit=limit or None, before=before, since=since)
     
     if not entries:
         return {"summary": None, "score": None, "patterns": None}
     
-    # Perform various analyses
-    day_patterns = analyze_mood_by_day_of_week(entries)
-    trend_analysis = analyze_mood_trends(entries)
-    trigger_analysis = detect_triggers(entries)
-    mood_direction = calculate_overall_mood_direction(entries)
-    
-    # Prepare recent entries for LLM analysis
-    recent_entries = entries[:5]  # Last 5 entries for immediate context
-    formatted_recent = "\n".join(f"- {e.text} (Mood: {e.mood}, Score: {e.sentiment_score:.2f})" for e in recent_entries)
-    
-    # Create comprehensive analysis context
+    # Perform various analyses over one set of arrays
+    series = MoodSeries(entries)
     analysis_context = {
-        "day_patterns": day_patterns,
-        "trend_analysis": trend_analysis,
-        "trigger_analysis": trigger_analysis,
-        "mood_direction": mood_direction,
+        "day_patterns": analyze_mood_by_day_of_week(series),
+        "trend_analysis": analyze_mood_trends(series),
+        "trigger_analysis": detect_triggers(series),
+        "mood_direction": calculate_overall_mood_direction(series),
         "total_entries": len(entries)
     }
+    return await _summarize_progress(db, user_id, analysis_context, before=before, since=since)
+
+def progress_report_version() -> str:
+    """Stamp for stored reports; changes with the model, the prompts or the analysis window"""
+    prompts = hashlib.sha1((description_prompt + enhanced_progress_prompt).encode()).hexdigest()[:10]
+    return f"{registry.specs['progress'].model_id}:{prompts}:{PROGRESS_ANALYSIS_LIMIT}"
+
+async def generate_progress_report(db, user_id: str):
+    """Generate a live summary and store it as the user's report"""
+    result = await get_progress_summary(db, user_id)
+    if result["summary"] is not None:
+        await save_progress_report(db, user_id, progress_report_version(), result)
+        await db.commit()
+    return result
+
+async def get_stored_progress_summary(db, user_id: str):
+    """The user's stored report when it is fresh, current and covers every entry, otherwise one generated live"""
+    report = await get_progress_report(db, user_id)
+    if (
+        report is not None
+        and report.version == progress_report_version()
+        and report.generated_at >= datetime.utcnow() - timedelta(hours=PROGRESS_REPORT_MAX_AGE_HOURS)
+    ):
+        # Entries written since the report was generated would be missing from it
+        latest = await get_latest_entry_at(db, user_id, since=report.generated_at)
+        if latest is None or latest <= report.generated_at:
+            return {"summary": report.summary, "score": report.score, "patterns": report.patterns}
+    return await generate_progress_report(db, user_id)
+
+@timed_stage("progress")
+async def get_progress_summary_for_range(db, user_id: str, range_name: str):
+    """Progress summary for a time range (see db.rollups.RANGE_DAYS), analysed from daily rollups"""
+    since = range_start(range_name)
+    days = await get_daily_mood(db, user_id, since=since)
     
-    # Format the enhanced prompt
-    formatted_prompt = enhanced_progress_prompt.format(
-        formatted=formatted_recent,
-        day_patterns=str(day_patterns),
-        trend_analysis=str(trend_analysis),
-        trigger_analysis=str(trigger_analysis),
-        mood_direction=str(mood_direction)
+    if not days:
+        return {"summary": None, "score": None, "patterns": None}
+    
+    analysis_context = analyze_daily_rollups(days)
+    since_at = datetime.combine(since, datetime.min.time()) if since is not None else None
+    return await _summarize_progress(db, user_id, analysis_context, since=since_at)
+
+async def _summarize_progress(
+    db,
+    user_id: str,
+    analysis_context: Dict,
+    before: Optional[datetime] = None,
+    since: Optional[datetime] = None,
+):
+    """Ask the progress agent for a summary and score of the analysed patterns"""
+    # Prepare recent entries for LLM analysis
+    # Last 5 entries for immediate context
+    recent_entries = await get_last_journal_entries(db, user_id=user_id, limit=5, before=before, since=since)
+    context = PromptContext("progress").add(
+        "formatted",
+        [f"- {e.text} (Mood: {e.mood}, Score: {e.sentiment_score:.2f})" for e in recent_entries],
+        kind="history",
     )
+    for name in ("day_patterns", "trend_analysis", "trigger_analysis", "mood_direction"):
+        context.add(name, compact(analysis_context[name]), kind="analytics")
+    
+    # Format the enhanced prompt
+    formatted_prompt = enhanced_progress_prompt.format(**context.build())
     
-    response = await agent.arun(formatted_prompt)
+    response = await registry.arun("progress", formatted_prompt)
     
     if hasattr(response, 'content'):
         lines = response.content.strip().split("\n")
@@ -12,3 +12,18 @@ Respond in JSON like:
   "sentiment_score": 0.7
 }}
 """
+
+batch_mood_analysis_prompt = """
+Analyze each of the following journal entries independently and return, for every entry:
+- its "id", copied exactly
+- the mood (e.g., happy, anxious, sad, motivated, stressed)
+- a sentiment score from -1 (very negative) to 1 (very positive)
+
+Entries (JSON):
+{entries}
+
+Respond with only a JSON array containing one object per entry, in any order:
+[
+  {{"id": "a1", "mood": "happy", "sentiment_score": 0.7}}
+]
+"""
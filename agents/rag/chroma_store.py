@@ -1,7 +1,9 @@
 import os
 import json
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Union
 import chromadb
+from chromadb.api.shared_system_client import SharedSystemClient
 
 
 class ChromaVectorStore:
@@ -9,12 +11,31 @@ class ChromaVectorStore:
         self.embeddings_dir = embeddings_dir
         self.client = None
         self.collection = None
+        # Process that opened the client; Chroma handles must not cross a fork
+        self._client_pid = None
+        self._setup_lock = threading.Lock()
         self.chunks = []
-        self.setup_chroma()
+        # The chunks are read-only and loaded up front so a pre-forking server
+        # shares them; the client itself is opened lazily in each process.
+        self.load_chunks()
+    
+    def _ensure_collection(self):
+        """Open the client in this process if it isn't already"""
+        if self.collection is None or self._client_pid != os.getpid():
+            # Threads querying a fresh store at once must not each open a client
+            with self._setup_lock:
+                if self.collection is None or self._client_pid != os.getpid():
+                    self.setup_chroma()
+        return self.collection
     
     def setup_chroma(self):
         """Set up ChromaDB client and collection"""
         try:
+            if self._client_pid is not None and self._client_pid != os.getpid():
+                # Forked from a process that had a client open: drop the
+                # inherited system instead of reusing its connections.
+                SharedSystemClient.clear_system_cache()
+            
             # Initialize ChromaDB client with persistent storage
             db_path = os.path.join(self.embeddings_dir, "chroma_db")
             self.client = chromadb.PersistentClient(path=db_path)
@@ -30,9 +51,7 @@ class ChromaVectorStore:
                     metadata={"description": "Mental health tips and strategies"}
                 )
                 print(f"✅ Created new ChromaDB collection: {collection_name}")
-            
-            # Load existing chunks if available
-            self.load_chunks()
+            self._client_pid = os.getpid()
             
         except Exception as e:
             print(f"❌ Error setting up ChromaDB: {e}")
@@ -61,7 +80,7 @@ class ChromaVectorStore:
             self.chunks = json.load(f)
         
         # Check if collection is empty
-        if self.collection.count() > 0:
+        if self._ensure_collection().count() > 0:
             print("✅ ChromaDB collection already populated")
             return
         
@@ -86,7 +105,8 @@ class ChromaVectorStore:
         
         print(f"✅ Added {len(documents)} documents to ChromaDB")
     
-    def search(self, query: str, top_k: int = 3, similarity_threshold: float = 0.3) -> List[Dict[str, Any]]:
+    def search(self, query: str, top_k: int = 3, similarity_threshold: float = 0.3,
+               chunk_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
         """
         Search for similar documents using ChromaDB
         
@@ -94,18 +114,17 @@ class ChromaVectorStore:
             query: The search query
             top_k: Number of top results to return
             similarity_threshold: Minimum similarity score
+            chunk_ids: Only score these chunks (by chunk_id)
             
         Returns:
             List of dictionaries with chunk text and similarity scores
         """
-        if self.collection is None:
-            return []
-        
         try:
             # Search in ChromaDB
-            results = self.collection.query(
+            results = self._ensure_collection().query(
                 query_texts=[query],
-                n_results=top_k
+                n_results=top_k,
+                ids=[f"chunk_{i}" for i in chunk_ids] if chunk_ids is not None else None,
             )
             
             # Process results
@@ -133,6 +152,16 @@ class ChromaVectorStore:
             print(f"❌ Error searching ChromaDB: {e}")
             return []
     
+    def add_chunks(self, chunks: List[str], start_id: int, sources: Union[str, List[str]]):
+        """Add already split chunks to the collection as chunk_<start_id>, chunk_<start_id + 1>, ..."""
+        if isinstance(sources, str):
+            sources = [sources] * len(chunks)
+        self._ensure_collection().add(
+            documents=list(chunks),
+            metadatas=[{"source": source, "chunk_id": start_id + i} for i, source in enumerate(sources)],
+            ids=[f"chunk_{start_id + i}" for i in range(len(chunks))],
+        )
+    
     def add_documents(self, documents: List[str], chunk_size: int = 500, chunk_overlap: int = 50):
         """
         Add new documents to the vector store
@@ -142,35 +171,15 @@ class ChromaVectorStore:
             chunk_size: Size of each chunk
             chunk_overlap: Overlap between chunks
         """
-        from agents.rag.loader import load_and_split
+        from agents.rag.loader import split_documents
         
-        # Process documents into chunks
-        all_chunks = []
-        for doc in documents:
-            chunks = load_and_split(doc, chunk_size, chunk_overlap)
-            all_chunks.extend(chunks)
+        # Process documents into chunks; these are texts, not file paths
+        all_chunks = split_documents(documents, chunk_size, chunk_overlap)
         
         if not all_chunks:
             return
         
-        # Add to ChromaDB
-        documents_to_add = []
-        metadatas = []
-        ids = []
-        
-        start_id = self.collection.count()
-        
-        for i, chunk in enumerate(all_chunks):
-            documents_to_add.append(chunk)
-            metadatas.append({"source": "new_document", "chunk_id": start_id + i})
-            ids.append(f"chunk_{start_id + i}")
-        
-        # Add to collection
-        self.collection.add(
-            documents=documents_to_add,
-            metadatas=metadatas,
-            ids=ids
-        )
+        self.add_chunks(all_chunks, self._ensure_collection().count(), "new_document")
         
         # Update chunks list
         self.chunks.extend(all_chunks)
@@ -182,13 +191,20 @@ class ChromaVectorStore:
         
         print(f"✅ Added {len(all_chunks)} new chunks to ChromaDB")
     
+    def close(self):
+        """Release the client opened by this process"""
+        if self.client is not None and self._client_pid == os.getpid():
+            close = getattr(self.client, "close", None)
+            if close is not None:
+                close()
+        self.client = None
+        self.collection = None
+        self._client_pid = None
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store"""
-        if self.collection is None:
-            return {"error": "Collection not initialized"}
-        
         try:
-            count = self.collection.count()
+            count = self._ensure_collection().count()
             return {
                 "total_vectors": count,
                 "total_chunks": len(self.chunks),
@@ -0,0 +1,155 @@
+"""
+Near-duplicate chunk detection with MinHash and locality-sensitive hashing.
+
+Chunks are compared by the Jaccard similarity of their word shingles. Each
+chunk gets a MinHash signature (computed in the indexing worker processes),
+and NearDuplicateIndex finds earlier chunks whose signatures land in a
+shared LSH bucket, so a chunk is checked against a handful of candidates
+rather than the whole index. scripts/index_knowledge_base.py drops a chunk
+before embedding it when an earlier one is at least DEDUP_THRESHOLD similar;
+the retriever can also drop near-identical hits at query time.
+"""
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+# Estimated Jaccard similarity of word shingles at which a chunk counts as a duplicate; 0 turns it off
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "3"))
+DEDUP_REPORT_FILENAME = "dedup_report.json"
+
+WORD_PATTERN = re.compile(r"\w+")
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+
+def shingles(text: str, size: int = DEDUP_SHINGLE_SIZE) -> Set[str]:
+    """Lowercased word n-grams; a chunk shorter than size words is one shingle"""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+@lru_cache(maxsize=8)
+def _permutations(num_perm: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Fixed seed: signatures from different processes and builds must agree
+    rng = np.random.default_rng(1)
+    a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+def minhash(text: str, num_perm: int = DEDUP_NUM_PERM, shingle_size: int = DEDUP_SHINGLE_SIZE) -> np.ndarray:
+    """MinHash signature of the chunk's shingles; the share of equal positions estimates Jaccard"""
+    # crc32 rather than hash(), which is salted per process
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles(text, shingle_size)), dtype=np.uint64
+    )
+    a, b = _permutations(num_perm)
+    # Multiply-shift hashing: the high 32 bits of a*x + b mod 2^64, one row per permutation
+    return ((a * hashes + b) >> np.uint64(32) & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def lsh_params(threshold: float, num_perm: int, false_negative_weight: float = 0.9) -> Tuple[int, int]:
+    """
+    (bands, rows) for the LSH buckets. Two chunks with similarity s share a
+    bucket with probability 1 - (1 - s^rows)^bands; pick the split with the
+    smallest weighted sum of false positives below the threshold and false
+    negatives above it. Candidates are verified against the threshold
+    afterwards, so false positives only cost time and are weighted lightly.
+    """
+    similarities = np.linspace(0.0, 1.0, 201)
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        collide = 1 - (1 - similarities ** rows) ** bands
+        below = similarities < threshold
+        error = (1 - false_negative_weight) * collide[below].sum() + false_negative_weight * (1 - collide[~below]).sum()
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of the chunks kept so far, bucketed by LSH band"""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        # Bucket keys are hashes of the band bytes; a collision only adds a candidate to verify.
+        # Most buckets hold one chunk, stored as a bare id rather than a list
+        self.buckets: List[Dict[int, Union[int, List[int]]]] = [{} for _ in range(self.bands)]
+        # One row per kept chunk, grown by doubling rather than one small array each
+        self.signatures = np.empty((1024, num_perm), dtype=np.uint32)
+        self.count = 0
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        return [hash(signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def find(self, signature: np.ndarray) -> Optional[Tuple[int, float]]:
+        """(id, estimated similarity) of the closest kept chunk at or above the threshold"""
+        candidates = set()
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if isinstance(members, int):
+                candidates.add(members)
+            elif members:
+                candidates.update(members)
+        if not candidates:
+            return None
+        candidates = np.fromiter(candidates, dtype=np.int64)
+        similarities = (self.signatures[candidates] == signature).mean(axis=1)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        return int(candidates[best]), float(similarities[best])
+
+    def add(self, signature: np.ndarray) -> int:
+        """Keep a chunk; ids count up from 0 in the order chunks are kept"""
+        chunk_id = self.count
+        if chunk_id == len(self.signatures):
+            self.signatures = np.resize(self.signatures, (chunk_id * 2, self.num_perm))
+        self.signatures[chunk_id] = signature
+        self.count += 1
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members is None:
+                bucket[key] = chunk_id
+            elif isinstance(members, int):
+                bucket[key] = [members, chunk_id]
+            else:
+                members.append(chunk_id)
+        return chunk_id
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def drop_near_duplicates(results: List[Dict], threshold: float, top_k: int) -> List[Dict]:
+    """
+    Retrieval hits without the ones nearly identical to a better-ranked hit,
+    cut to top_k. Exact shingle Jaccard: there are only a few hits to compare.
+    """
+    kept: List[Dict] = []
+    kept_shingles: List[Set[str]] = []
+    for result in results:
+        result_shingles = shingles(result["chunk"])
+        if any(jaccard(result_shingles, other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(result)
+        kept_shingles.append(result_shingles)
+        if len(kept) == top_k:
+            break
+    return kept
@@ -1,7 +1,10 @@
+from typing import Optional
+
 from sentence_transformers import SentenceTransformer
 from langchain_openai import OpenAIEmbeddings
 
-def embed_texts(chunks: list[str]):
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+def embed_texts(chunks: list[str], dimensions: Optional[int] = None):
+    # text-embedding-3 models can return shortened vectors natively
+    embeddings = OpenAIEmbeddings(model="text-embedding-3-small", dimensions=dimensions)
     return embeddings.embed_documents(chunks)
 
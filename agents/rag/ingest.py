@@ -0,0 +1,203 @@
+"""
+Streaming ingestion: source files → chunks → embeddings and indexes.
+
+Chunks come lazily from loader.iter_chunks (split in a process pool) and are
+embedded a batch at a time. Nothing grows with the corpus except the BM25
+postings: chunks are appended to the chunks file as they arrive, vectors to
+a raw float32 file that becomes the .npy at the end, and each batch is added
+to the Chroma collection before the next one is read. With deduplication
+on, a chunk whose MinHash signature matches an already kept chunk is
+dropped before it is embedded, and the collapsed clusters are written to
+dedup_report.json.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from functools import partial
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from agents.rag.chroma_store import ChromaVectorStore
+from agents.rag.dedup import DEDUP_NUM_PERM, DEDUP_REPORT_FILENAME, DEDUP_THRESHOLD, NearDuplicateIndex, minhash
+from agents.rag.lexical import BM25_FILENAME, BM25Index, weighted_terms
+from agents.rag.loader import batched, iter_chunks
+from agents.rag.projection import PROJECTION_FILENAME, REDUCTION_METHODS, Projection, fit_pca, write_projected
+from agents.rag.quantized import QUANTIZED_DTYPES, write_quantized
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+CHUNKS_FILENAME = "mental_health_chunks.json"
+EMBEDDINGS_FILENAME = "mental_health_embeddings.npy"
+
+
+def _annotate(chunk: str, num_perm: int):
+    """Per-chunk work done in the splitting pool: BM25 term counts and, if deduplicating, the MinHash"""
+    return weighted_terms(chunk), minhash(chunk, num_perm) if num_perm else None
+
+
+def _write_dedup_report(path: str, chunks_path: str, duplicates: NearDuplicateIndex, clusters: Dict[int, Dict], seen: int):
+    if clusters:
+        # Kept texts aren't held during the build; read them back for the report
+        with open(chunks_path) as f:
+            chunks = json.load(f)
+        for chunk_id, cluster in clusters.items():
+            cluster["kept"]["text"] = chunks[chunk_id]
+        del chunks
+    dropped = sum(len(c["duplicates"]) for c in clusters.values())
+    report = {
+        "threshold": duplicates.threshold,
+        "num_perm": duplicates.num_perm,
+        "bands": duplicates.bands,
+        "rows": duplicates.rows,
+        "chunks_seen": seen,
+        "chunks_kept": len(duplicates),
+        "duplicates_dropped": dropped,
+        "clusters": sorted(clusters.values(), key=lambda c: (-len(c["duplicates"]), c["kept"]["id"])),
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def _drop_duplicates(batch: List[tuple], duplicates: NearDuplicateIndex, clusters: Dict[int, Dict],
+                     kept_sources: List[str]) -> List[tuple]:
+    """The batch without near-duplicates of kept chunks, including earlier ones in the same batch"""
+    kept = []
+    for item in batch:
+        source, chunk, (_, signature) = item
+        match = duplicates.find(signature)
+        if match is None:
+            # Kept in order, so the id is the chunk's position in the chunks file
+            duplicates.add(signature)
+            kept_sources.append(source)
+            kept.append(item)
+            continue
+        chunk_id, similarity = match
+        cluster = clusters.setdefault(
+            chunk_id, {"kept": {"id": chunk_id, "source": os.path.relpath(kept_sources[chunk_id])}, "duplicates": []}
+        )
+        cluster["duplicates"].append({"source": os.path.relpath(source), "similarity": round(similarity, 3), "text": chunk})
+    return kept
+
+
+def build_index(
+    sources: Sequence[str],
+    output_dir: str,
+    embed: Optional[Callable[[List[str]], list]] = None,
+    workers: int = 1,
+    batch_size: int = EMBED_BATCH_SIZE,
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    chroma: bool = True,
+    dedup_threshold: float = DEDUP_THRESHOLD,
+    quantize: Sequence[str] = QUANTIZED_DTYPES,
+    reduce_dimensions: int = 0,
+    reduction: str = "pca",
+) -> Dict:
+    """
+    Chunk, embed and index every source file into output_dir; returns counts
+    and timings. dedup_threshold 0 keeps near-duplicate chunks; quantize
+    names the float16/int8 copies of the embeddings to write. With
+    reduce_dimensions the stored embeddings are cut to that many dimensions
+    by a PCA fitted here or by the model itself (reduction="native").
+    """
+    if reduction not in REDUCTION_METHODS:
+        raise ValueError(f"Unknown reduction '{reduction}', choose from {', '.join(REDUCTION_METHODS)}")
+    native = reduce_dimensions > 0 and reduction == "native"
+    if embed is None:
+        from agents.rag.embedder import embed_texts
+        embed = partial(embed_texts, dimensions=reduce_dimensions) if native else embed_texts
+
+    os.makedirs(output_dir, exist_ok=True)
+    chunks_path = os.path.join(output_dir, CHUNKS_FILENAME)
+    raw_path = os.path.join(output_dir, EMBEDDINGS_FILENAME + ".raw")
+    vector_store = ChromaVectorStore(output_dir) if chroma else None
+    lexical_index = BM25Index()
+    duplicates = NearDuplicateIndex(dedup_threshold) if dedup_threshold > 0 else None
+    # Kept chunk id → the chunks collapsed into it
+    clusters: Dict[int, Dict] = {}
+    kept_sources: List[str] = []
+    seen = 0
+    # Same bytes as json.dump(chunks), so the fingerprint matches chunks_fingerprint()
+    fingerprint = hashlib.sha1(b"[")
+    count, dimensions = 0, None
+    sources_seen = set()
+    embed_seconds = 0.0
+    start = time.perf_counter()
+
+    with open(chunks_path, "w") as chunks_file, open(raw_path, "wb") as raw_file:
+        chunks_file.write("[")
+        # Term counts for BM25 and signatures are computed next to the splitting, in the pool
+        annotate = partial(_annotate, num_perm=DEDUP_NUM_PERM if duplicates is not None else 0)
+        chunks = iter_chunks(sources, chunk_size, chunk_overlap, workers, annotate=annotate)
+        for batch in batched(chunks, batch_size):
+            seen += len(batch)
+            if duplicates is not None:
+                batch = _drop_duplicates(batch, duplicates, clusters, kept_sources)
+                if not batch:
+                    continue
+            texts = [chunk for _, chunk, _ in batch]
+            embed_start = time.perf_counter()
+            vectors = np.asarray(embed(texts), dtype=np.float32)
+            embed_seconds += time.perf_counter() - embed_start
+            dimensions = vectors.shape[1]
+            if native and dimensions != reduce_dimensions:
+                raise ValueError(f"Embedder returned {dimensions} dimensions, expected {reduce_dimensions}")
+            raw_file.write(vectors.tobytes())
+
+            if vector_store is not None:
+                vector_store.add_chunks(texts, count, [os.path.relpath(source) for source, _, _ in batch])
+            for source, chunk, (terms, _) in batch:
+                piece = (", " if count else "") + json.dumps(chunk)
+                chunks_file.write(piece)
+                fingerprint.update(piece.encode("utf-8"))
+                lexical_index.add_terms(terms)
+                sources_seen.add(source)
+                count += 1
+        chunks_file.write("]")
+    fingerprint.update(b"]")
+
+    if not count:
+        os.remove(raw_path)
+        raise ValueError(f"No chunks found under {', '.join(sources)}")
+    if duplicates is not None:
+        _write_dedup_report(os.path.join(output_dir, DEDUP_REPORT_FILENAME), chunks_path, duplicates, clusters, seen)
+
+    # Raw vectors → .npy: write the header now that the shape is known, then copy the bytes
+    # through a small buffer so the matrix is never in memory (or mapped) as a whole
+    header = {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)), "fortran_order": False,
+              "shape": (count, dimensions)}
+    with open(os.path.join(output_dir, EMBEDDINGS_FILENAME), "wb") as npy_file, open(raw_path, "rb") as raw_file:
+        np.lib.format.write_array_header_1_0(npy_file, header)
+        shutil.copyfileobj(raw_file, npy_file, 1 << 20)
+    os.remove(raw_path)
+
+    embeddings_path = os.path.join(output_dir, EMBEDDINGS_FILENAME)
+    projection = None
+    if native:
+        projection = Projection("native", reduce_dimensions)
+    elif reduce_dimensions > 0:
+        projection = fit_pca(np.load(embeddings_path, mmap_mode="r"), reduce_dimensions)
+        write_projected(embeddings_path, projection)
+        dimensions = reduce_dimensions
+    if projection is not None:
+        # Queries are reduced the same way as the chunks
+        projection.save(os.path.join(output_dir, PROJECTION_FILENAME))
+    write_quantized(embeddings_path, quantize)
+
+    lexical_index.finish(fingerprint.hexdigest())
+    lexical_index.save(os.path.join(output_dir, BM25_FILENAME))
+    if vector_store is not None:
+        vector_store.close()
+
+    return {
+        "files": len(sources_seen),
+        "chunks": count,
+        "dimensions": dimensions,
+        "reduction": projection.stats() if projection is not None else None,
+        "lexical_terms": len(lexical_index.postings),
+        "duplicates_dropped": seen - count,
+        "seconds": time.perf_counter() - start,
+        "embed_seconds": embed_seconds,
+    }
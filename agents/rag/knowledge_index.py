@@ -0,0 +1,207 @@
+"""
+Versioned knowledge base indexes, loaded side by side and swapped atomically.
+
+    knowledge/embeddings/CURRENT               name of the live version
+    knowledge/embeddings/versions/<version>/   chunks, embeddings, BM25 index, chroma_db
+
+scripts/index_knowledge_base.py writes a new version directory and then
+replaces CURRENT. Without a CURRENT file the flat knowledge/embeddings
+directory is served as version "base". Each worker polls CURRENT every
+KNOWLEDGE_RELOAD_INTERVAL seconds, loads and warms the new version next to
+the live one and swaps it in; the old one is closed once the queries still
+running against it have finished.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from agents.rag.chroma_store import ChromaVectorStore
+from agents.rag.lexical import BM25_FILENAME, BM25Index, chunks_fingerprint
+from agents.rag.projection import PROJECTION_FILENAME, Projection
+from agents.rag.quantized import VECTOR_DTYPE, VECTOR_DTYPES, QuantizedVectors
+
+# Seconds between checks for a newly published version; 0 turns the watcher off
+KNOWLEDGE_RELOAD_INTERVAL = float(os.getenv("KNOWLEDGE_RELOAD_INTERVAL", "30"))
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+BASE_VERSION = "base"
+
+
+def current_version(embeddings_dir: str) -> Tuple[str, str]:
+    """(version, directory) of the published knowledge index"""
+    try:
+        with open(os.path.join(embeddings_dir, CURRENT_FILE)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return BASE_VERSION, embeddings_dir
+    path = os.path.join(embeddings_dir, VERSIONS_DIR, version)
+    if not version or not os.path.isdir(path):
+        print(f"⚠️  {CURRENT_FILE} names missing knowledge version '{version}', serving '{BASE_VERSION}'")
+        return BASE_VERSION, embeddings_dir
+    return version, path
+
+
+def list_versions(embeddings_dir: str) -> List[str]:
+    versions_dir = os.path.join(embeddings_dir, VERSIONS_DIR)
+    if not os.path.isdir(versions_dir):
+        return []
+    return sorted(v for v in os.listdir(versions_dir) if os.path.isdir(os.path.join(versions_dir, v)))
+
+
+def new_version_name() -> str:
+    return datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+
+
+def version_dir(embeddings_dir: str, version: str) -> str:
+    return os.path.join(embeddings_dir, VERSIONS_DIR, version)
+
+
+def publish_version(embeddings_dir: str, version: str):
+    """Point CURRENT at a version; readers see either the old or the new name, never half of one"""
+    if not os.path.isdir(version_dir(embeddings_dir, version)):
+        raise FileNotFoundError(f"Knowledge version '{version}' does not exist")
+    tmp_path = os.path.join(embeddings_dir, f".{CURRENT_FILE}.{os.getpid()}")
+    with open(tmp_path, "w") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(embeddings_dir, CURRENT_FILE))
+
+
+class KnowledgeIndex:
+    """One loaded version: vector store or embeddings, chunks and the BM25 index"""
+
+    def __init__(self, version: str, path: str, use_chroma: bool = True, hybrid: bool = True,
+                 vector_dtype: str = VECTOR_DTYPE):
+        self.version = version
+        self.path = path
+        self.use_chroma = use_chroma
+        if vector_dtype not in VECTOR_DTYPES:
+            print(f"⚠️  Unknown vector dtype '{vector_dtype}', using float32 (choose from {', '.join(VECTOR_DTYPES)})")
+            vector_dtype = "float32"
+        self.vector_dtype = vector_dtype
+        self.vector_store: Optional[ChromaVectorStore] = None
+        self.embeddings = None
+        # Set when the index was built with reduced dimensions; queries go through it too
+        self.projection: Optional[Projection] = None
+        self.chunks = None
+        self.lexical_index: Optional[BM25Index] = None
+        self.loaded_at = time.time()
+        self._in_flight = 0
+        self._retired = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+        if use_chroma:
+            self.vector_store = ChromaVectorStore(path)
+        else:
+            self.load_knowledge_base()
+        if hybrid:
+            self.load_lexical_index()
+
+    def load_knowledge_base(self):
+        """Load the pre-computed embeddings and chunks (fallback method)"""
+        embeddings_path = os.path.join(self.path, "mental_health_embeddings.npy")
+        chunks_path = os.path.join(self.path, "mental_health_chunks.json")
+
+        if os.path.exists(embeddings_path) and os.path.exists(chunks_path):
+            if self.vector_dtype == "float32":
+                self.embeddings = np.load(embeddings_path)
+            else:
+                # Quantized matrix in memory, float32 rows mapped for rescoring
+                self.embeddings = QuantizedVectors.load(embeddings_path, self.vector_dtype)
+            projection_path = os.path.join(self.path, PROJECTION_FILENAME)
+            if os.path.exists(projection_path):
+                self.projection = Projection.load(projection_path)
+            with open(chunks_path, 'r') as f:
+                self.chunks = json.load(f)
+        else:
+            raise FileNotFoundError("Knowledge base not found. Please run scripts/index_knowledge_base.py first.")
+
+    def all_chunks(self) -> List[str]:
+        if self.vector_store is not None:
+            return self.vector_store.chunks
+        return self.chunks or []
+
+    def load_lexical_index(self):
+        """Load the BM25 index written by the indexing script, rebuilding it if it doesn't match the chunks"""
+        chunks = self.all_chunks()
+        if not chunks:
+            return
+        index_path = os.path.join(self.path, BM25_FILENAME)
+        if os.path.exists(index_path):
+            index = BM25Index.load(index_path)
+            if index.fingerprint == chunks_fingerprint(chunks):
+                self.lexical_index = index
+                return
+            print("⚠️  BM25 index is out of date with the chunks file, rebuilding it in memory")
+        else:
+            print("⚠️  No BM25 index found, building it in memory (run scripts/index_knowledge_base.py)")
+        self.lexical_index = BM25Index.build(chunks)
+
+    # --- lifetime --------------------------------------------------------------
+
+    def acquire(self) -> bool:
+        """Pin the index for one query; False once it has been closed"""
+        with self._lock:
+            if self._closed:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            close = self._retired and self._in_flight == 0
+        if close:
+            self.close()
+
+    def retire(self):
+        """Close now if idle, otherwise when the last running query releases it"""
+        with self._lock:
+            self._retired = True
+            close = self._in_flight == 0
+        if close:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self.vector_store is not None:
+            self.vector_store.close()
+        # Drop the arrays and chunks so the memory goes back once nothing references them
+        self.vector_store = self.embeddings = self.projection = self.chunks = self.lexical_index = None
+        print(f"🗑️ Released knowledge version '{self.version}'")
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "loaded_at": datetime.utcfromtimestamp(self.loaded_at).isoformat() + "Z",
+            "chunks": len(self.all_chunks()) if not self._closed else 0,
+            "lexical_terms": len(self.lexical_index.postings) if self.lexical_index else 0,
+            "in_flight": self._in_flight,
+            "retired": self._retired,
+        }
+
+
+async def watch_knowledge_base(retriever, interval: float = KNOWLEDGE_RELOAD_INTERVAL):
+    """Poll for newly published versions and swap them into the retriever"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(retriever.reload)
+        except Exception as e:
+            print(f"⚠️  Knowledge base reload failed, keeping '{retriever.index.version}': {e}")
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import math
+import re
+from array import array
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+BM25_FILENAME = "mental_health_bm25.json"
+# 2: postings saved as [chunk ids, term frequencies] instead of [[chunk id, tf], ...]
+BM25_FORMAT = 2
+
+# Tokens of markdown headings count this many times, so a chunk under
+# "## Improving Sleep" ranks first for "sleep" even if the word is rare in its body
+HEADING_WEIGHT = 3
+
+STOPWORDS = {
+    "a", "about", "after", "all", "am", "an", "and", "any", "are", "as", "at", "be", "been", "but", "by",
+    "can", "could", "do", "does", "for", "from", "get", "had", "has", "have", "how", "i", "if", "in", "into",
+    "is", "it", "its", "just", "keep", "me", "more", "my", "myself", "not", "of", "on", "or", "our", "should",
+    "so", "some", "that", "the", "their", "them", "then", "there", "these", "they", "things", "this", "to",
+    "up", "very", "was", "we", "what", "when", "which", "while", "who", "why", "will", "with", "would",
+    "you", "your",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z']+")
+
+
+@lru_cache(maxsize=100_000)
+def _stem(word: str) -> str:
+    """Strip the common English suffixes so "stressed", "stresses" and "stress" meet"""
+    word = word.replace("'", "")
+    for suffix in ("ing", "ed", "es", "ly", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4 and not word.endswith("ss"):
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(t) for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def weighted_terms(chunk: str) -> Counter:
+    counts = Counter()
+    for line in chunk.splitlines():
+        weight = HEADING_WEIGHT if line.lstrip().startswith("#") else 1
+        for token in tokenize(line):
+            counts[token] += weight
+    return counts
+
+
+def chunks_fingerprint(chunks: List[str]) -> str:
+    return hashlib.sha1(json.dumps(chunks).encode("utf-8")).hexdigest()
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over the knowledge base chunks.
+
+    Built by scripts/index_knowledge_base.py next to the embeddings and
+    loaded by RAGRetriever; chunk ids are positions in the chunks file, the
+    same ids the vector stores use. Postings are kept as two parallel
+    arrays per term (chunk ids, term frequencies) rather than tuples, which
+    keeps a large index to a few bytes per posting.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.idf: Dict[str, float] = {}
+        self.doc_lengths: List[int] = []
+        self.avg_length = 0.0
+        self.fingerprint = ""
+
+    @classmethod
+    def build(cls, chunks: List[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        index = cls(k1, b)
+        for chunk in chunks:
+            index.add(chunk)
+        index.finish(chunks_fingerprint(chunks))
+        return index
+
+    def add(self, chunk: str):
+        """Index the next chunk; call finish() once all are added"""
+        self.add_terms(weighted_terms(chunk))
+
+    def add_terms(self, terms: Dict[str, int]):
+        """Index the next chunk from its weighted_terms(), e.g. computed in another process"""
+        doc_id = len(self.doc_lengths)
+        self.doc_lengths.append(sum(terms.values()))
+        for term, tf in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = (array("I"), array("I"))
+            postings[0].append(doc_id)
+            postings[1].append(tf)
+
+    def finish(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self._compute_statistics()
+
+    def _compute_statistics(self):
+        count = len(self.doc_lengths)
+        self.avg_length = sum(self.doc_lengths) / count if count else 0.0
+        # Lucene-style idf, which stays positive for terms in most documents
+        self.idf = {
+            term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, (docs, _) in self.postings.items()
+        }
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
+        """(chunk id, BM25 score) for chunks sharing a term with the query, best first"""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            docs, tfs = self.postings[term]
+            for doc_id, tf in zip(docs, tfs):
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+
+    def to_dict(self) -> Dict:
+        return {
+            "format": BM25_FORMAT,
+            "k1": self.k1,
+            "b": self.b,
+            "fingerprint": self.fingerprint,
+            "doc_lengths": self.doc_lengths,
+            "postings": {term: [docs.tolist(), tfs.tolist()] for term, (docs, tfs) in self.postings.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BM25Index":
+        index = cls(data["k1"], data["b"])
+        index.doc_lengths = data["doc_lengths"]
+        if data.get("format", 1) == 1:
+            postings = {term: zip(*pairs) for term, pairs in data["postings"].items()}
+        else:
+            postings = data["postings"]
+        index.postings = {term: (array("I", docs), array("I", tfs)) for term, (docs, tfs) in postings.items()}
+        index.fingerprint = data.get("fingerprint", "")
+        index._compute_statistics()
+        return index
+
+    def save(self, path: str):
+        # json.dumps uses the C encoder; json.dump would encode in Python
+        with open(path, "w") as f:
+            f.write(json.dumps(self.to_dict()))
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
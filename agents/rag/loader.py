@@ -1,14 +1,109 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
 from langchain.text_splitter import CharacterTextSplitter
 
-def load_and_split(filepath: str, chunk_size: int = 500, chunk_overlap: int = 50):
-    with open(filepath, "r", encoding="utf-8") as f:
-        text = f.read()
+SOURCE_EXTENSIONS = (".md", ".markdown", ".txt")
+# Large files are split a segment of whole paragraphs at a time instead of read at once
+SEGMENT_CHARS = 1_000_000
 
-    splitter = CharacterTextSplitter(
+
+def _splitter(chunk_size: int, chunk_overlap: int) -> CharacterTextSplitter:
+    return CharacterTextSplitter(
         separator="\n\n",  # Split by paragraphs (you can change this)
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
     )
 
-    chunks = splitter.split_text(text)
-    return chunks
+
+def _iter_segments(filepath: str, segment_chars: int = SEGMENT_CHARS) -> Iterator[str]:
+    """The file in pieces of about segment_chars, cut only between paragraphs"""
+    buffer: List[str] = []
+    size = 0
+    with open(filepath, "r", encoding="utf-8") as f:
+        for line in f:
+            buffer.append(line)
+            size += len(line)
+            if size >= segment_chars and not line.strip():
+                yield "".join(buffer)
+                buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_file_chunks(filepath: str, chunk_size: int = 500, chunk_overlap: int = 50) -> Iterator[str]:
+    splitter = _splitter(chunk_size, chunk_overlap)
+    for segment in _iter_segments(filepath):
+        yield from splitter.split_text(segment)
+
+
+def load_and_split(filepath: str, chunk_size: int = 500, chunk_overlap: int = 50):
+    return list(iter_file_chunks(filepath, chunk_size, chunk_overlap))
+
+
+def split_documents(documents: Iterable[str], chunk_size: int = 500, chunk_overlap: int = 50) -> List[str]:
+    """Split document texts (not paths) into chunks"""
+    splitter = _splitter(chunk_size, chunk_overlap)
+    return [chunk for doc in documents for chunk in splitter.split_text(doc)]
+
+
+def iter_source_files(paths: Sequence[str], extensions: Tuple[str, ...] = SOURCE_EXTENSIONS) -> Iterator[str]:
+    """Markdown and text files under the given files and directories, in a stable order"""
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            # Generated indexes live next to the sources; never ingest them
+            dirs[:] = sorted(d for d in dirs if d != "embeddings" and not d.startswith("."))
+            for name in sorted(files):
+                if name.endswith(extensions):
+                    yield os.path.join(root, name)
+
+
+def _chunk_file(args: Tuple[str, int, int, Optional[Callable]]) -> Tuple[str, List[tuple]]:
+    filepath, chunk_size, chunk_overlap, annotate = args
+    chunks = load_and_split(filepath, chunk_size, chunk_overlap)
+    if annotate is None:
+        return filepath, [(filepath, chunk) for chunk in chunks]
+    return filepath, [(filepath, chunk, annotate(chunk)) for chunk in chunks]
+
+
+def iter_chunks(
+    paths: Sequence[str],
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    workers: int = 1,
+    annotate: Optional[Callable[[str], Any]] = None,
+) -> Iterator[tuple]:
+    """
+    (source file, chunk) for every source under paths, lazily and in file
+    order; with annotate, (source file, chunk, annotate(chunk)) so per-chunk
+    work such as tokenizing runs in the pool too. With workers > 1 files are
+    split in a process pool that runs at most a few files ahead of the
+    consumer, so a slow embedding stage doesn't let chunks pile up in memory.
+    """
+    tasks = ((filepath, chunk_size, chunk_overlap, annotate) for filepath in iter_source_files(paths))
+    if workers <= 1:
+        for task in tasks:
+            yield from _chunk_file(task)[1]
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window = [pool.submit(_chunk_file, task) for task in islice(tasks, workers * 2)]
+        while window:
+            _, chunks = window.pop(0).result()
+            for task in islice(tasks, 1):
+                window.append(pool.submit(_chunk_file, task))
+            yield from chunks
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,116 @@
+"""
+Reduced-dimension embeddings for the numpy index.
+
+An index can be built with fewer dimensions than the embedding model's
+1536, either by a PCA projection fitted to the corpus at index time or by
+asking the model for shortened vectors ("native"; text-embedding-3 models
+support a dimensions parameter). The projection is saved next to the
+embeddings as mental_health_projection.npz, and KnowledgeIndex loads it so
+queries are embedded and projected the same way as the chunks.
+
+The vector store (ChromaDB) embeds documents with its own model, so this
+applies to the numpy backend.
+"""
+import os
+from typing import Optional
+
+import numpy as np
+
+PROJECTION_FILENAME = "mental_health_projection.npz"
+REDUCTION_METHODS = ("pca", "native")
+# Rows sampled to estimate the covariance for PCA; plenty for 1536 dimensions
+PCA_SAMPLE_ROWS = 100_000
+
+
+class Projection:
+    """Maps model embeddings into the index's reduced space"""
+
+    def __init__(self, method: str, dimensions: int, components: Optional[np.ndarray] = None,
+                 explained_variance: float = 1.0):
+        self.method = method
+        self.dimensions = dimensions
+        self.components = components
+        self.explained_variance = explained_variance
+
+    @property
+    def query_dimensions(self) -> Optional[int]:
+        """Dimensions to request from the embedding model; None for its full output"""
+        return self.dimensions if self.method == "native" else None
+
+    def apply(self, vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.method == "native":
+            return vectors
+        # No centering: dot products in the reduced space approximate the original ones,
+        # so cosine rankings and similarity thresholds carry over
+        return vectors @ self.components.T
+
+    def save(self, path: str):
+        arrays = {"method": np.array(self.method), "dimensions": np.array(self.dimensions),
+                  "explained_variance": np.array(self.explained_variance)}
+        if self.method == "pca":
+            arrays.update(components=self.components)
+        # A file object, or np.savez would append .npz to the name
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "Projection":
+        with np.load(path) as data:
+            method = str(data["method"])
+            return cls(
+                method,
+                int(data["dimensions"]),
+                data["components"] if method == "pca" else None,
+                float(data["explained_variance"]),
+            )
+
+    def stats(self):
+        stats = {"method": self.method, "dimensions": self.dimensions}
+        if self.method == "pca":
+            stats["explained_variance"] = round(self.explained_variance, 4)
+        return stats
+
+
+def fit_pca(full: np.ndarray, dimensions: int, sample_rows: int = PCA_SAMPLE_ROWS, seed: int = 0,
+            block_rows: int = 8192) -> Projection:
+    """
+    Uncentered PCA of a (possibly memory-mapped) embedding matrix from a row sample.
+
+    Components are the top eigenvectors of the second moment E[x xᵀ] rather
+    than the covariance: embeddings share a large mean direction, and a
+    subspace without it would turn cosine into cosine around the corpus mean.
+    explained_variance is the share of the squared norm kept.
+    """
+    rows, source_dimensions = full.shape
+    if not 0 < dimensions < source_dimensions:
+        raise ValueError(f"Reduced dimensions must be between 1 and {source_dimensions - 1}, got {dimensions}")
+    if rows > sample_rows:
+        sample = np.sort(np.random.default_rng(seed).choice(rows, sample_rows, replace=False))
+    else:
+        sample = np.arange(rows)
+
+    # Sums in float64 a block at a time, so the sample never has to be in memory at once
+    outer = np.zeros((source_dimensions, source_dimensions))
+    for start in range(0, len(sample), block_rows):
+        block = np.asarray(full[sample[start:start + block_rows]], dtype=np.float64)
+        outer += block.T @ block
+
+    energies, vectors = np.linalg.eigh(outer / len(sample))
+    order = np.argsort(energies)[::-1][:dimensions]
+    explained = float(energies[order].sum() / max(energies.sum(), 1e-12))
+    return Projection("pca", dimensions, vectors[:, order].T.astype(np.float32), explained)
+
+
+def write_projected(embeddings_path: str, projection: Projection, block_rows: int = 65536):
+    """Replace a float32 .npy with its projection, streaming through a temporary file"""
+    full = np.load(embeddings_path, mmap_mode="r")
+    tmp_path = embeddings_path + ".projected"
+    header = {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)), "fortran_order": False,
+              "shape": (len(full), projection.dimensions)}
+    with open(tmp_path, "wb") as f:
+        np.lib.format.write_array_header_1_0(f, header)
+        for start in range(0, len(full), block_rows):
+            f.write(projection.apply(full[start:start + block_rows]).astype(np.float32).tobytes())
+    del full
+    os.replace(tmp_path, embeddings_path)
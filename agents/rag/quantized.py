@@ -0,0 +1,161 @@
+"""
+Quantized storage for the numpy embedding index.
+
+RAG_VECTOR_DTYPE picks what a worker keeps in memory for the numpy
+backend: float32 (4 bytes per dimension), float16 (2) or int8 (1, a scale
+per dimension over the unit-normalized vectors). With a quantized dtype,
+candidates are scored against the quantized matrix a block of rows at a
+time, so the scan never holds a float copy of it. The best
+RAG_RESCORE_CANDIDATES are then rescored exactly against the float32
+embeddings, which stay memory-mapped: only the rescored rows are read, and
+their pages are shared by every worker on the host.
+
+scripts/index_knowledge_base.py writes the quantized copies next to the
+float32 .npy, e.g. mental_health_embeddings.int8.npy plus
+mental_health_embeddings.int8_scale.npy.
+"""
+import os
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+VECTOR_DTYPES = ("float32", "float16", "int8")
+QUANTIZED_DTYPES = ("float16", "int8")
+VECTOR_DTYPE = os.getenv("RAG_VECTOR_DTYPE", "float32")
+# Quantized hits rescored at full precision per query
+RESCORE_CANDIDATES = int(os.getenv("RAG_RESCORE_CANDIDATES", "50"))
+# Rows converted to float32 at a time while scanning; small enough to stay in cache
+SCAN_BLOCK_ROWS = 1024
+INT8_MAX = 127
+
+
+def quantized_path(embeddings_path: str, dtype: str) -> str:
+    base, ext = os.path.splitext(embeddings_path)
+    return f"{base}.{dtype}{ext}"
+
+
+def scale_path(embeddings_path: str) -> str:
+    base, ext = os.path.splitext(embeddings_path)
+    return f"{base}.int8_scale{ext}"
+
+
+def _normalized_blocks(full: np.ndarray, block_rows: int) -> Iterator[np.ndarray]:
+    for start in range(0, len(full), block_rows):
+        block = np.asarray(full[start:start + block_rows], dtype=np.float32)
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        yield block / np.maximum(norms, 1e-12)
+
+
+def int8_scale(full: np.ndarray, block_rows: int = 65536) -> np.ndarray:
+    """Per-dimension step so the largest normalized value in each dimension maps to ±127"""
+    peak = np.zeros(full.shape[1], dtype=np.float32)
+    for block in _normalized_blocks(full, block_rows):
+        np.maximum(peak, np.abs(block).max(axis=0), out=peak)
+    peak[peak == 0] = 1.0
+    return peak / INT8_MAX
+
+
+def quantized_blocks(full: np.ndarray, dtype: str, scale: Optional[np.ndarray] = None,
+                     block_rows: int = 65536) -> Iterator[np.ndarray]:
+    """The normalized rows of full in dtype, a block at a time"""
+    for block in _normalized_blocks(full, block_rows):
+        if dtype == "int8":
+            yield np.clip(np.rint(block / scale), -INT8_MAX, INT8_MAX).astype(np.int8)
+        else:
+            yield block.astype(dtype)
+
+
+def quantize(full: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(matrix, int8 scale or None) in memory"""
+    scale = int8_scale(full) if dtype == "int8" else None
+    matrix = np.empty(full.shape, dtype=dtype)
+    start = 0
+    for block in quantized_blocks(full, dtype, scale):
+        matrix[start:start + len(block)] = block
+        start += len(block)
+    return matrix, scale
+
+
+def write_quantized(embeddings_path: str, dtypes: Sequence[str] = QUANTIZED_DTYPES):
+    """Write the quantized copies of a float32 .npy next to it, streaming from a memory map"""
+    full = np.load(embeddings_path, mmap_mode="r")
+    for dtype in dtypes:
+        scale = None
+        if dtype == "int8":
+            scale = int8_scale(full)
+            np.save(scale_path(embeddings_path), scale)
+        header = {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False, "shape": full.shape}
+        with open(quantized_path(embeddings_path, dtype), "wb") as f:
+            np.lib.format.write_array_header_1_0(f, header)
+            for block in quantized_blocks(full, dtype, scale):
+                f.write(block.tobytes())
+    del full
+
+
+class QuantizedVectors:
+    """Quantized matrix for the candidate scan, memory-mapped float32 rows for rescoring"""
+
+    def __init__(self, full: np.ndarray, matrix: np.ndarray, scale: Optional[np.ndarray] = None,
+                 rescore_candidates: int = RESCORE_CANDIDATES):
+        self.full = full
+        self.matrix = matrix
+        self.scale = scale
+        self.rescore_candidates = rescore_candidates
+
+    @classmethod
+    def load(cls, embeddings_path: str, dtype: str) -> "QuantizedVectors":
+        full = np.load(embeddings_path, mmap_mode="r")
+        path = quantized_path(embeddings_path, dtype)
+        if os.path.exists(path) and (dtype != "int8" or os.path.exists(scale_path(embeddings_path))):
+            matrix = np.load(path)
+            scale = np.load(scale_path(embeddings_path)) if dtype == "int8" else None
+            if matrix.shape == full.shape:
+                return cls(full, matrix, scale)
+            print(f"⚠️  {os.path.basename(path)} is out of date with the embeddings, quantizing in memory")
+        else:
+            print(f"⚠️  No {dtype} embeddings found, quantizing in memory (run scripts/index_knowledge_base.py)")
+        matrix, scale = quantize(full, dtype)
+        return cls(full, matrix, scale)
+
+    @property
+    def dtype(self) -> str:
+        return str(self.matrix.dtype)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held in memory; the float32 rows are mapped, not loaded"""
+        return self.matrix.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate cosine similarity of the normalized query to every row"""
+        # int8 rows are normalized / scale, so folding the scale into the query gives the dot product
+        weights = (query * self.scale if self.scale is not None else query).astype(np.float32)
+        scores = np.empty(len(self.matrix), dtype=np.float32)
+        for start in range(0, len(self.matrix), SCAN_BLOCK_ROWS):
+            block = self.matrix[start:start + SCAN_BLOCK_ROWS]
+            np.dot(block.astype(np.float32), weights, out=scores[start:start + len(block)])
+        return scores
+
+    def search(self, query, top_k: int = 3, rescore: bool = True) -> List[Tuple[int, float]]:
+        """(row, cosine similarity) best first; exact similarities when rescoring"""
+        query = np.asarray(query, dtype=np.float32).ravel()
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = self.scores(query)
+        count = min(len(scores), max(top_k, self.rescore_candidates) if rescore else top_k)
+        if count < len(scores):
+            candidates = np.argpartition(-scores, count - 1)[:count]
+        else:
+            candidates = np.arange(len(scores))
+        if not rescore:
+            order = np.argsort(-scores[candidates])[:top_k]
+            return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
+
+        # Sorted so the mapped rows are read in file order
+        candidates.sort()
+        rows = np.asarray(self.full[candidates], dtype=np.float32)
+        exact = rows @ query / np.maximum(np.linalg.norm(rows, axis=1), 1e-12)
+        order = np.argsort(-exact)[:top_k]
+        return [(int(candidates[i]), float(exact[i])) for i in order]
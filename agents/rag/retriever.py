@@ -1,38 +1,110 @@
 import numpy as np
-import json
 import os
-from typing import List, Tuple, Dict, Any
+import threading
+import time
+from typing import List, Optional, Dict, Any
 from sklearn.metrics.pairwise import cosine_similarity
+from agents.rag.dedup import drop_near_duplicates
 from agents.rag.embedder import embed_texts
-from agents.rag.chroma_store import ChromaVectorStore
+from agents.rag.knowledge_index import KnowledgeIndex, current_version, list_versions
+from agents.rag.lexical import BM25Index
+from agents.rag.quantized import VECTOR_DTYPE, QuantizedVectors
+from monitoring.metrics import timed_stage, track_stage
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# Fuse BM25 and vector rankings with reciprocal rank fusion. Off until
+# benchmarks/retrieval.py shows it beats vector-only search on recall and latency
+RAG_HYBRID = _env_bool("RAG_HYBRID", False)
+# Relative to the working directory, like the rest of the app's data paths
+KNOWLEDGE_EMBEDDINGS_DIR = os.getenv("KNOWLEDGE_EMBEDDINGS_DIR", "knowledge/embeddings")
+RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+# Candidates taken from each ranking before fusing
+RAG_CANDIDATES = int(os.getenv("RAG_CANDIDATES", "10"))
+# Skip the vector search and fusion when the best BM25 hit clearly beats the runner-up (hybrid only)
+LEXICAL_FAST_PATH = _env_bool("RAG_LEXICAL_FAST_PATH", False)
+LEXICAL_MIN_SCORE = float(os.getenv("RAG_LEXICAL_MIN_SCORE", "1.0"))
+LEXICAL_MARGIN = float(os.getenv("RAG_LEXICAL_MARGIN", "2.0"))
+RELOAD_WARMUP_QUERY = "How can I manage stress?"
+# Drop hits nearly identical to a better one (shingle Jaccard) so top-k context isn't repeated
+RAG_DEDUP_RESULTS = _env_bool("RAG_DEDUP_RESULTS", False)
+RAG_DEDUP_THRESHOLD = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.8"))
+
 
 class RAGRetriever:
-    def __init__(self, embeddings_dir: str = "knowledge/embeddings", use_chroma: bool = True):
+    def __init__(self, embeddings_dir: str = KNOWLEDGE_EMBEDDINGS_DIR, use_chroma: bool = True, hybrid: bool = RAG_HYBRID,
+                 dedup_results: bool = RAG_DEDUP_RESULTS, vector_dtype: str = VECTOR_DTYPE,
+                 lexical_fast_path: bool = LEXICAL_FAST_PATH):
         self.embeddings_dir = embeddings_dir
         self.use_chroma = use_chroma
-        
-        if use_chroma:
-            self.vector_store = ChromaVectorStore(embeddings_dir)
-            self.embeddings = None
-            self.chunks = None
-        else:
-            self.vector_store = None
-            self.embeddings = None
-            self.chunks = None
-            self.load_knowledge_base()
-    
-    def load_knowledge_base(self):
-        """Load the pre-computed embeddings and chunks (fallback method)"""
-        embeddings_path = os.path.join(self.embeddings_dir, "mental_health_embeddings.npy")
-        chunks_path = os.path.join(self.embeddings_dir, "mental_health_chunks.json")
-        
-        if os.path.exists(embeddings_path) and os.path.exists(chunks_path):
-            self.embeddings = np.load(embeddings_path)
-            with open(chunks_path, 'r') as f:
-                self.chunks = json.load(f)
-        else:
-            raise FileNotFoundError("Knowledge base not found. Please run scripts/index_knowledge_base.py first.")
+        self.hybrid = hybrid
+        self.lexical_fast_path = lexical_fast_path
+        self.dedup_results = dedup_results
+        # What the numpy backend keeps in memory: float32, or float16/int8 with exact rescoring
+        self.vector_dtype = vector_dtype
+        # How each retrieval was answered: lexical fast path, fused, or vector only
+        self.path_counts = {"lexical": 0, "hybrid": 0, "vector": 0}
+        # The live version; queries pin the index they started on, reload() swaps in a new one
+        version, path = current_version(embeddings_dir)
+        self.index = KnowledgeIndex(version, path, use_chroma, hybrid, vector_dtype)
+        self.retiring: List[KnowledgeIndex] = []
+        self._reload_lock = threading.Lock()
+    
+    @property
+    def vector_store(self):
+        return self.index.vector_store
     
+    @property
+    def embeddings(self):
+        return self.index.embeddings
+    
+    @property
+    def chunks(self):
+        return self.index.chunks
+    
+    @property
+    def lexical_index(self):
+        return self.index.lexical_index
+    
+    def _acquire(self) -> KnowledgeIndex:
+        while True:
+            index = self.index
+            if index.acquire():
+                return index
+            # Swapped and closed between the read and the pin; take the new one
+    
+    def reload(self, force: bool = False) -> Optional[str]:
+        """
+        Load the published version if it isn't the live one, warm it and swap
+        it in. Returns the new version, or None when nothing changed.
+        """
+        with self._reload_lock:
+            version, path = current_version(self.embeddings_dir)
+            if version == self.index.version and not force:
+                return None
+            start = time.perf_counter()
+            index = KnowledgeIndex(version, path, self.use_chroma, self.hybrid, self.vector_dtype)
+            # Open the client and load the embedding model before any request sees it
+            self._vector_retrieval(index, RELOAD_WARMUP_QUERY, 1, 0.0)
+            previous, self.index = self.index, index
+            self.retiring = [i for i in self.retiring if not i.closed] + [previous]
+            previous.retire()
+            self.retiring = [i for i in self.retiring if not i.closed]
+            print(f"🔄 Knowledge base '{previous.version}' → '{version}' in {time.perf_counter() - start:.1f}s")
+            return version
+    
+    def get_version_stats(self) -> Dict[str, Any]:
+        self.retiring = [i for i in self.retiring if not i.closed]
+        return {
+            "active": self.index.stats(),
+            "retiring": [i.stats() for i in self.retiring],
+            "available": list_versions(self.embeddings_dir),
+        }
+    
+    @timed_stage("vector_search")
     def retrieve_relevant_chunks(self, query: str, top_k: int = 3, similarity_threshold: float = 0.3) -> List[Dict[str, Any]]:
         """
         Retrieve the most relevant chunks for a given query
@@ -45,23 +117,125 @@ class RAGRetriever:
         Returns:
             List of dictionaries containing chunk text and similarity score
         """
-        if self.use_chroma and self.vector_store:
+        index = self._acquire()
+        try:
+            # Over-fetch so there are still top_k hits once near-duplicates are dropped
+            fetch_k = top_k + RAG_CANDIDATES if self.dedup_results else top_k
+            if index.lexical_index is not None:
+                results = self._hybrid_retrieval(index, query, fetch_k, similarity_threshold)
+            else:
+                self.path_counts["vector"] += 1
+                results = self._vector_retrieval(index, query, fetch_k, similarity_threshold)
+        finally:
+            index.release()
+        if self.dedup_results:
+            return drop_near_duplicates(results, RAG_DEDUP_THRESHOLD, top_k)
+        return results
+    
+    def _vector_retrieval(self, index: KnowledgeIndex, query: str, top_k: int, similarity_threshold: float) -> List[Dict[str, Any]]:
+        if index.vector_store is not None:
             # Use ChromaDB for retrieval
-            return self.vector_store.search(query, top_k, similarity_threshold)
+            return index.vector_store.search(query, top_k, similarity_threshold)
         else:
             # Fallback to numpy-based retrieval
-            return self._numpy_retrieval(query, top_k, similarity_threshold)
+            return self._numpy_retrieval(index, query, top_k, similarity_threshold)
     
-    def _numpy_retrieval(self, query: str, top_k: int = 3, similarity_threshold: float = 0.3) -> List[Dict[str, Any]]:
+    def _hybrid_retrieval(self, index: KnowledgeIndex, query: str, top_k: int, similarity_threshold: float) -> List[Dict[str, Any]]:
+        """
+        BM25 and vector rankings fused with RRF, or BM25 alone when its best hit is decisive.
+
+        similarity_score is always the vector similarity, as from vector-only
+        retrieval, so thresholds and callers' confidence checks keep their
+        meaning; BM25-only hits are scored against the query vector for it.
+        The ranking scores are reported as fused_score (RRF) or lexical_score
+        (BM25, fast path).
+        """
+        chunks = index.all_chunks()
+        with track_stage("lexical_search"):
+            lexical = index.lexical_index.search(query, max(top_k, RAG_CANDIDATES))
+        
+        if self.lexical_fast_path and lexical and lexical[0][1] >= LEXICAL_MIN_SCORE and (
+            len(lexical) == 1 or lexical[0][1] >= LEXICAL_MARGIN * lexical[1][1]
+        ):
+            self.path_counts["lexical"] += 1
+            # The ranking is BM25's; only its top hits are scored, instead of searching every vector
+            hits = lexical[:top_k]
+            with track_stage("embedding_search"):
+                similarity = self._vector_scores(index, query, [i for i, _ in hits])
+            return [
+                {"chunk": chunks[i], "similarity_score": similarity[i], "lexical_score": float(score), "index": i}
+                for i, score in hits
+                if similarity.get(i, 0.0) >= similarity_threshold
+            ]
+        
+        self.path_counts["hybrid"] += 1
+        with track_stage("embedding_search"):
+            vector = self._vector_retrieval(index, query, max(top_k, RAG_CANDIDATES), 0.0)
+        fused: Dict[int, float] = {}
+        for rank, (i, _) in enumerate(lexical, 1):
+            fused[i] = fused.get(i, 0.0) + 1.0 / (RRF_K + rank)
+        for rank, result in enumerate(vector, 1):
+            fused[result["index"]] = fused.get(result["index"], 0.0) + 1.0 / (RRF_K + rank)
+        
+        ranked = sorted(fused, key=lambda i: (-fused[i], i))
+        similarity = {r["index"]: r["similarity_score"] for r in vector}
+        texts = {r["index"]: r["chunk"] for r in vector}
+        # BM25 hits outside the vector candidates, scored in one extra lookup
+        missing = [i for i in ranked if i not in similarity]
+        similarity.update(self._vector_scores(index, query, missing))
+        results = []
+        for i in ranked:
+            if similarity.get(i, 0.0) >= similarity_threshold:
+                results.append({
+                    "chunk": texts.get(i) or chunks[i],
+                    "similarity_score": float(similarity[i]),
+                    "fused_score": fused[i],
+                    "index": i,
+                })
+            if len(results) == top_k:
+                break
+        return results
+    
+    def _vector_scores(self, index: KnowledgeIndex, query: str, indices: List[int]) -> Dict[int, float]:
+        """Vector similarity of the query to the given chunks, on the same scale as _vector_retrieval"""
+        if not indices:
+            return {}
+        if index.vector_store is not None:
+            return {
+                r["index"]: r["similarity_score"]
+                for r in index.vector_store.search(query, len(indices), 0.0, chunk_ids=indices)
+            }
+        if index.embeddings is None:
+            return {}
+        rows = np.array(sorted(set(indices)))
+        vectors = index.embeddings.full if isinstance(index.embeddings, QuantizedVectors) else index.embeddings
+        similarities = cosine_similarity(self._query_embedding(index, query), np.asarray(vectors[rows], dtype=np.float32))[0]
+        return {int(i): float(s) for i, s in zip(rows, similarities)}
+    
+    def _query_embedding(self, index: KnowledgeIndex, query: str) -> np.ndarray:
+        """The query embedded and reduced the same way as the index when it was built smaller"""
+        projection = index.projection
+        if projection is None:
+            return embed_texts([query])
+        return projection.apply(embed_texts([query], dimensions=projection.query_dimensions))
+    
+    def _numpy_retrieval(self, index: KnowledgeIndex, query: str, top_k: int = 3, similarity_threshold: float = 0.3) -> List[Dict[str, Any]]:
         """Fallback numpy-based retrieval method"""
-        if self.embeddings is None or self.chunks is None:
+        if index.embeddings is None or index.chunks is None:
             return []
         
-        # Embed the query
-        query_embedding = embed_texts([query])
+        query_embedding = self._query_embedding(index, query)
+        
+        if isinstance(index.embeddings, QuantizedVectors):
+            # Candidates from the quantized matrix, rescored at full precision
+            return [
+                {"chunk": index.chunks[idx], "similarity_score": similarity_score, "index": idx}
+                for idx, similarity_score in index.embeddings.search(query_embedding[0], top_k)
+                if similarity_score >= similarity_threshold
+            ]
         
         # Calculate cosine similarity
-        similarities = cosine_similarity(query_embedding, self.embeddings)[0]
+        similarities = cosine_similarity(query_embedding, index.embeddings)[0]
         
         # Get top-k most similar chunks
         top_indices = np.argsort(similarities)[::-1][:top_k]
@@ -71,7 +245,7 @@ class RAGRetriever:
             similarity_score = similarities[idx]
             if similarity_score >= similarity_threshold:
                 results.append({
-                    "chunk": self.chunks[idx],
+                    "chunk": index.chunks[idx],
                     "similarity_score": float(similarity_score),
                     "index": int(idx)
                 })
@@ -115,19 +289,35 @@ class RAGRetriever:
     
     def get_vector_store_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store"""
-        if self.use_chroma and self.vector_store:
-            return self.vector_store.get_stats()
+        index = self.index
+        if index.vector_store is not None:
+            return index.vector_store.get_stats()
         else:
+            embeddings = index.embeddings
             return {
-                "total_vectors": len(self.embeddings) if self.embeddings is not None else 0,
-                "total_chunks": len(self.chunks) if self.chunks is not None else 0,
-                "index_type": "numpy"
+                "total_vectors": len(embeddings) if embeddings is not None else 0,
+                "total_chunks": len(index.chunks) if index.chunks is not None else 0,
+                "index_type": "numpy",
+                "dtype": index.vector_dtype,
+                "reduction": index.projection.stats() if index.projection is not None else None,
+                "resident_bytes": embeddings.nbytes if embeddings is not None else 0,
             }
     
+    def get_retrieval_stats(self) -> Dict[str, Any]:
+        """Lexical index size and how retrievals were answered"""
+        return {
+            "hybrid": self.lexical_index is not None,
+            "dedup_results": self.dedup_results,
+            "lexical_terms": len(self.lexical_index.postings) if self.lexical_index else 0,
+            "paths": dict(self.path_counts),
+        }
+    
     def add_documents(self, documents: List[str], chunk_size: int = 500, chunk_overlap: int = 50):
         """Add new documents to the vector store"""
         if self.use_chroma and self.vector_store:
             self.vector_store.add_documents(documents, chunk_size, chunk_overlap)
+            if self.lexical_index is not None:
+                self.index.lexical_index = BM25Index.build(self.index.all_chunks())
         else:
             print("Document addition only supported with ChromaDB vector store")
     
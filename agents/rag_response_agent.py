@@ -1,19 +1,21 @@
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
+from agents.context_budget import PromptContext
 from agents.rag.retriever import RAGRetriever
 from agents.prompts.rag_response import rag_agent_description, rag_response_prompt
 from typing import Dict, Any, Optional
+from agents.registry import registry
+from monitoring.metrics import track_stage
 
 rag_retriever = RAGRetriever()
-model = OpenAIChat(id="gpt-4o-mini")
 
-rag_response_agent = Agent(
-    model=model,
+registry.register(
+    "rag",
     description=rag_agent_description,
-    markdown=False
+    markdown=False,
+    cache_ttl=3600,
+    personalized=True
 )
 
-def generate_rag_response(
+async def generate_rag_response(
     user_message: str, 
     user_context: str = "", 
     mood_info: Optional[Dict[str, Any]] = None,
@@ -40,10 +42,8 @@ def generate_rag_response(
     if use_knowledge_base:
         try:
             retrieved_chunks = rag_retriever.retrieve_relevant_chunks(user_message, top_k=2)
-            similarity_score = rag_retriever.get_similarity_score(user_message)
-            
-            if retrieved_chunks:
-                knowledge_context = rag_retriever.get_context_for_response(user_message)
+            # The best chunk's score; a second top_k=1 retrieval would embed the message again
+            similarity_score = retrieved_chunks[0]["similarity_score"] if retrieved_chunks else 0.0
         except Exception as e:
             print(f"Warning: Knowledge base retrieval failed: {e}")
     
@@ -52,15 +52,28 @@ def generate_rag_response(
     if mood_info:
         mood_info_text = f"Current Mood Analysis:\n- Mood: {mood_info.get('mood', 'unknown')}\n- Sentiment Score: {mood_info.get('sentiment_score', 0.0):.2f}"
     
-    full_prompt = rag_response_prompt.format(
-        knowledge_context=knowledge_context,
-        user_context=user_context,
-        mood_info=mood_info_text,
-        user_message=user_message
-    )
+    context = PromptContext("rag")
+    context.add("user_message", user_message, kind="user_message", keep_tail=True)
+    context.add("user_context", user_context, kind="history")
+    context.add("mood_info", mood_info_text)
+    if retrieved_chunks:
+        # Same layout as RAGRetriever.get_context_for_response, from the chunks already retrieved;
+        # the short header always fits, only chunks get cut
+        context.add(
+            "knowledge_context",
+            ["Relevant information from knowledge base:"] + [f"{i}. {c['chunk']}" for i, c in enumerate(retrieved_chunks, 1)],
+            kind="knowledge",
+        )
+    else:
+        context.add("knowledge_context", knowledge_context)
+    sections = context.build()
+    knowledge_context = sections["knowledge_context"]
+    
+    full_prompt = rag_response_prompt.format(**sections)
     
     # Generate response
-    response = rag_response_agent.run(full_prompt)
+    with track_stage("rag_llm"):
+        response = await registry.arun("rag", full_prompt)
     
     return {
         "response": response.content if hasattr(response, 'content') else str(response),
@@ -70,7 +83,7 @@ def generate_rag_response(
         "used_knowledge_base": use_knowledge_base and bool(retrieved_chunks)
     }
 
-def generate_mood_specific_response(
+async def generate_mood_specific_response(
     user_message: str, 
     mood: str, 
     sentiment_score: float,
@@ -103,7 +116,7 @@ def generate_mood_specific_response(
         except:
             pass
     
-    return generate_rag_response(
+    return await generate_rag_response(
         user_message=user_message,
         user_context=user_context,
         mood_info=mood_info,
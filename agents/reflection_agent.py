@@ -1,25 +1,28 @@
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 from sqlalchemy.ext.asyncio import AsyncSession
+from agents.context_budget import PromptContext
 from agents.prompts.reflection import reflection_prompt
 from db.crud import get_last_journal_entries
+from agents.registry import registry
+from monitoring.metrics import timed_stage
 
-model = OpenAIChat(id="gpt-4o-mini")
-
-agent = Agent(
-    model=model,
+registry.register(
+    "reflection",
     description="You are a reflection mood agent. Respond with a thoughtful question that helps the user reflect on why they might be feeling this way. The question should be empathetic and encourage self-reflection.",
-    markdown=False
+    markdown=False,
+    personalized=True
 )
 
+@timed_stage("reflection")
 async def get_reflection_question(db: AsyncSession, user_id: str, mood: str) -> str:
     past_entries = await get_last_journal_entries(db, user_id=user_id, limit=3)
-    context = "\n".join(f"- {entry.text} ({entry.mood})" for entry in past_entries)
+    context = PromptContext("reflection").add(
+        "past_entries", [f"- {entry.text} ({entry.mood})" for entry in past_entries], kind="history"
+    ).build()
 
     prompt = reflection_prompt.format(
         mood=mood.lower(),
-        past_entries=context
+        past_entries=context["past_entries"]
     )
 
-    response = await agent.arun(prompt)
+    response = await registry.arun("reflection", prompt)
     return response.content if hasattr(response, 'content') else str(response)
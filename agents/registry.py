@@ -0,0 +1,222 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+from agno.agent import Agent
+from agno.models.openai import OpenAIChat
+
+from agents.llm_cache import LLM_CACHE_ENABLED, LLM_CACHE_PERSONALIZED, cache_key, llm_cache
+from monitoring.llm_usage import arun_agent, run_agent
+
+DEFAULT_MODEL_ID = os.getenv("LLM_MODEL_ID", "gpt-4o-mini")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_AGENT_CONCURRENCY = int(os.getenv("LLM_AGENT_CONCURRENCY", "8"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "60"))
+
+
+class AgentSpec:
+    """Everything needed to build an agent, so construction can wait until first use"""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        markdown: Optional[bool],
+        model_id: str,
+        max_concurrency: int,
+        cache_ttl: float = 0,
+        personalized: bool = False,
+        cache_validator: Optional[Callable[[str], bool]] = None,
+    ):
+        self.name = name
+        self.description = description
+        self.markdown = markdown
+        self.model_id = model_id
+        self.max_concurrency = max_concurrency
+        # Seconds a response may be served from the shared LLM cache; 0 = not cached
+        self.cache_ttl = cache_ttl
+        # Prompts carry per-user history, so responses are not reused unless LLM_CACHE_PERSONALIZED
+        self.personalized = personalized
+        # Responses it rejects (unparseable, invalid) are returned but never cached
+        self.cache_validator = cache_validator
+
+    @property
+    def cached(self) -> bool:
+        return LLM_CACHE_ENABLED and self.cache_ttl > 0 and (LLM_CACHE_PERSONALIZED or not self.personalized)
+
+
+class ConcurrencyStats:
+    """Queue and in-flight counters for one semaphore"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiting = 0
+        self.acquired_total = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "acquired_total": self.acquired_total,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.acquired_total, 6) if self.acquired_total else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+
+class AgentRegistry:
+    """
+    Owns every LLM agent in the process.
+
+    All agents share one pooled OpenAI client (sync and async), are looked up
+    by name, and async calls are capped by a global semaphore plus one
+    semaphore per agent. Time spent queued on those semaphores is tracked so
+    worker counts can be sized from real numbers.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.specs: Dict[str, AgentSpec] = {}
+        self.agents: Dict[str, Agent] = {}
+        self.max_concurrency = max_concurrency
+        self._global_limit = asyncio.Semaphore(max_concurrency)
+        self._agent_limits: Dict[str, asyncio.Semaphore] = {}
+        self.global_stats = ConcurrencyStats(max_concurrency)
+        self.agent_stats: Dict[str, ConcurrencyStats] = {}
+        self._client = None
+        self._async_client = None
+        self._agent_factory: Optional[Callable[[AgentSpec], Any]] = None
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        name: str,
+        description: str,
+        markdown: Optional[bool] = False,
+        model_id: str = DEFAULT_MODEL_ID,
+        max_concurrency: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+        personalized: bool = False,
+        cache_validator: Optional[Callable[[str], bool]] = None,
+    ):
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv(f"LLM_CONCURRENCY_{name.upper()}", LLM_AGENT_CONCURRENCY))
+        cache_ttl = float(os.getenv(f"LLM_CACHE_TTL_{name.upper()}", cache_ttl or 0))
+        self.specs[name] = AgentSpec(
+            name, description, markdown, model_id, max_concurrency, cache_ttl, personalized, cache_validator
+        )
+        self._agent_limits[name] = asyncio.Semaphore(max_concurrency)
+        self.agent_stats[name] = ConcurrencyStats(max_concurrency)
+
+    def _shared_clients(self):
+        # Created on first use so importing the agents never needs an API key
+        if self._client is None:
+            import openai
+            limits = httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            )
+            self._client = openai.OpenAI(
+                http_client=httpx.Client(limits=limits, timeout=LLM_HTTP_TIMEOUT),
+            )
+            self._async_client = openai.AsyncOpenAI(
+                http_client=httpx.AsyncClient(limits=limits, timeout=LLM_HTTP_TIMEOUT),
+            )
+        return self._client, self._async_client
+
+    def set_agent_factory(self, factory: Optional[Callable[[AgentSpec], Any]]):
+        """
+        Swap how agents are built, e.g. for an offline fake LLM backend.
+
+        The factory receives the AgentSpec and returns any object with
+        run(prompt) and async arun(prompt). Pass None to restore the default.
+        """
+        with self._lock:
+            self._agent_factory = factory
+            self.agents.clear()
+
+    def build_model(self, spec: AgentSpec):
+        client, async_client = self._shared_clients()
+        return OpenAIChat(id=spec.model_id, client=client, async_client=async_client)
+
+    def get(self, name: str) -> Agent:
+        """Look up an agent by name, building it on first use"""
+        agent = self.agents.get(name)
+        if agent is not None:
+            return agent
+        if name not in self.specs:
+            raise KeyError(f"Unknown agent: {name}")
+        with self._lock:
+            if name not in self.agents:
+                spec = self.specs[name]
+                if self._agent_factory is not None:
+                    self.agents[name] = self._agent_factory(spec)
+                    return self.agents[name]
+                kwargs = {"model": self.build_model(spec), "description": spec.description}
+                if spec.markdown is not None:
+                    kwargs["markdown"] = spec.markdown
+                self.agents[name] = Agent(**kwargs)
+        return self.agents[name]
+
+    async def _acquire(self, semaphore: asyncio.Semaphore, stats: ConcurrencyStats):
+        stats.waiting += 1
+        start = time.perf_counter()
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.waiting -= 1
+        waited = time.perf_counter() - start
+        stats.in_flight += 1
+        stats.acquired_total += 1
+        stats.wait_seconds_total += waited
+        stats.wait_seconds_max = max(stats.wait_seconds_max, waited)
+
+    def _release(self, semaphore: asyncio.Semaphore, stats: ConcurrencyStats):
+        stats.in_flight -= 1
+        semaphore.release()
+
+    async def arun(self, name: str, prompt: str):
+        """Run an agent, from the shared response cache when it opted in"""
+        spec = self.specs.get(name)
+        if spec is None or not spec.cached:
+            return await self._arun_limited(name, prompt)
+        # The built agent's model id, so an offline fake backend never shares entries with the real model
+        key = cache_key(self.get(name).model.id, spec.description, spec.markdown, prompt)
+        # Looked up before the concurrency limits so hits never queue behind misses
+        return await llm_cache.get_or_call(
+            name, key, spec.cache_ttl, lambda: self._arun_limited(name, prompt), spec.cache_validator
+        )
+
+    async def _arun_limited(self, name: str, prompt: str):
+        """Run an agent under the global and per-agent concurrency limits"""
+        agent = self.get(name)
+        agent_limit, agent_stats = self._agent_limits[name], self.agent_stats[name]
+        # Per-agent first, so a burst on one agent cannot hold global slots while queued
+        await self._acquire(agent_limit, agent_stats)
+        try:
+            await self._acquire(self._global_limit, self.global_stats)
+            try:
+                return await arun_agent(name, agent, prompt)
+            finally:
+                self._release(self._global_limit, self.global_stats)
+        finally:
+            self._release(agent_limit, agent_stats)
+
+    def run(self, name: str, prompt: str):
+        """Blocking call for scripts and legacy helpers; not subject to the async limits"""
+        return run_agent(name, self.get(name), prompt)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "global": self.global_stats.to_dict(),
+            "agents": {name: stats.to_dict() for name, stats in sorted(self.agent_stats.items())},
+        }
+
+
+registry = AgentRegistry()
@@ -0,0 +1,32 @@
+"""Add client_entry_id for resumable bulk imports
+
+Revision ID: 0aad87b7aa70
+Revises: bd2ba99076f1
+Create Date: 2026-10-19 10:02:11.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0aad87b7aa70'
+down_revision: Union[str, Sequence[str], None] = 'bd2ba99076f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('journal_entries', sa.Column('client_entry_id', sa.String(), nullable=True))
+    op.create_unique_constraint(
+        'uq_journal_entries_user_client_entry', 'journal_entries', ['user_id', 'client_entry_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_journal_entries_user_client_entry', 'journal_entries', type_='unique')
+    op.drop_column('journal_entries', 'client_entry_id')
@@ -0,0 +1,37 @@
+"""Add shared bulk import progress
+
+Revision ID: 2d8f6b3c9e17
+Revises: 7f2c5d8e1a93
+Create Date: 2026-10-20 10:14:27.551820
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d8f6b3c9e17'
+down_revision: Union[str, Sequence[str], None] = '7f2c5d8e1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'bulk_imports',
+        sa.Column('import_id', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('progress', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('import_id'),
+    )
+    op.create_index(op.f('ix_bulk_imports_updated_at'), 'bulk_imports', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_bulk_imports_updated_at'), table_name='bulk_imports')
+    op.drop_table('bulk_imports')
@@ -0,0 +1,28 @@
+"""Store trigger keyword tags per journal entry
+
+Revision ID: 5c1e8f2a9b34
+Revises: 0aad87b7aa70
+Create Date: 2026-10-19 11:24:37.508126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e8f2a9b34'
+down_revision: Union[str, Sequence[str], None] = '0aad87b7aa70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('journal_entries', sa.Column('trigger_tags', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('journal_entries', 'trigger_tags')
@@ -0,0 +1,37 @@
+"""Add stored progress reports
+
+Revision ID: 7f2c5d8e1a93
+Revises: 3b7d9a41c2e8
+Create Date: 2026-10-19 17:05:33.402916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f2c5d8e1a93'
+down_revision: Union[str, Sequence[str], None] = '3b7d9a41c2e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'progress_reports',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('version', sa.String(), nullable=False),
+        sa.Column('generated_at', sa.DateTime(), nullable=False),
+        sa.Column('summary', sa.String(), nullable=True),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('patterns', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('progress_reports')
@@ -0,0 +1,112 @@
+"""Add write-time entry features and backfill them
+
+Revision ID: 9e4d27c1f0a6
+Revises: 5c1e8f2a9b34
+Create Date: 2026-10-19 12:08:51.730442
+
+"""
+import re
+from collections import Counter
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4d27c1f0a6'
+down_revision: Union[str, Sequence[str], None] = '5c1e8f2a9b34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Frozen copy of db.features as of this revision, so later changes to the app
+# can't change what this migration writes
+TRIGGER_KEYWORDS = {
+    'work_stress': ['work', 'job', 'boss', 'deadline', 'meeting', 'office', 'colleague'],
+    'relationship': ['partner', 'boyfriend', 'girlfriend', 'husband', 'wife', 'friend', 'family'],
+    'health': ['sick', 'pain', 'doctor', 'medicine', 'sleep', 'exercise', 'diet'],
+    'financial': ['money', 'bills', 'expenses', 'budget', 'debt', 'salary'],
+    'social': ['party', 'social', 'lonely', 'people', 'crowd', 'conversation'],
+    'personal_goals': ['goal', 'achievement', 'success', 'failure', 'progress', 'plan']
+}
+KEYWORD_TRIGGERS = {
+    keyword: trigger for trigger, keywords in TRIGGER_KEYWORDS.items() for keyword in keywords
+}
+TRIGGER_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, KEYWORD_TRIGGERS), key=len, reverse=True)) + r")s?\b",
+    re.IGNORECASE,
+)
+SENTIMENT_BUCKETS = [
+    (-0.6, 'very_negative'),
+    (-0.2, 'negative'),
+    (0.2, 'neutral'),
+    (0.6, 'positive'),
+]
+
+journal_entries = sa.table(
+    'journal_entries',
+    sa.column('id', sa.Integer),
+    sa.column('text', sa.String),
+    sa.column('sentiment_score', sa.Float),
+    sa.column('timestamp', sa.DateTime),
+    sa.column('trigger_tags', sa.JSON),
+    sa.column('weekday', sa.SmallInteger),
+    sa.column('sentiment_bucket', sa.String),
+)
+
+
+def derive_features(text, sentiment_score, timestamp):
+    bucket = None
+    if sentiment_score is not None:
+        bucket = next((name for upper, name in SENTIMENT_BUCKETS if sentiment_score < upper), 'very_positive')
+    triggers = Counter(KEYWORD_TRIGGERS[m.group(1).lower()] for m in TRIGGER_PATTERN.finditer(text or ''))
+    return {
+        'weekday': timestamp.weekday() if timestamp is not None else None,
+        'sentiment_bucket': bucket,
+        'trigger_tags': dict(triggers),
+    }
+
+
+def backfill_features(connection) -> None:
+    # In id order, one batch at a time, so memory stays flat on large tables
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(journal_entries.c.id, journal_entries.c.text, journal_entries.c.sentiment_score, journal_entries.c.timestamp)
+            .where(journal_entries.c.id > last_id)
+            .order_by(journal_entries.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        connection.execute(
+            journal_entries.update()
+            .where(journal_entries.c.id == sa.bindparam('entry_id'))
+            .values(
+                trigger_tags=sa.bindparam('trigger_tags'),
+                weekday=sa.bindparam('weekday'),
+                sentiment_bucket=sa.bindparam('sentiment_bucket'),
+            ),
+            [{'entry_id': row.id, **derive_features(row.text, row.sentiment_score, row.timestamp)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('journal_entries', sa.Column('weekday', sa.SmallInteger(), nullable=True))
+    op.add_column('journal_entries', sa.Column('sentiment_bucket', sa.String(), nullable=True))
+
+    # Trigger tags are matched in Python, so a --sql script can't backfill; it runs as its own step
+    if context.is_offline_mode():
+        op.execute("-- Backfill entry features after applying this script: python scripts/backfill_entry_features.py")
+        return
+    backfill_features(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('journal_entries', 'sentiment_bucket')
+    op.drop_column('journal_entries', 'weekday')
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end load test for the chat API.
+
+Runs the FastAPI app in-process against a local database (SQLite by default,
+or any DATABASE_URL such as a local Postgres) with every LLM agent replaced
+by the fake backend in benchmarks/fake_llm.py. Simulated users send a
+weighted mix of requests and the results are written as JSON so runs can be
+compared between commits.
+
+Runs are isolated from each other and from the working tree: the shared LLM
+response cache is off (or, with --llm-cache, a fresh file per run), and the
+knowledge index is served from a temporary copy, since opening the Chroma
+store writes to it.
+
+    python benchmarks/chat_load.py --users 50 --requests-per-user 10
+    python benchmarks/chat_load.py --compare benchmarks/results/chat_load_<old>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+MESSAGES = {
+    "small_talk": [
+        "Hi there, how are you today?",
+        "Good morning!",
+        "Thanks for the chat yesterday",
+    ],
+    "off_topic": [
+        "Who won the football game last night?",
+        "Which laptop should I buy for programming?",
+        "What's the best car for a family of four?",
+    ],
+    "mood_entry": [
+        "I feel anxious about my deadline at work tomorrow.",
+        "Today was great, I went for a run and felt really motivated.",
+        "I've been sleeping badly and feel exhausted and sad.",
+        "My partner and I argued and I'm upset about it.",
+    ],
+}
+
+DEFAULT_MIX = "small_talk=0.25,off_topic=0.1,mood_entry=0.5,history=0.1,progress=0.05"
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - set(MESSAGES) - {"history", "progress", "insights"}
+    if unknown:
+        raise ValueError(f"Unknown request kinds in mix: {sorted(unknown)}")
+    return mix
+
+
+def parse_latencies(values: List[str]) -> Dict[str, str]:
+    return dict(v.split("=", 1) for v in values)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=project_root, text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def copy_knowledge_index(workdir: str) -> str:
+    """Copy the published knowledge index into workdir, flat, so it is served as the base version"""
+    # Resolved by hand: importing agents would build the retriever on the tracked index
+    source = os.path.join(project_root, "knowledge", "embeddings")
+    try:
+        with open(os.path.join(source, "CURRENT")) as f:
+            version = f.read().strip()
+        if version and os.path.isdir(os.path.join(source, "versions", version)):
+            source = os.path.join(source, "versions", version)
+    except FileNotFoundError:
+        pass
+    target = os.path.join(workdir, "embeddings")
+    shutil.copytree(source, target, ignore=shutil.ignore_patterns("versions", "CURRENT"))
+    return target
+
+
+def summarize(samples: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 1),
+        "p95_ms": round(percentile(samples, 95) * 1000, 1),
+        "p99_ms": round(percentile(samples, 99) * 1000, 1),
+    }
+
+
+async def simulate_user(client, user_id: str, kinds: List[str], weights: List[float], count: int, rng: random.Random, results):
+    for _ in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        start = time.perf_counter()
+        if kind in MESSAGES:
+            route = f"POST /v1/chat [{kind}]"
+            response = await client.post("/v1/chat", json={"user_id": user_id, "text": rng.choice(MESSAGES[kind])})
+        elif kind == "history":
+            route = "GET /v1/history"
+            response = await client.get("/v1/history", params={"user_id": user_id})
+        elif kind == "progress":
+            route = "GET /v1/progress/{user_id}"
+            response = await client.get(f"/v1/progress/{user_id}")
+        else:
+            route = "GET /v1/insights"
+            response = await client.get("/v1/insights", params={"user_id": user_id})
+        elapsed = time.perf_counter() - start
+        bucket = results.setdefault(route, {"latencies": [], "errors": 0})
+        bucket["latencies"].append(elapsed)
+        if response.status_code != 200:
+            bucket["errors"] += 1
+
+
+async def run_benchmark(args) -> Dict:
+    import httpx
+    from agents.registry import registry
+    from benchmarks.fake_llm import FakeLLMBackend
+    from db.models import Base
+    from db.session import engine
+    from main import app
+
+    intent_by_message = {text: kind for kind, texts in MESSAGES.items() for text in texts}
+    backend = FakeLLMBackend(
+        latencies=parse_latencies(args.latency),
+        scale=args.latency_scale,
+        seed=args.seed,
+        intent_for_message=lambda message: intent_by_message.get(message, "mood_entry"),
+    )
+    registry.set_agent_factory(backend.build_agent)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    mix = parse_mix(args.mix)
+    kinds, weights = list(mix), list(mix.values())
+    rng = random.Random(args.seed)
+    results: Dict[str, Dict] = {}
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            simulate_user(client, f"bench_user_{i}", kinds, weights, args.requests_per_user, random.Random(rng.random()), results)
+            for i in range(args.users)
+        ))
+        elapsed = time.perf_counter() - start
+
+    all_latencies = [l for r in results.values() for l in r["latencies"]]
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": {
+            "users": args.users,
+            "requests_per_user": args.requests_per_user,
+            "mix": mix,
+            "latency_scale": args.latency_scale,
+            "latency_overrides": parse_latencies(args.latency),
+            "database": engine.url.get_backend_name(),
+            "seed": args.seed,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "llm_calls": backend.calls,
+        "overall": summarize(all_latencies, sum(r["errors"] for r in results.values()), elapsed),
+        "routes": {
+            route: summarize(r["latencies"], r["errors"], elapsed)
+            for route, r in sorted(results.items())
+        },
+        "llm_concurrency": registry.stats()["global"],
+    }
+
+
+def print_report(report: Dict, baseline: Dict = None):
+    print(f"\nCommit {report['commit']}  elapsed {report['elapsed_s']}s  LLM calls {report['llm_calls']}")
+    header = f"{'route':34} {'req':>6} {'err':>4} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["routes"].items()) + [("overall", report["overall"])]
+    for route, stats in rows:
+        line = f"{route:34} {stats['requests']:>6} {stats['errors']:>4} {stats['rps']:>8} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}"
+        old = baseline and (baseline["overall"] if route == "overall" else baseline["routes"].get(route))
+        if old:
+            delta = (stats["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+            line += f"   p95 {delta:+.1f}% vs {baseline['commit']}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline /v1/chat load test with a fake LLM backend")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent simulated users")
+    parser.add_argument("--requests-per-user", type=int, default=10)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted request kinds: small_talk, off_topic, mood_entry, history, progress, insights")
+    parser.add_argument("--latency", action="append", default=[], metavar="AGENT=SPEC",
+                        help="Override an agent latency, e.g. rag=lognormal:2.0:0.5 or intent=fixed:0.3")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply every sampled latency")
+    parser.add_argument("--database-url", default=None, help="Defaults to $DATABASE_URL or a local SQLite file")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Defaults to benchmarks/results/chat_load_<commit>.json")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to diff against")
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="Use the shared LLM cache, starting from an empty file for this run")
+    args = parser.parse_args()
+
+    # Must be set before db.session is imported
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(project_root, 'benchmarks', 'bench.db')}")
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    # Also before importing the app: a cache or index left over from earlier runs would skew latencies
+    workdir = tempfile.mkdtemp(prefix="chat_load_")
+    os.environ["LLM_CACHE_ENABLED"] = "1" if args.llm_cache else "0"
+    os.environ["LLM_CACHE_PATH"] = os.path.join(workdir, "llm_cache.db")
+    os.environ["KNOWLEDGE_EMBEDDINGS_DIR"] = copy_knowledge_index(workdir)
+    os.environ["KNOWLEDGE_RELOAD_INTERVAL"] = "0"
+
+    try:
+        report = asyncio.run(run_benchmark(args))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    report["llm_cache"] = args.llm_cache
+
+    output = args.output or os.path.join(project_root, "benchmarks", "results", f"chat_load_{report['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"\nSaved results to {output}")
+
+
+if __name__ == "__main__":
+    main()
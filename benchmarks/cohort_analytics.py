@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Memory and time of the cohort analytics views as the entry table grows.
+
+Fills a SQLite file with synthetic journal entries in steps (default up to
+5M rows) and after each step runs every view in db/analytics.py, recording
+wall time and peak Python heap (tracemalloc). The SQL views should stay flat
+in memory while the row count grows; --naive-max-rows also runs the obvious
+"load every row and count in Python" version up to that size for contrast.
+
+    python benchmarks/cohort_analytics.py --steps 500000,1000000,5000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+DEFAULT_DB = os.path.join(project_root, "benchmarks", "cohort.db")
+
+MOODS = ["happy", "anxious", "sad", "motivated", "stressed", "calm"]
+TRIGGERS = ["work_stress", "relationship", "health", "financial", "social", "personal_goals"]
+INSERT_BATCH = 50000
+
+
+def create_table(path: str):
+    from sqlalchemy import create_engine
+    from db.models import Base
+
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+
+def fill(path: str, start: int, stop: int, users: int, rng: random.Random):
+    """Append rows start..stop-1, spread over a year of timestamps"""
+    from db.features import sentiment_bucket
+
+    origin = datetime(2025, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    for batch_start in range(start, stop, INSERT_BATCH):
+        rows = []
+        for _ in range(batch_start, min(batch_start + INSERT_BATCH, stop)):
+            timestamp = origin + timedelta(seconds=rng.randrange(365 * 86400))
+            score = round(rng.uniform(-1, 1), 2)
+            tags = {rng.choice(TRIGGERS): rng.randint(1, 2)} if rng.random() < 0.35 else {}
+            rows.append((
+                f"user_{rng.randrange(users)}", "", rng.choice(MOODS), score,
+                timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"), json.dumps(tags),
+                timestamp.weekday(), sentiment_bucket(score),
+            ))
+        conn.executemany(
+            "INSERT INTO journal_entries (user_id, text, mood, sentiment_score, timestamp, trigger_tags, weekday, sentiment_bucket)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+    conn.close()
+
+
+async def naive_views(db):
+    """Every row into Python, then counted; what the per-user code would do at cohort scale"""
+    from sqlalchemy import select
+    from db.models import JournalEntry
+
+    rows = (await db.execute(
+        select(JournalEntry.user_id, JournalEntry.timestamp, JournalEntry.mood, JournalEntry.sentiment_score, JournalEntry.trigger_tags)
+    )).all()
+    weekday_moods = Counter((r.timestamp.weekday(), r.mood) for r in rows)
+    weekly = Counter((r.timestamp - timedelta(days=r.timestamp.weekday())).date() for r in rows)
+    triggers = Counter(t for r in rows for t in (r.trigger_tags or {}))
+    return len(weekday_moods) + len(weekly) + len(triggers)
+
+
+async def measure(session_factory, name: str, run):
+    async with session_factory() as db:
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = await run(db)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return name, elapsed, peak, len(result) if isinstance(result, list) else result
+
+
+async def run_views(path: str, rows: int, naive: bool):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from db.analytics import COHORT_VIEWS
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    results = []
+    for name, view in COHORT_VIEWS.items():
+        results.append(await measure(session_factory, name, view))
+    if naive:
+        results.append(await measure(session_factory, "naive (all rows)", naive_views))
+    await engine.dispose()
+
+    for name, elapsed, peak, items in results:
+        print(f"{rows:>10,} {name:18} {elapsed:>9.2f} {peak / 2**20:>11.2f} {items:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cohort analytics time and memory on a synthetic entry table")
+    parser.add_argument("--steps", default="500000,1000000,2000000,5000000", help="Row counts to measure at")
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--naive-max-rows", type=int, default=1000000, help="Largest table the naive version runs on")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    create_table(args.db)
+    print(f"{'rows':>10} {'view':18} {'seconds':>9} {'peak MiB':>11} {'items':>7}")
+    print("-" * 60)
+    filled = 0
+    for step in (int(s) for s in args.steps.split(",")):
+        start = time.perf_counter()
+        fill(args.db, filled, step, args.users, rng)
+        filled = step
+        print(f"   (filled to {step:,} rows in {time.perf_counter() - start:.0f}s)")
+        asyncio.run(run_views(args.db, step, naive=step <= args.naive_max_rows))
+
+
+if __name__ == "__main__":
+    main()
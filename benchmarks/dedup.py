@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Accuracy and cost of MinHash/LSH near-duplicate detection.
+
+Generates random paragraphs and plants copies with a few words changed, so
+every copy has a known exact shingle Jaccard to its original (unrelated
+random paragraphs share almost no shingles). Each threshold is run through
+NearDuplicateIndex the way indexing does, and the dropped chunks are
+compared with the copies whose exact similarity reaches the threshold.
+
+    python benchmarks/dedup.py --chunks 20000 --duplicate-rate 0.3 --thresholds 0.7,0.85,0.95
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# Importing agents pulls in db.session, which insists on a database URL
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from agents.rag.dedup import DEDUP_NUM_PERM, NearDuplicateIndex, jaccard, minhash, shingles
+
+VOCABULARY_SIZE = 5000
+
+
+def generate(chunks: int, duplicate_rate: float, seed: int):
+    """(texts, planted): planted maps a copy's position to (original position, exact Jaccard)"""
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(VOCABULARY_SIZE)]
+    texts, planted = [], {}
+    for i in range(chunks):
+        if texts and rng.random() < duplicate_rate:
+            original = rng.randrange(len(texts))
+            words = texts[original].split()
+            for _ in range(rng.randint(0, max(1, len(words) // 8))):
+                words[rng.randrange(len(words))] = rng.choice(vocabulary)
+            texts.append(" ".join(words))
+            planted[i] = (original, jaccard(shingles(texts[original]), shingles(texts[i])))
+        else:
+            texts.append(" ".join(rng.choice(vocabulary) for _ in range(rng.randint(40, 90))))
+    return texts, planted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MinHash/LSH near-duplicate detection vs exact Jaccard")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--thresholds", default="0.7,0.85,0.95")
+    parser.add_argument("--num-perm", type=int, default=DEDUP_NUM_PERM)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    texts, planted = generate(args.chunks, args.duplicate_rate, args.seed)
+    start = time.perf_counter()
+    signatures = [minhash(text, args.num_perm) for text in texts]
+    signature_ms = (time.perf_counter() - start) * 1000 / len(texts)
+    print(f"{len(texts)} chunks, {len(planted)} planted copies, MinHash {signature_ms:.3f} ms/chunk")
+    print(f"{'threshold':>9} {'bands×rows':>10} {'true dups':>9} {'dropped':>8} {'precision':>9} {'recall':>7} {'lookup ms':>9}")
+    print("-" * 68)
+
+    for threshold in (float(t) for t in args.thresholds.split(",")):
+        index = NearDuplicateIndex(threshold, args.num_perm)
+        expected = {i for i, (_, similarity) in planted.items() if similarity >= threshold}
+        dropped = set()
+        start = time.perf_counter()
+        for i, signature in enumerate(signatures):
+            if index.find(signature) is None:
+                index.add(signature)
+            else:
+                dropped.add(i)
+        lookup_ms = (time.perf_counter() - start) * 1000 / len(signatures)
+        hits = len(dropped & expected)
+        precision = hits / len(dropped) if dropped else 1.0
+        recall = hits / len(expected) if expected else 1.0
+        print(
+            f"{threshold:>9.2f} {f'{index.bands}×{index.rows}':>10} {len(expected):>9} {len(dropped):>8} "
+            f"{precision:>9.3f} {recall:>7.3f} {lookup_ms:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Recall@k against latency for PCA-reduced embeddings.
+
+Fits the index-time PCA (agents/rag/projection.fit_pca) at each target
+dimension, projects the corpus and the queries, and compares the exact
+cosine top-k in the reduced space with the top-k at full dimension.
+
+Without --embeddings the corpus is synthetic: vectors with a power-law
+variance spectrum over a few hundred latent directions plus isotropic
+noise, which is roughly how sentence embeddings spread their variance,
+shifted by a shared mean direction (--offset, as a multiple of a typical
+row's norm; 0 for a zero-mean corpus). Real embeddings have such a common
+component, and a projection that loses it changes the cosine ranking.
+Point --embeddings at a built index's mental_health_embeddings.npy
+(before reduction) to measure the real spectrum; queries are then
+perturbed corpus rows. Native shortened vectors need the embeddings API
+and aren't covered here.
+
+    python benchmarks/dimensions.py --rows 100000 --dimensions 1536,768,512,256,128
+    python benchmarks/dimensions.py --offset 0
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# Importing agents pulls in db.session, which insists on a database URL
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from agents.rag.projection import fit_pca
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def synthetic_corpus(rows: int, dimensions: int, latent: int, offset: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    basis, _ = np.linalg.qr(rng.standard_normal((dimensions, latent)))
+    spread = (np.arange(1, latent + 1) ** -0.5).astype(np.float32)
+    mean = rng.standard_normal(dimensions).astype(np.float32)
+    mean *= offset * float(np.linalg.norm(spread)) / float(np.linalg.norm(mean))
+    corpus = np.empty((rows, dimensions), dtype=np.float32)
+    for start in range(0, rows, 65536):
+        count = min(65536, rows - start)
+        z = rng.standard_normal((count, latent), dtype=np.float32) * spread
+        corpus[start:start + count] = z @ basis.T.astype(np.float32)
+        corpus[start:start + count] += 0.01 * rng.standard_normal((count, dimensions), dtype=np.float32)
+        corpus[start:start + count] += mean
+    return corpus
+
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = matrix @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs latency of PCA-reduced embeddings")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dimensions", default="1536,768,512,256,128",
+                        help="Target dimensions; the first is the full size")
+    parser.add_argument("--embeddings", default=None, help="Real float32 .npy to use instead of synthetic vectors")
+    parser.add_argument("--latent", type=int, default=384, help="Latent directions of the synthetic corpus")
+    parser.add_argument("--offset", type=float, default=1.0,
+                        help="Norm of the synthetic corpus mean, relative to a typical row's spread around it")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    targets = [int(d) for d in args.dimensions.split(",")]
+    if args.embeddings:
+        corpus = np.load(args.embeddings).astype(np.float32)
+    else:
+        corpus = synthetic_corpus(args.rows, targets[0], args.latent, args.offset, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.choice(len(corpus), args.queries, replace=False)
+    # Noise relative to the spread around the mean, so a large offset doesn't swamp the queries
+    spread = float(np.sqrt(corpus[:10000].var(axis=0).mean()))
+    queries = corpus[picks] + 0.3 * spread * rng.standard_normal((args.queries, corpus.shape[1]), dtype=np.float32)
+
+    full = normalized(corpus)
+    truth = [set(top_k(full, q, args.top_k).tolist()) for q in normalized(queries)]
+    print(f"{len(corpus):,} vectors × {corpus.shape[1]}, {args.queries} queries, recall@{args.top_k} vs full dimension")
+    print(f"{'dims':>6} {'variance':>9} {'fit s':>6} {'MiB':>7} {f'recall@{args.top_k}':>9} {'p50 ms':>7} {'p95 ms':>7}")
+    print("-" * 58)
+
+    for dimensions in targets:
+        start = time.perf_counter()
+        if dimensions >= corpus.shape[1]:
+            projection, matrix, variance = None, full, 1.0
+        else:
+            projection = fit_pca(corpus, dimensions)
+            matrix = normalized(projection.apply(corpus))
+            variance = projection.explained_variance
+        fit_seconds = time.perf_counter() - start
+
+        latencies, recalls = [], []
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            # Same work as a retrieval: project the query, normalize, scan
+            reduced = projection.apply(query[None, :])[0] if projection is not None else query
+            hits = top_k(matrix, reduced / max(float(np.linalg.norm(reduced)), 1e-12), args.top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            recalls.append(len(expected & set(hits.tolist())) / args.top_k)
+        print(
+            f"{dimensions:>6} {variance:>9.3f} {fit_seconds:>6.1f} {matrix.nbytes / 2**20:>7.0f} "
+            f"{np.mean(recalls):>9.3f} {percentile(latencies, 50):>7.2f} {percentile(latencies, 95):>7.2f}"
+        )
+        del matrix
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Offline stand-in for the OpenAIChat-backed agents.
+
+Plugged in through registry.set_agent_factory(), so every code path above
+the agent call (prompt building, concurrency limits, usage accounting) runs
+unchanged while the model itself is replaced by a sleep drawn from a
+configurable latency distribution and a canned reply.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, Optional
+
+MOODS = [("happy", 0.7), ("anxious", -0.4), ("sad", -0.6), ("motivated", 0.6), ("stressed", -0.5), ("calm", 0.3)]
+
+
+class LatencyDistribution:
+    """
+    Parsed from a spec string:
+
+        fixed:<seconds>
+        uniform:<low>:<high>
+        lognormal:<median>:<sigma>
+    """
+
+    def __init__(self, spec: str, scale: float = 1.0):
+        self.spec = spec
+        self.scale = scale
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(self.params[0], self.params[1])
+        else:
+            median, sigma = self.params
+            value = rng.lognormvariate(0.0, sigma) * median
+        return value * self.scale
+
+
+# Rough per-agent profiles for gpt-4o-mini: short JSON answers are quicker than free text
+DEFAULT_LATENCIES = {
+    "intent": "lognormal:0.45:0.35",
+    "mood": "lognormal:0.40:0.35",
+    "mood_batch": "lognormal:2.50:0.40",
+    "response": "lognormal:0.90:0.40",
+    "rag": "lognormal:1.60:0.45",
+    "reflection": "lognormal:0.80:0.40",
+    "progress": "lognormal:1.40:0.45",
+}
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeLLMBackend:
+    """Builds fake agents that sleep, then answer with a canned reply per agent name"""
+
+    def __init__(
+        self,
+        latencies: Optional[Dict[str, str]] = None,
+        scale: float = 1.0,
+        seed: int = 42,
+        intent_for_message: Optional[Callable[[str], str]] = None,
+        batch_failure_rate: float = 0.0,
+    ):
+        specs = dict(DEFAULT_LATENCIES)
+        specs.update(latencies or {})
+        self.latencies = {name: LatencyDistribution(spec, scale) for name, spec in specs.items()}
+        self.default_latency = LatencyDistribution("lognormal:0.8:0.4", scale)
+        self.rng = random.Random(seed)
+        self.intent_for_message = intent_for_message
+        # Fraction of items a batched mood call drops or mangles, to exercise retries
+        self.batch_failure_rate = batch_failure_rate
+        self.calls = 0
+
+    def reply(self, agent_name: str, prompt: str) -> str:
+        if agent_name == "intent":
+            match = re.search(r'Message: "(.*)"', prompt, re.S)
+            message = match.group(1) if match else prompt
+            intent = self.intent_for_message(message) if self.intent_for_message else "mood_entry"
+            return json.dumps({"intent": intent, "primary_mood": None, "confidence": 0.9, "reasoning": "fake"})
+        if agent_name == "mood":
+            mood, score = self.rng.choice(MOODS)
+            return json.dumps({"mood": mood, "sentiment_score": score})
+        if agent_name == "mood_batch":
+            match = re.search(r"Entries \(JSON\):\n(\[.*?\])\n", prompt, re.S)
+            entries = json.loads(match.group(1)) if match else []
+            results = []
+            for entry in entries:
+                roll = self.rng.random()
+                if roll < self.batch_failure_rate / 2:
+                    continue
+                mood, score = self.rng.choice(MOODS)
+                if roll < self.batch_failure_rate:
+                    score = "very positive"
+                results.append({"id": entry["id"], "mood": mood, "sentiment_score": score})
+            return json.dumps(results)
+        if agent_name == "progress":
+            return "You have been steadily finding more balance this week.\nProgress score: 0.62"
+        if agent_name == "reflection":
+            return "What do you think contributed most to how you felt today?"
+        return "Thank you for sharing. Taking a few slow breaths can help you reset."
+
+    def response(self, agent_name: str, prompt: str, latency: float):
+        content = self.reply(agent_name, prompt)
+        metrics = {
+            "input_tokens": [_estimate_tokens(prompt)],
+            "output_tokens": [_estimate_tokens(content)],
+            "time": [latency],
+        }
+        return SimpleNamespace(content=content, metrics=metrics)
+
+    def latency_for(self, agent_name: str) -> float:
+        return self.latencies.get(agent_name, self.default_latency).sample(self.rng)
+
+    def build_agent(self, spec):
+        return FakeAgent(self, spec)
+
+
+class FakeAgent:
+    """Duck-types the parts of agno's Agent the app uses"""
+
+    def __init__(self, backend: FakeLLMBackend, spec):
+        self.backend = backend
+        self.name = spec.name
+        self.description = spec.description
+        self.model = SimpleNamespace(id=f"fake-{spec.model_id}")
+
+    def run(self, prompt: str):
+        latency = self.backend.latency_for(self.name)
+        self.backend.calls += 1
+        time.sleep(latency)
+        return self.backend.response(self.name, prompt, latency)
+
+    async def arun(self, prompt: str):
+        latency = self.backend.latency_for(self.name)
+        self.backend.calls += 1
+        await asyncio.sleep(latency)
+        return self.backend.response(self.name, prompt, latency)
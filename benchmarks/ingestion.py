@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Time and peak memory of knowledge base ingestion as the corpus grows.
+
+Generates a synthetic tree of markdown files and indexes it with
+agents/rag/ingest.build_index for each worker count, embedding with a fake
+embedder (random vectors, optional latency per call) so no API is needed.
+Each run is a fresh subprocess so peak RSS is its own. The "load all" mode
+is the old approach for contrast: read every file, split everything, embed
+everything in one call, then build the BM25 index from the full list.
+
+    python benchmarks/ingestion.py --files 400 --paragraphs 200 --workers 1,2,4
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# Importing agents pulls in db.session, which insists on a database URL
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+WORDS = (
+    "stress sleep breathing gratitude resilience anxiety focus routine exercise journal calm progress "
+    "support habit rest mindful walk evening morning thoughts goals kindness energy balance"
+).split()
+
+
+def generate_corpus(root: str, files: int, paragraphs: int, seed: int):
+    rng = random.Random(seed)
+    for i in range(files):
+        directory = os.path.join(root, f"topic_{i % 10}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"tips_{i}.md"), "w") as f:
+            for p in range(paragraphs):
+                if p % 5 == 0:
+                    f.write(f"## {rng.choice(WORDS).title()} {p}\n")
+                f.write(" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))) + "\n\n")
+
+
+def fake_embedder(dimensions: int, latency: float):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+
+    def embed(texts):
+        if latency:
+            time.sleep(latency)
+        return rng.standard_normal((len(texts), dimensions), dtype=np.float32)
+    return embed
+
+
+def run_one(args):
+    """Runs inside the subprocess; prints one JSON line"""
+    from agents.rag.ingest import build_index
+    from agents.rag.lexical import BM25_FILENAME, BM25Index
+    from agents.rag.loader import iter_source_files, load_and_split
+
+    embed = fake_embedder(args.dimensions, args.embed_latency)
+    output_dir = tempfile.mkdtemp(prefix="ingest_out_")
+    start = time.perf_counter()
+    if args.mode == "load-all":
+        import numpy as np
+        chunks = [c for path in iter_source_files([args.corpus]) for c in load_and_split(path)]
+        vectors = np.asarray(embed(chunks), dtype=np.float32)
+        np.save(os.path.join(output_dir, "embeddings.npy"), vectors)
+        with open(os.path.join(output_dir, "chunks.json"), "w") as f:
+            json.dump(chunks, f)
+        BM25Index.build(chunks).save(os.path.join(output_dir, BM25_FILENAME))
+        stats = {"chunks": len(chunks)}
+    else:
+        stats = build_index([args.corpus], output_dir, embed=embed, workers=args.run_workers, chroma=False)
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(output_dir)
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"chunks": stats["chunks"], "seconds": elapsed, "peak_mib": peak_mib}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming ingestion time and memory by worker count")
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--paragraphs", type=int, default=200, help="Paragraphs per file")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds per fake embedding call")
+    parser.add_argument("--seed", type=int, default=42)
+    # Internal: a single measured run
+    parser.add_argument("--corpus", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--run-workers", type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.corpus:
+        run_one(args)
+        return
+
+    corpus = tempfile.mkdtemp(prefix="ingest_corpus_")
+    try:
+        generate_corpus(corpus, args.files, args.paragraphs, args.seed)
+        size_mib = sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in os.walk(corpus) for f in fs) / 2**20
+        print(f"Corpus: {args.files} files, {size_mib:.1f} MiB, CPUs: {os.cpu_count()}")
+        print(f"{'mode':12} {'workers':>7} {'chunks':>8} {'seconds':>8} {'chunks/s':>9} {'peak MiB':>9}")
+        print("-" * 58)
+        runs = [("load-all", 1)] + [("streaming", int(w)) for w in args.workers.split(",")]
+        for mode, workers in runs:
+            output = subprocess.run(
+                [sys.executable, __file__, "--corpus", corpus, "--mode", mode, "--run-workers", str(workers),
+                 "--dimensions", str(args.dimensions), "--embed-latency", str(args.embed_latency)],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            r = json.loads(output)
+            print(f"{mode:12} {workers:>7} {r['chunks']:>8} {r['seconds']:>8.2f} {r['chunks'] / r['seconds']:>9.0f} {r['peak_mib']:>9.0f}")
+    finally:
+        shutil.rmtree(corpus, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Checks the shared LLM response cache: single-flight across processes and
+the latency of a hit.
+
+Several worker processes (like uvicorn workers) each fire the same small
+talk prompt many times at once against the fake backend. However many
+callers there are, the model must be called once per distinct prompt; the
+rest are served from the cache file or coalesced while the first call runs.
+
+    python benchmarks/llm_cache.py --workers 4 --callers 50 --prompts 3
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# Importing agents pulls in db.session, which insists on a database URL
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+MESSAGES = ["Hi there!", "Good morning, how are you?", "Thanks for the chat, bye!", "Hello again", "Hey :)"]
+
+
+def worker(cache_path: str, callers: int, prompts: int, latency: str, ready, results):
+    os.environ["LLM_CACHE_PATH"] = cache_path
+    from agents.prompts.small_talk import small_talk_prompt
+    from agents.registry import registry
+    from benchmarks.fake_llm import FakeLLMBackend
+
+    backend = FakeLLMBackend(latencies={"response": latency}, seed=os.getpid())
+    registry.set_agent_factory(backend.build_agent)
+
+    async def call(message: str):
+        start = time.perf_counter()
+        response = await registry.arun("response", small_talk_prompt.format(message=message))
+        return time.perf_counter() - start, getattr(response, "cached", False)
+
+    async def run():
+        return await asyncio.gather(*(call(MESSAGES[i % prompts]) for i in range(callers)))
+
+    # Line every worker up after the slow imports so their first misses collide
+    ready.wait()
+    timings = asyncio.run(run())
+    results.put((os.getpid(), backend.calls, timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-flight and hit latency of the shared LLM cache")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--callers", type=int, default=50, help="Concurrent calls per worker")
+    parser.add_argument("--prompts", type=int, default=3, help="Distinct prompts among the calls")
+    parser.add_argument("--latency", default="fixed:0.5", help="Fake model latency for the response agent")
+    args = parser.parse_args()
+    args.prompts = min(args.prompts, len(MESSAGES))
+
+    cache_path = os.path.join(tempfile.mkdtemp(prefix="llm_cache_bench_"), "llm_cache.db")
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    ready = context.Barrier(args.workers)
+    processes = [
+        context.Process(target=worker, args=(cache_path, args.callers, args.prompts, args.latency, ready, results))
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    model_calls = sum(calls for _, calls, _ in collected)
+    timings = [t for _, _, worker_timings in collected for t in worker_timings]
+    served = [seconds for seconds, cached in timings if cached]
+    print(f"\n{args.workers} workers x {args.callers} concurrent calls over {args.prompts} prompts")
+    print(f"model calls: {model_calls} (expected {args.prompts})")
+    print(f"served from cache or coalesced: {len(served)} of {len(timings)}")
+    for pid, calls, _ in sorted(collected):
+        print(f"  worker {pid}: {calls} model calls")
+
+    # A second round in one process: every call is now a plain hit
+    os.environ["LLM_CACHE_PATH"] = cache_path
+    from agents.registry import registry
+    from agents.prompts.small_talk import small_talk_prompt
+    from benchmarks.fake_llm import FakeLLMBackend
+
+    backend = FakeLLMBackend(latencies={"response": args.latency})
+    registry.set_agent_factory(backend.build_agent)
+
+    async def hits():
+        latencies = []
+        for i in range(200):
+            start = time.perf_counter()
+            await registry.arun("response", small_talk_prompt.format(message=MESSAGES[i % args.prompts]))
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    latencies = sorted(asyncio.run(hits()))
+    print(f"warm hits: {backend.calls} model calls, p50 {statistics.median(latencies) * 1000:.2f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms")
+    if model_calls != args.prompts or backend.calls:
+        raise SystemExit("❌ the cache called the model more than once per prompt")
+    print("✅ one model call per distinct prompt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Load test for GET /v1/history under high concurrency.
+
+Run once with the old settings and once with the new ones to compare, e.g.
+
+    DB_ECHO=true DB_POOL_SIZE=5 DB_MAX_OVERFLOW=10 python benchmarks/load_test_history.py --in-process
+    python benchmarks/load_test_history.py --in-process
+
+or point --base-url at a running server.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(client: httpx.AsyncClient, concurrency: int, total_requests: int, user_id: str) -> dict:
+    latencies = []
+    errors = 0
+    remaining = iter(range(total_requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await client.get("/v1/history", params={"user_id": user_id, "limit": 20})
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Concurrent /v1/history load test")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="Drive the FastAPI app in-process instead of over HTTP")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--user-id", default="load_test_user")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.in_process:
+        from main import app
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60)
+    else:
+        client = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60)
+
+    async with client:
+        # Warm the pool and caches so the first wave does not skew the numbers
+        await run_load(client, min(args.concurrency, 20), min(args.requests, 100), args.user_id)
+        result = await run_load(client, args.concurrency, args.requests, args.user_id)
+        if args.in_process:
+            from db.session import get_pool_stats
+            result["pool"] = get_pool_stats()
+        else:
+            result["pool"] = (await client.get("/pool")).json()
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
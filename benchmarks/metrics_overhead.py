@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Measure the per-stage overhead of the latency instrumentation and scrape /metrics.
+
+Exits non-zero if a stage costs more than the 50 µs budget or the scrape
+does not contain the expected histogram series.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from monitoring.metrics import current_intent, stage_latency, track_stage
+
+OVERHEAD_BUDGET_US = 50.0
+
+
+def measure_overhead(iterations: int) -> float:
+    """Average cost of an empty tracked stage in microseconds"""
+    current_intent.set("mood_entry")
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with track_stage("overhead_probe"):
+            pass
+    tracked = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    baseline = time.perf_counter() - start
+
+    return (tracked - baseline) / iterations * 1_000_000
+
+
+async def scrape() -> str:
+    import httpx
+    from main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://metrics") as client:
+        response = await client.get("/metrics")
+        response.raise_for_status()
+        return response.text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage instrumentation overhead check")
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--skip-scrape", action="store_true", help="Only measure overhead (no app import)")
+    args = parser.parse_args()
+
+    overhead_us = measure_overhead(args.iterations)
+    print(f"Per-stage overhead: {overhead_us:.2f} µs (budget {OVERHEAD_BUDGET_US:.0f} µs)")
+    ok = overhead_us < OVERHEAD_BUDGET_US
+
+    if not args.skip_scrape:
+        body = asyncio.run(scrape())
+        expected = [
+            '# TYPE coach_stage_latency_seconds histogram',
+            'coach_stage_latency_seconds_count{stage="overhead_probe",intent="mood_entry"}',
+            'coach_stage_latency_errors_total{stage="overhead_probe",intent="mood_entry"} 0',
+            'coach_db_pool_checked_out',
+        ]
+        missing = [line for line in expected if line not in body]
+        if missing:
+            print(f"❌ /metrics is missing: {missing}")
+            ok = False
+        else:
+            print(f"✅ /metrics scraped ({len(body.splitlines())} lines)")
+
+    stage_latency.reset()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+LLM calls and wall time for single vs batched mood analysis.
+
+Runs analyze_mood once per entry and analyze_mood_batch over the same
+entries against the fake backend in benchmarks/fake_llm.py, then reports
+calls per 1,000 entries. --failure-rate makes the fake batch agent drop or
+mangle a fraction of items so the per-item retry path is exercised:
+
+    python benchmarks/mood_batch.py --entries 1000 --failure-rate 0.05
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# Importing agents pulls in db.session, which insists on a database URL
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+SAMPLE_ENTRIES = [
+    "I feel anxious about my deadline at work tomorrow.",
+    "Today was great, I went for a run and felt really motivated.",
+    "I've been sleeping badly and feel exhausted and sad.",
+    "My partner and I argued and I'm upset about it.",
+    "Quiet day at home, read a book and felt calm.",
+    "Work piled up again and I couldn't switch off in the evening.",
+]
+
+
+async def run(args):
+    from agents.mood_tracker import analyze_mood, analyze_mood_batch, NEUTRAL_MOOD
+    from agents.registry import registry
+    from benchmarks.fake_llm import FakeLLMBackend
+
+    rng = random.Random(args.seed)
+    items = [(f"e{i}", rng.choice(SAMPLE_ENTRIES)) for i in range(args.entries)]
+    per_thousand = 1000 / args.entries
+    rows = []
+
+    backend = FakeLLMBackend(scale=args.latency_scale, seed=args.seed)
+    registry.set_agent_factory(backend.build_agent)
+    start = time.perf_counter()
+    await asyncio.gather(*(analyze_mood(text) for _, text in items))
+    rows.append(("single", backend.calls, time.perf_counter() - start, 0))
+
+    for max_entries in (int(n) for n in args.batch_sizes.split(",")):
+        backend = FakeLLMBackend(scale=args.latency_scale, seed=args.seed, batch_failure_rate=args.failure_rate)
+        registry.set_agent_factory(backend.build_agent)
+        start = time.perf_counter()
+        results = await analyze_mood_batch(items, max_entries=max_entries, token_budget=args.token_budget)
+        elapsed = time.perf_counter() - start
+        assert set(results) == {item_id for item_id, _ in items}
+        # Anything still neutral gave up after the retries (the fake backend never answers neutral)
+        fallbacks = sum(1 for r in results.values() if r == NEUTRAL_MOOD)
+        rows.append((f"batch {max_entries}", backend.calls, elapsed, fallbacks))
+
+    header = f"{'mode':10} {'calls':>7} {'calls/1k':>9} {'wall s':>8} {'fallbacks':>10}"
+    print(f"\n{args.entries} entries, failure rate {args.failure_rate}, token budget {args.token_budget}")
+    print(header)
+    print("-" * len(header))
+    for mode, calls, elapsed, fallbacks in rows:
+        print(f"{mode:10} {calls:>7} {calls * per_thousand:>9.1f} {elapsed:>8.2f} {fallbacks:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single vs batched mood analysis on a fake LLM backend")
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--batch-sizes", default="10,25,50", help="Comma separated max entries per batch")
+    parser.add_argument("--token-budget", type=int, default=3000)
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Fraction of batch items the fake model drops or mangles")
+    parser.add_argument("--latency-scale", type=float, default=0.01, help="Multiply every sampled latency")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
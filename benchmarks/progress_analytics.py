@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Checks the numpy progress analytics against the original loop versions and
+times both.
+
+Random histories are generated at several sizes; every output of the
+vectorised functions in agents/progress_agent.py must equal the reference
+output exactly (dict order included, since it ends up in the LLM prompt).
+The one exception is `variance`: Python's `**` goes through libm pow, which
+is off by one ulp for a small fraction of inputs, while numpy squares with
+correct rounding, so variance is compared to 1e-12 relative instead.
+
+    python benchmarks/progress_analytics.py --sizes 20,1000,100000
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, List
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# Importing agents pulls in db.session, which insists on a database URL
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+MOODS = ["happy", "anxious", "sad", "motivated", "stressed", "calm"]
+
+
+# --- reference implementations (the original Python loops) ----------------
+
+def reference_day_of_week(entries: List) -> Dict[str, Dict]:
+    day_moods = defaultdict(list)
+    day_sentiments = defaultdict(list)
+    for entry in entries:
+        day_name = entry.timestamp.strftime('%A')
+        day_moods[day_name].append(entry.mood)
+        day_sentiments[day_name].append(entry.sentiment_score)
+    analysis = {}
+    for day, moods in day_moods.items():
+        if len(moods) >= 2:
+            analysis[day] = {
+                'avg_sentiment': sum(day_sentiments[day]) / len(day_sentiments[day]),
+                'most_common_mood': Counter(moods).most_common(1)[0][0],
+                'entry_count': len(moods)
+            }
+    return analysis
+
+
+def reference_trends(entries: List, window_size: int = 7) -> Dict:
+    if len(entries) < window_size:
+        return {"trend": "insufficient_data", "direction": "stable"}
+    sentiments = [e.sentiment_score for e in sorted(entries, key=lambda x: x.timestamp)]
+    moving_avg = [
+        sum(sentiments[i:i + window_size]) / window_size
+        for i in range(len(sentiments) - window_size + 1)
+    ]
+    if len(moving_avg) < 2:
+        return {"trend": "insufficient_data", "direction": "stable"}
+    change = moving_avg[-1] - moving_avg[0]
+    direction = "improving" if change > 0.1 else "declining" if change < -0.1 else "stable"
+    return {
+        "trend": "analyzed",
+        "direction": direction,
+        "change_magnitude": abs(change),
+        "first_avg": moving_avg[0],
+        "last_avg": moving_avg[-1]
+    }
+
+
+def reference_direction(entries: List) -> Dict:
+    if len(entries) < 3:
+        return {"direction": "insufficient_data", "stability": "unknown"}
+    sentiments = [e.sentiment_score for e in entries]
+    first_third = sum(sentiments[:len(sentiments)//3]) / (len(sentiments)//3)
+    last_third = sum(sentiments[-len(sentiments)//3:]) / (len(sentiments)//3)
+    change = last_third - first_third
+    if change > 0.15:
+        direction = "significantly_improving"
+    elif change > 0.05:
+        direction = "slightly_improving"
+    elif change < -0.15:
+        direction = "significantly_declining"
+    elif change < -0.05:
+        direction = "slightly_declining"
+    else:
+        direction = "stable"
+    mean_sentiment = sum(sentiments) / len(sentiments)
+    variance = sum((s - mean_sentiment) ** 2 for s in sentiments) / len(sentiments)
+    stability = "very_stable" if variance < 0.1 else "moderately_stable" if variance < 0.25 else "volatile"
+    return {"direction": direction, "stability": stability, "overall_change": change, "variance": variance}
+
+
+# --------------------------------------------------------------------------
+
+def same_output(expected: Dict, actual: Dict) -> bool:
+    if list(expected) != list(actual):
+        return False
+    for key, value in expected.items():
+        if key == "variance":
+            if not math.isclose(value, actual[key], rel_tol=1e-12, abs_tol=1e-15):
+                return False
+        elif value != actual[key]:
+            return False
+    return True
+
+
+def make_entries(n: int, rng: random.Random) -> List:
+    """Newest first, like the database query; some timestamps repeat to exercise sort stability"""
+    start = datetime(2024, 1, 1)
+    entries = []
+    for i in range(n):
+        timestamp = start + timedelta(hours=rng.randrange(0, max(n, 1) * 6))
+        entries.append(SimpleNamespace(
+            timestamp=timestamp,
+            weekday=timestamp.weekday(),
+            mood=rng.choice(MOODS[:rng.randint(1, len(MOODS))]),
+            sentiment_score=round(rng.uniform(-1, 1), rng.choice([1, 2, 17])),
+            trigger_tags=None,
+        ))
+    entries.sort(key=lambda e: e.timestamp, reverse=True)
+    return entries
+
+
+def timed(fn, *args, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorised vs loop progress analytics")
+    parser.add_argument("--sizes", default="3,7,8,20,1000,100000")
+    parser.add_argument("--trials", type=int, default=20, help="Random histories checked per size")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from agents.progress_agent import (
+        MoodSeries,
+        analyze_mood_by_day_of_week,
+        analyze_mood_trends,
+        calculate_overall_mood_direction,
+    )
+
+    pairs = [
+        ("day_of_week", reference_day_of_week, analyze_mood_by_day_of_week),
+        ("trends", reference_trends, analyze_mood_trends),
+        ("direction", reference_direction, calculate_overall_mood_direction),
+    ]
+    rng = random.Random(args.seed)
+    header = f"{'entries':>8} {'analysis':12} {'loop ms':>9} {'numpy ms':>9} {'speedup':>8}"
+    print(header)
+    print("-" * len(header))
+    mismatches = 0
+    for size in (int(s) for s in args.sizes.split(",")):
+        trials = args.trials if size <= 1000 else 1
+        for trial in range(trials):
+            entries = make_entries(size, rng)
+            series, build_s = timed(MoodSeries, entries)
+            for name, reference, vectorised in pairs:
+                expected, loop_s = timed(reference, entries)
+                actual, numpy_s = timed(vectorised, series)
+                if not same_output(expected, actual):
+                    mismatches += 1
+                    print(f"❌ {name} differs at {size} entries:\n   loop:  {expected}\n   numpy: {actual}")
+                if trial == 0:
+                    speedup = loop_s / numpy_s if numpy_s else float("inf")
+                    print(f"{size:>8} {name:12} {loop_s * 1000:>9.3f} {numpy_s * 1000:>9.3f} {speedup:>7.1f}x")
+            if trial == 0:
+                print(f"{size:>8} {'(arrays)':12} {'':>9} {build_s * 1000:>9.3f}")
+
+    print("\n✅ All outputs identical" if not mismatches else f"\n❌ {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Memory, recall and latency of the quantized numpy index.
+
+Writes a synthetic clustered float32 embedding matrix of each size to a
+temporary .npy (a block at a time, so 1M × 1536 never has to fit in
+memory), computes exact top-k neighbours for a set of queries in one
+streaming pass, and then searches it with RAG_VECTOR_DTYPE float32,
+float16 and int8. The quantized runs are measured with and without exact
+rescoring of the top candidates against the memory-mapped float32 rows.
+float32 is only searched when the whole matrix fits comfortably in memory.
+
+    python benchmarks/quantization.py --sizes 100000,1000000 --queries 50
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# Importing agents pulls in db.session, which insists on a database URL
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from agents.rag.quantized import QUANTIZED_DTYPES, QuantizedVectors, quantized_path, scale_path, write_quantized
+
+BLOCK_ROWS = 65536
+
+
+def available_bytes() -> int:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def write_corpus(path: str, rows: int, dimensions: int, clusters: int, seed: int) -> np.ndarray:
+    """Rows scattered around random centres (cosine ~0.6 within a cluster); returns the centres"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimensions), dtype=np.float32)
+    header = {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)), "fortran_order": False,
+              "shape": (rows, dimensions)}
+    with open(path, "wb") as f:
+        np.lib.format.write_array_header_1_0(f, header)
+        for start in range(0, rows, BLOCK_ROWS):
+            count = min(BLOCK_ROWS, rows - start)
+            block = centres[rng.integers(0, clusters, count)]
+            block += 0.8 * rng.standard_normal((count, dimensions), dtype=np.float32)
+            f.write(block.tobytes())
+    return centres
+
+
+def exact_neighbours(full: np.ndarray, queries: np.ndarray, top_k: int) -> np.ndarray:
+    """Exact cosine top-k for every query in one pass over the (mapped) matrix"""
+    best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+    best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(full), BLOCK_ROWS):
+        block = np.array(full[start:start + BLOCK_ROWS], dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        scores = queries @ block.T
+        ids = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+        best_scores = np.concatenate([best_scores, scores], axis=1)
+        best_ids = np.concatenate([best_ids, ids], axis=1)
+        keep = np.argpartition(-best_scores, top_k - 1, axis=1)[:, :top_k]
+        best_scores = np.take_along_axis(best_scores, keep, axis=1)
+        best_ids = np.take_along_axis(best_ids, keep, axis=1)
+    return best_ids
+
+
+def measure(search, queries: np.ndarray, truth: np.ndarray, top_k: int):
+    latencies, recalls = [], []
+    search(queries[0])  # warm up
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        hits = search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(set(hits) & set(expected.tolist())) / top_k)
+    return float(np.mean(recalls)), percentile(latencies, 50), percentile(latencies, 95)
+
+
+def run_size(rows: int, args, workdir: str):
+    path = os.path.join(workdir, f"embeddings_{rows}.npy")
+    start = time.perf_counter()
+    write_corpus(path, rows, args.dimensions, args.clusters, args.seed)
+    full = np.load(path, mmap_mode="r")
+    rng = np.random.default_rng(args.seed + 1)
+    picks = np.sort(rng.choice(rows, args.queries, replace=False))
+    queries = np.asarray(full[picks], dtype=np.float32)
+    queries += 0.3 * rng.standard_normal(queries.shape, dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = exact_neighbours(full, queries, args.top_k)
+    print(f"\n{rows:,} × {args.dimensions} vectors ({rows * args.dimensions * 4 / 2**20:,.0f} MiB as float32), "
+          f"{args.queries} queries, corpus + ground truth in {time.perf_counter() - start:.0f}s")
+    print(f"{'dtype':8} {'rescore':>7} {'resident MiB':>12} {'recall@' + str(args.top_k):>9} {'p50 ms':>8} {'p95 ms':>8}")
+    print("-" * 57)
+
+    float32_bytes = rows * args.dimensions * 4
+    if float32_bytes < 0.6 * available_bytes():
+        matrix = np.load(path)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+
+        def search_float32(query):
+            scores = matrix @ query
+            top = np.argpartition(-scores, args.top_k - 1)[:args.top_k]
+            return top[np.argsort(-scores[top])].tolist()
+        recall, p50, p95 = measure(search_float32, queries, truth, args.top_k)
+        print(f"{'float32':8} {'-':>7} {matrix.nbytes / 2**20:>12,.0f} {recall:>9.3f} {p50:>8.1f} {p95:>8.1f}")
+        del matrix
+    else:
+        print(f"{'float32':8} {'-':>7} {float32_bytes / 2**20:>12,.0f} {'(does not fit in memory here)':>27}")
+
+    start = time.perf_counter()
+    write_quantized(path, QUANTIZED_DTYPES)
+    print(f"(quantized copies written in {time.perf_counter() - start:.0f}s)")
+    for dtype in QUANTIZED_DTYPES:
+        vectors = QuantizedVectors.load(path, dtype)
+        for rescore in (False, True):
+            def search_quantized(query):
+                return [i for i, _ in vectors.search(query, args.top_k, rescore=rescore)]
+            recall, p50, p95 = measure(search_quantized, queries, truth, args.top_k)
+            label = str(vectors.rescore_candidates) if rescore else "no"
+            print(f"{dtype:8} {label:>7} {vectors.nbytes / 2**20:>12,.0f} {recall:>9.3f} {p50:>8.1f} {p95:>8.1f}")
+        del vectors
+        os.remove(quantized_path(path, dtype))
+    os.remove(scale_path(path))
+    del full
+    os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized embedding index: memory, recall and latency")
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="quantization_")
+    try:
+        for rows in (int(s) for s in args.sizes.split(",")):
+            run_size(rows, args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
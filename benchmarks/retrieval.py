@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Retrieval quality and latency benchmark for the knowledge base.
+
+Runs a golden question set through the retrieval backends (vector only:
+chroma, numpy; BM25 fused with vectors: hybrid, numpy-hybrid; with the BM25
+fast path: hybrid-fast, numpy-hybrid-fast) over a grid of top_k / similarity_threshold values and reports recall@k,
+MRR, per-query latency and memory. The retrieved context is also scored
+against each question's reference answer with `comparison_prompt`: scores
+from the LLM judge are cached in benchmarks/judge_cache.json, and when no
+LLM is available the cache is used, falling back to lexical overlap for
+pairs that were never judged.
+
+    python benchmarks/retrieval.py --top-k 1,2,3 --thresholds 0.0,0.3,0.5
+    python benchmarks/retrieval.py --offline --backends chroma,hybrid
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# Importing agents pulls in db.session, which insists on a database URL
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from agents.prompts.benchmark import comparison_prompt
+
+DEFAULT_GOLDEN = os.path.join(project_root, "benchmarks", "golden_retrieval.json")
+DEFAULT_JUDGE_CACHE = os.path.join(project_root, "benchmarks", "judge_cache.json")
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB (Linux), 0 when unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def is_relevant(chunk: str, markers: List[str]) -> List[str]:
+    """Labels are text markers (usually headings) so they survive re-chunking"""
+    return [m for m in markers if m in chunk]
+
+
+class AnswerJudge:
+    """Scores answer similarity with comparison_prompt, memoised on disk"""
+
+    def __init__(self, cache_path: str, use_llm: bool):
+        self.cache_path = cache_path
+        self.use_llm = use_llm
+        self.cache: Dict[str, float] = {}
+        if os.path.exists(cache_path):
+            with open(cache_path) as f:
+                self.cache = json.load(f)
+        self.sources = {"llm": 0, "cache": 0, "lexical": 0}
+        if use_llm:
+            from agents.registry import registry
+            if "benchmark_judge" not in registry.specs:
+                registry.register(
+                    "benchmark_judge",
+                    description="You compare answers and reply only with the requested JSON.",
+                    markdown=False,
+                )
+            self.registry = registry
+
+    @staticmethod
+    def _key(system_answer: str, reference_answer: str) -> str:
+        return hashlib.sha256(f"{system_answer}\x00{reference_answer}".encode()).hexdigest()
+
+    @staticmethod
+    def lexical_similarity(a: str, b: str) -> float:
+        tokens_a = set(re.findall(r"[a-z']+", a.lower()))
+        tokens_b = set(re.findall(r"[a-z']+", b.lower()))
+        if not tokens_a or not tokens_b:
+            return 0.0
+        return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+    def score(self, system_answer: str, reference_answer: str) -> float:
+        key = self._key(system_answer, reference_answer)
+        if key in self.cache:
+            self.sources["cache"] += 1
+            return self.cache[key]
+        if self.use_llm:
+            prompt = comparison_prompt.format(system_answer=system_answer, reference_answer=reference_answer)
+            try:
+                response = self.registry.run("benchmark_judge", prompt)
+                score = float(json.loads(response.content.strip())["similarity_score"])
+                self.cache[key] = score
+                self.sources["llm"] += 1
+                return score
+            except Exception as e:
+                print(f"⚠️  Judge call failed, using lexical overlap: {e}")
+        self.sources["lexical"] += 1
+        return self.lexical_similarity(system_answer, reference_answer)
+
+    def save(self):
+        with open(self.cache_path, "w") as f:
+            json.dump(self.cache, f, indent=2, sort_keys=True)
+
+
+def load_backend(name: str):
+    from agents.rag.retriever import RAGRetriever
+    return RAGRetriever(
+        use_chroma=not name.startswith("numpy"),
+        hybrid="hybrid" in name,
+        lexical_fast_path=name.endswith("-fast"),
+    )
+
+
+def evaluate(retriever, golden: List[Dict], top_k: int, threshold: float, judge: Optional[AnswerJudge]) -> Dict:
+    latencies, recalls, reciprocal_ranks, similarities = [], [], [], []
+    lexical_before = retriever.path_counts["lexical"]
+    tracemalloc.start()
+    for item in golden:
+        start = time.perf_counter()
+        results = retriever.retrieve_relevant_chunks(item["question"], top_k=top_k, similarity_threshold=threshold)
+        latencies.append(time.perf_counter() - start)
+
+        found, first_rank = set(), None
+        for rank, result in enumerate(results, 1):
+            hits = is_relevant(result["chunk"], item["relevant"])
+            if hits and first_rank is None:
+                first_rank = rank
+            found.update(hits)
+        recalls.append(len(found) / len(item["relevant"]))
+        reciprocal_ranks.append(1.0 / first_rank if first_rank else 0.0)
+
+        if judge is not None:
+            context = "\n".join(r["chunk"] for r in results)
+            similarities.append(judge.score(context, item["reference_answer"]) if context else 0.0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "top_k": top_k,
+        "threshold": threshold,
+        "recall": sum(recalls) / len(recalls),
+        "mrr": sum(reciprocal_ranks) / len(reciprocal_ranks),
+        "answer_similarity": sum(similarities) / len(similarities) if similarities else None,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "query_peak_kb": peak / 1024,
+        # Share of queries answered by the BM25 fast path without an embedding
+        "lexical_share": (retriever.path_counts["lexical"] - lexical_before) / len(golden),
+    }
+
+
+def print_table(rows: List[Dict]):
+    header = f"{'backend':12} {'k':>3} {'thresh':>6} {'recall@k':>9} {'MRR':>6} {'ans sim':>8} {'p50 ms':>8} {'p95 ms':>8} {'lexical':>7} {'peak KB':>8} {'load MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        sim = f"{r['answer_similarity']:.3f}" if r["answer_similarity"] is not None else "-"
+        print(
+            f"{r['backend']:12} {r['top_k']:>3} {r['threshold']:>6.2f} {r['recall']:>9.3f} {r['mrr']:>6.3f} {sim:>8} "
+            f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['lexical_share']:>7.0%} {r['query_peak_kb']:>8.1f} {r['load_rss_mb']:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval recall/MRR/latency benchmark")
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN)
+    parser.add_argument("--backends", default="chroma,hybrid,hybrid-fast,numpy,numpy-hybrid,numpy-hybrid-fast")
+    parser.add_argument("--top-k", default="1,2,3")
+    parser.add_argument("--thresholds", default="0.0,0.3")
+    parser.add_argument("--offline", action="store_true", help="Never call the LLM judge; use cached or lexical scores")
+    parser.add_argument("--no-judge", action="store_true", help="Skip answer similarity entirely")
+    parser.add_argument("--judge-cache", default=DEFAULT_JUDGE_CACHE)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the result rows")
+    args = parser.parse_args()
+
+    with open(args.golden) as f:
+        golden = json.load(f)
+
+    judge = None
+    if not args.no_judge:
+        use_llm = not args.offline and bool(os.getenv("OPENAI_API_KEY"))
+        judge = AnswerJudge(args.judge_cache, use_llm)
+
+    rows = []
+    for backend in args.backends.split(","):
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        try:
+            retriever = load_backend(backend)
+        except Exception as e:
+            print(f"⚠️  Skipping {backend} backend: {e}")
+            continue
+        load_s = time.perf_counter() - start
+        load_rss = rss_mb() - rss_before
+        print(f"Loaded {backend} backend in {load_s * 1000:.1f} ms ({retriever.get_vector_store_stats()})")
+
+        try:
+            for top_k in (int(k) for k in args.top_k.split(",")):
+                for threshold in (float(t) for t in args.thresholds.split(",")):
+                    row = evaluate(retriever, golden, top_k, threshold, judge)
+                    row.update({"backend": backend, "load_ms": load_s * 1000, "load_rss_mb": load_rss})
+                    rows.append(row)
+        except Exception as e:
+            # e.g. the numpy backend needs the OpenAI embeddings API for queries
+            tracemalloc.stop()
+            print(f"⚠️  {backend} backend failed during queries: {e}")
+
+    print()
+    print_table(rows)
+    if judge is not None:
+        judge.save()
+        print(f"\nAnswer similarity sources: {judge.sources}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Throughput and memory of scripts/serve.py as the worker count grows.
+
+For each worker count the server is started with the fake LLM backend
+against a local database, driven with concurrent /v1/chat mood entries
+(retrieval, mood analysis, progress analytics and a commit per request) and
+then stopped with SIGTERM, which also checks that it shuts down gracefully.
+Memory is reported as the summed RSS of master and workers next to their
+summed PSS; the gap is what the workers share copy-on-write.
+
+    python benchmarks/server_scaling.py --workers 1,2,4 --requests 400 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from benchmarks.chat_load import MESSAGES, percentile  # noqa: E402
+
+DEFAULT_DB = os.path.join(project_root, "benchmarks", "server_scaling.db")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def process_tree(pid: int):
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return pids
+
+
+def memory_mib(pids) -> tuple:
+    """Summed RSS and PSS of the given processes"""
+    rss = pss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Rss:"):
+                        rss += int(line.split()[1])
+                    elif line.startswith("Pss:"):
+                        pss += int(line.split()[1])
+        except OSError:
+            pass
+    return rss / 1024, pss / 1024
+
+
+def create_database(path: str):
+    from sqlalchemy import create_engine
+    from db.models import Base
+
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+
+async def wait_ready(base_url: str, workers: int, timeout: float = 120):
+    """Until /ready has answered 200 often enough that every worker has likely warmed up"""
+    deadline = time.monotonic() + timeout
+    ready = 0
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+        while time.monotonic() < deadline:
+            try:
+                response = await client.get("/ready")
+                ready = ready + 1 if response.status_code == 200 else 0
+                if ready >= workers * 4:
+                    return
+            except httpx.HTTPError:
+                ready = 0
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+async def drive(base_url: str, requests: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    bodies = [
+        {"user_id": f"user_{rng.randrange(50)}", "text": rng.choice(MESSAGES["mood_entry"])}
+        for _ in range(requests)
+    ]
+    pending = iter(bodies)
+    latencies = []
+    errors = 0
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        for body in pending:
+            start = time.perf_counter()
+            try:
+                response = await client.post("/v1/chat", json=body)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "errors": errors,
+    }
+
+
+def run(workers: int, args) -> dict:
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite+aiosqlite:///{args.db}", PYTHONUNBUFFERED="1")
+    env.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    log = open(os.path.join(os.path.dirname(args.db), f"server_scaling_{workers}w.log"), "w")
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(project_root, "scripts", "serve.py"), "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--fake-llm", "--log-level", "warning"],
+        cwd=project_root, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_ready(base_url, workers))
+        asyncio.run(drive(base_url, max(args.requests // 10, workers * 4), args.concurrency, args.seed))
+        result = asyncio.run(drive(base_url, args.requests, args.concurrency, args.seed + 1))
+        result["rss_mib"], result["pss_mib"] = memory_mib(process_tree(server.pid))
+    finally:
+        start = time.perf_counter()
+        server.send_signal(signal.SIGTERM)
+        try:
+            result_code = server.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            result_code = "killed"
+        log.close()
+    result["shutdown_s"] = time.perf_counter() - start
+    result["exit_code"] = result_code
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and shared memory of the pre-forking server by worker count")
+    parser.add_argument("--workers", default="1,2,4", help="Worker counts to measure")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    create_database(args.db)
+    print(f"CPUs: {os.cpu_count()}")
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6} {'RSS MiB':>8} {'PSS MiB':>8} {'stop s':>7} {'exit':>5}")
+    print("-" * 76)
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        r = run(workers, args)
+        baseline = baseline or r["rps"]
+        print(
+            f"{workers:>7} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['errors']:>6} "
+            f"{r['rss_mib']:>8.0f} {r['pss_mib']:>8.0f} {r['shutdown_s']:>7.1f} {r['exit_code']!s:>5}"
+            f"   x{r['rps'] / baseline:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
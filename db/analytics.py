@@ -0,0 +1,214 @@
+"""
+Cohort analytics across all users, aggregated in SQL.
+
+Every view is a GROUP BY over journal_entries whose result rows are read
+through a server-side cursor in partitions of ANALYTICS_FETCH_SIZE, so the
+app never holds individual entries in memory however large the table is.
+Computed views are cached per (view, since, until) for COHORT_ANALYTICS_TTL
+seconds and paged out of the cache by the admin endpoint.
+"""
+import asyncio
+import calendar
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+from sqlalchemy import Integer, cast, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import JournalEntry
+
+ANALYTICS_FETCH_SIZE = int(os.getenv("ANALYTICS_FETCH_SIZE", "1000"))
+COHORT_ANALYTICS_TTL = float(os.getenv("COHORT_ANALYTICS_TTL", "600"))
+COHORT_ANALYTICS_CACHE_SIZE = int(os.getenv("COHORT_ANALYTICS_CACHE_SIZE", "64"))
+
+
+def _in_range(query, since: Optional[datetime], until: Optional[datetime]):
+    if since is not None:
+        query = query.where(JournalEntry.timestamp >= since)
+    if until is not None:
+        query = query.where(JournalEntry.timestamp < until)
+    return query
+
+
+def _week_start(dialect: str):
+    """Monday of the entry's week, as a SQL expression"""
+    if dialect == "postgresql":
+        return func.date(func.date_trunc("week", JournalEntry.timestamp))
+    # SQLite: forward to Sunday (or stay on it), then back to that week's Monday
+    return func.date(JournalEntry.timestamp, "weekday 0", "-6 days")
+
+
+def _trigger_rows(dialect: str):
+    """One (key, value) row per trigger in an entry's trigger_tags"""
+    json_each = func.json_each_text if dialect == "postgresql" else func.json_each
+    return json_each(JournalEntry.trigger_tags).table_valued("key", "value").alias("tags")
+
+
+async def _stream(db: AsyncSession, query):
+    result = await db.stream(query.execution_options(yield_per=ANALYTICS_FETCH_SIZE))
+    async for partition in result.partitions():
+        for row in partition:
+            yield row
+
+
+async def weekday_mood_distribution(db: AsyncSession, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[Dict]:
+    """Entry count and mood histogram per weekday, Monday first"""
+    query = _in_range(
+        select(JournalEntry.weekday, JournalEntry.mood, func.count())
+        .where(JournalEntry.weekday.is_not(None))
+        .group_by(JournalEntry.weekday, JournalEntry.mood),
+        since, until,
+    )
+    moods_by_day: Dict[int, Dict[str, int]] = {}
+    async for weekday, mood, count in _stream(db, query):
+        moods_by_day.setdefault(weekday, {})[mood] = count
+
+    days = []
+    for weekday in sorted(moods_by_day):
+        moods = dict(sorted(moods_by_day[weekday].items(), key=lambda x: x[1], reverse=True))
+        total = sum(moods.values())
+        days.append({
+            "weekday": calendar.day_name[weekday],
+            "entry_count": total,
+            "moods": moods,
+            "mood_share": {mood: round(count / total, 4) for mood, count in moods.items()},
+        })
+    return days
+
+
+async def weekly_sentiment_trend(db: AsyncSession, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[Dict]:
+    """Average sentiment, entries and active users per week, oldest first"""
+    week = _week_start(db.bind.dialect.name).label("week_start")
+    query = _in_range(
+        select(
+            week,
+            func.count(),
+            func.count(func.distinct(JournalEntry.user_id)),
+            func.avg(JournalEntry.sentiment_score),
+        )
+        .group_by(week)
+        .order_by(week),
+        since, until,
+    )
+    return [
+        {
+            # A date on Postgres, an ISO string on SQLite
+            "week_start": str(week_start),
+            "entry_count": entries,
+            "user_count": users,
+            "avg_sentiment": round(avg_sentiment, 4) if avg_sentiment is not None else None,
+        }
+        async for week_start, entries, users, avg_sentiment in _stream(db, query)
+    ]
+
+
+async def trigger_prevalence(db: AsyncSession, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[Dict]:
+    """Share of entries and users mentioning each trigger, most common first"""
+    totals = (await db.execute(_in_range(
+        select(func.count(), func.count(func.distinct(JournalEntry.user_id))), since, until,
+    ))).one()
+    total_entries, total_users = totals
+    if not total_entries:
+        return []
+
+    tags = _trigger_rows(db.bind.dialect.name)
+    entries = func.count().label("entry_count")
+    query = _in_range(
+        select(
+            tags.c.key,
+            entries,
+            func.count(func.distinct(JournalEntry.user_id)),
+            func.sum(cast(tags.c.value, Integer)),
+        )
+        .select_from(JournalEntry.__table__.join(tags, true()))
+        .group_by(tags.c.key)
+        .order_by(entries.desc(), tags.c.key),
+        since, until,
+    )
+    return [
+        {
+            "trigger": trigger,
+            "entry_count": entry_count,
+            "user_count": user_count,
+            "mentions": mentions,
+            "entry_share": round(entry_count / total_entries, 4),
+            "user_share": round(user_count / total_users, 4),
+        }
+        async for trigger, entry_count, user_count, mentions in _stream(db, query)
+    ]
+
+
+COHORT_VIEWS: Dict[str, Callable[..., Awaitable[List[Dict]]]] = {
+    "weekday_moods": weekday_mood_distribution,
+    "weekly_sentiment": weekly_sentiment_trend,
+    "triggers": trigger_prevalence,
+}
+
+
+class CohortCache:
+    """
+    TTL cache of computed views. Concurrent misses for the same key wait on
+    one computation instead of each running the full-table aggregate.
+    """
+
+    def __init__(self, ttl: float = COHORT_ANALYTICS_TTL, max_entries: int = COHORT_ANALYTICS_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Dict]" = OrderedDict()
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+
+    def _fresh(self, key: Hashable) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry["stored_at"] >= self.ttl:
+            return None
+        return entry
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[List[Dict]]]) -> Dict:
+        entry = self._fresh(key)
+        if entry is not None:
+            return entry
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another request may have filled it while we waited
+            entry = self._fresh(key)
+            if entry is None:
+                start = time.perf_counter()
+                items = await compute()
+                entry = {
+                    "items": items,
+                    "computed_at": datetime.utcnow(),
+                    "compute_seconds": round(time.perf_counter() - start, 3),
+                    "stored_at": time.monotonic(),
+                }
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._locks.pop(evicted, None)
+        return entry
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+cohort_cache = CohortCache()
+
+
+async def get_cohort_view(
+    db: AsyncSession,
+    view: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    refresh: bool = False,
+) -> Dict:
+    """A cached view's rows plus when they were computed"""
+    key = (view, since, until)
+    if refresh:
+        cohort_cache.invalidate(key)
+    return await cohort_cache.get_or_compute(key, lambda: COHORT_VIEWS[view](db, since, until))
@@ -1,22 +1,232 @@
-from sqlalchemy import select
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+from sqlalchemy import delete, func, literal, select, tuple_, union, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from db.models import JournalEntry
+from db.models import BulkImport, DailyUserMood, JournalEntry, ProgressReport
+from db.rollups import add_entry, empty_rollup, merge_rollups
 
-async def get_last_journal_entries(db: AsyncSession, user_id: str, limit: int = 3):
+async def get_last_journal_entries(
+    db: AsyncSession,
+    user_id: str,
+    limit: int = 3,
+    before: Optional[datetime] = None,
+    since: Optional[datetime] = None,
+):
+    query = select(JournalEntry).where(JournalEntry.user_id == user_id)
+    if before is not None:
+        query = query.where(JournalEntry.timestamp < before)
+    if since is not None:
+        query = query.where(JournalEntry.timestamp >= since)
+    result = await db.execute(query.order_by(JournalEntry.timestamp.desc()).limit(limit))
+    return result.scalars().all()
+
+async def get_user_entries_for_analysis(db: AsyncSession, user_id: str, limit: int = 20, before: Optional[datetime] = None):
+    """Get more entries for comprehensive pattern analysis, optionally as of `before`"""
+    query = select(JournalEntry).where(JournalEntry.user_id == user_id)
+    if before is not None:
+        query = query.where(JournalEntry.timestamp < before)
+    result = await db.execute(query.order_by(JournalEntry.timestamp.desc()).limit(limit))
+    return result.scalars().all()
+
+async def get_user_entry_features(
+    db: AsyncSession,
+    user_id: str,
+    limit: Optional[int] = 20,
+    before: Optional[datetime] = None,
+    since: Optional[datetime] = None,
+):
+    """Compact feature rows (no text) for pattern analysis, newest first; limit=None reads the whole range"""
+    query = select(
+        JournalEntry.id,
+        JournalEntry.timestamp,
+        JournalEntry.mood,
+        JournalEntry.sentiment_score,
+        JournalEntry.progress_score,
+        JournalEntry.weekday,
+        JournalEntry.sentiment_bucket,
+        JournalEntry.trigger_tags,
+    ).where(JournalEntry.user_id == user_id)
+    if before is not None:
+        query = query.where(JournalEntry.timestamp < before)
+    if since is not None:
+        query = query.where(JournalEntry.timestamp >= since)
+    query = query.order_by(JournalEntry.timestamp.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
+    return result.all()
+
+async def get_existing_client_ids(db: AsyncSession, keys: Iterable[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+    """Which (user_id, client_entry_id) pairs are already stored"""
+    keys = list(keys)
+    if not keys:
+        return set()
+    result = await db.execute(
+        select(JournalEntry.user_id, JournalEntry.client_entry_id)
+        .where(tuple_(JournalEntry.user_id, JournalEntry.client_entry_id).in_(keys))
+    )
+    return {(row.user_id, row.client_entry_id) for row in result}
+
+def _insert_for(db: AsyncSession):
+    # Both dialects we run on support ON CONFLICT DO NOTHING / DO UPDATE
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+async def bulk_insert_entries(db: AsyncSession, rows: List[Dict]) -> int:
+    """Multi-row INSERT that ignores client ids already present; returns rows inserted"""
+    if not rows:
+        return 0
+    insert = _insert_for(db)
+    statement = (
+        insert(JournalEntry)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["user_id", "client_entry_id"])
+        .returning(JournalEntry.user_id, JournalEntry.client_entry_id)
+    )
+    inserted = {(row.user_id, row.client_entry_id) for row in await db.execute(statement)}
+    # Only rows that were actually written count towards the daily rollups
+    await record_daily_mood(db, [r for r in rows if (r["user_id"], r["client_entry_id"]) in inserted])
+    await db.commit()
+    return len(inserted)
+
+def _rollups_by_day(entries: Iterable[Mapping]) -> Dict[Tuple[str, date], Dict]:
+    rollups: Dict[Tuple[str, date], Dict] = {}
+    for entry in entries:
+        # Entries that were never scored (mood analysis failed) stay out of the daily aggregates
+        if entry["sentiment_score"] is None:
+            continue
+        add_entry(rollups.setdefault((entry["user_id"], entry["timestamp"].date()), empty_rollup()), entry)
+    return rollups
+
+async def record_daily_mood(db: AsyncSession, entries: List[Mapping]):
+    """Add newly written entries to their daily_user_mood rows, inside the caller's transaction"""
+    rollups = _rollups_by_day(entries)
+    if not rollups:
+        return
+    keys = sorted(rollups)
+    insert = _insert_for(db)
+    await db.execute(
+        insert(DailyUserMood)
+        .values([{"user_id": user_id, "day": day, **empty_rollup()} for user_id, day in keys])
+        .on_conflict_do_nothing(index_elements=["user_id", "day"])
+    )
+    # Row locks, taken in key order, serialise concurrent writers of the same
+    # user-day on Postgres; SQLite already allows only one writer.
     result = await db.execute(
-        select(JournalEntry)
-        .where(JournalEntry.user_id == user_id)
-        .order_by(JournalEntry.timestamp.desc())
-        .limit(limit)
+        select(DailyUserMood.__table__)
+        .where(tuple_(DailyUserMood.user_id, DailyUserMood.day).in_(keys))
+        .order_by(DailyUserMood.user_id, DailyUserMood.day)
+        .with_for_update()
     )
+    updates = [
+        {"user_id": row.user_id, "day": row.day, **merge_rollups(row._mapping, rollups[(row.user_id, row.day)])}
+        for row in result
+    ]
+    await db.execute(update(DailyUserMood), updates)
+
+async def get_daily_mood(db: AsyncSession, user_id: str, since: Optional[date] = None):
+    """A user's daily rollups, oldest first"""
+    query = select(DailyUserMood).where(DailyUserMood.user_id == user_id)
+    if since is not None:
+        query = query.where(DailyUserMood.day >= since)
+    result = await db.execute(query.order_by(DailyUserMood.day))
     return result.scalars().all()
 
-async def get_user_entries_for_analysis(db: AsyncSession, user_id: str, limit: int = 20):
-    """Get more entries for comprehensive pattern analysis"""
+async def rebuild_daily_mood(db: AsyncSession, user_id: Optional[str] = None, since: Optional[date] = None) -> int:
+    """
+    Recompute daily_user_mood from journal_entries, one user per transaction.
+
+    Repairs drift after entries are rescored or edited outside the normal
+    write paths. Returns the number of user-days written.
+    """
+    since_at = datetime.combine(since, time.min) if since is not None else None
+    # Users with rollups but no entries left are included so their rows get cleared
+    users_query = union(select(JournalEntry.user_id), select(DailyUserMood.user_id))
+    if user_id is not None:
+        users_query = select(literal(user_id))
+    users = sorted((await db.execute(users_query)).scalars().all())
+
+    written = 0
+    for current_user in users:
+        query = select(
+            JournalEntry.user_id,
+            JournalEntry.timestamp,
+            JournalEntry.mood,
+            JournalEntry.sentiment_score,
+            JournalEntry.progress_score,
+            JournalEntry.trigger_tags,
+        ).where(JournalEntry.user_id == current_user, JournalEntry.sentiment_score.is_not(None))
+        if since_at is not None:
+            query = query.where(JournalEntry.timestamp >= since_at)
+        rows = (await db.execute(query.order_by(JournalEntry.timestamp))).all()
+        rollups = _rollups_by_day(row._mapping for row in rows)
+
+        stale = delete(DailyUserMood).where(DailyUserMood.user_id == current_user)
+        if since is not None:
+            stale = stale.where(DailyUserMood.day >= since)
+        await db.execute(stale)
+        if rollups:
+            insert = _insert_for(db)
+            await db.execute(insert(DailyUserMood).values([
+                {"user_id": key[0], "day": key[1], **rollup} for key, rollup in sorted(rollups.items())
+            ]))
+        await db.commit()
+        written += len(rollups)
+    return written
+
+async def get_active_user_ids(db: AsyncSession, since: datetime) -> List[str]:
+    """Users with at least one entry on or after the day of `since`, from the daily rollups"""
     result = await db.execute(
-        select(JournalEntry)
-        .where(JournalEntry.user_id == user_id)
-        .order_by(JournalEntry.timestamp.desc())
-        .limit(limit)
+        select(DailyUserMood.user_id).where(DailyUserMood.day >= since.date()).distinct().order_by(DailyUserMood.user_id)
     )
     return result.scalars().all()
+
+async def get_latest_entry_at(db: AsyncSession, user_id: str, since: datetime) -> Optional[datetime]:
+    """Timestamp of the user's newest entry on or after the day of `since`, from the daily rollups"""
+    result = await db.execute(
+        select(func.max(DailyUserMood.last_entry_at))
+        .where(DailyUserMood.user_id == user_id, DailyUserMood.day >= since.date())
+    )
+    return result.scalar()
+
+async def get_progress_report(db: AsyncSession, user_id: str) -> Optional[ProgressReport]:
+    return await db.get(ProgressReport, user_id)
+
+async def save_progress_report(db: AsyncSession, user_id: str, version: str, report: Mapping):
+    """Insert or replace a user's stored report; the caller commits"""
+    values = {
+        "version": version,
+        "generated_at": datetime.utcnow(),
+        "summary": report.get("summary"),
+        "score": report.get("score"),
+        "patterns": report.get("patterns"),
+    }
+    insert = _insert_for(db)
+    await db.execute(
+        insert(ProgressReport)
+        .values(user_id=user_id, **values)
+        .on_conflict_do_update(index_elements=["user_id"], set_=values)
+    )
+
+async def save_import_progress(db: AsyncSession, progress: Mapping):
+    """Insert or replace a bulk import's progress; the caller commits"""
+    values = {"status": progress["status"], "progress": dict(progress), "updated_at": datetime.utcnow()}
+    insert = _insert_for(db)
+    await db.execute(
+        insert(BulkImport)
+        .values(import_id=progress["import_id"], **values)
+        .on_conflict_do_update(index_elements=["import_id"], set_=values)
+    )
+
+async def get_import_progress(db: AsyncSession, import_id: str) -> Optional[Dict]:
+    row = await db.get(BulkImport, import_id)
+    return row.progress if row is not None else None
+
+async def delete_old_imports(db: AsyncSession, older_than_days: float) -> int:
+    """Drop progress rows not updated for a while; the caller commits"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    result = await db.execute(delete(BulkImport).where(BulkImport.updated_at < cutoff))
+    return result.rowcount
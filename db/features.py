@@ -0,0 +1,111 @@
+"""
+Values derived from a journal entry once, when it is written, so analytics
+can read small columns instead of re-parsing text on every request.
+Kept free of app imports so scripts can use it for backfills.
+"""
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import sqlalchemy as sa
+
+# Common emotional triggers and themes
+TRIGGER_KEYWORDS = {
+    'work_stress': ['work', 'job', 'boss', 'deadline', 'meeting', 'office', 'colleague'],
+    'relationship': ['partner', 'boyfriend', 'girlfriend', 'husband', 'wife', 'friend', 'family'],
+    'health': ['sick', 'pain', 'doctor', 'medicine', 'sleep', 'exercise', 'diet'],
+    'financial': ['money', 'bills', 'expenses', 'budget', 'debt', 'salary'],
+    'social': ['party', 'social', 'lonely', 'people', 'crowd', 'conversation'],
+    'personal_goals': ['goal', 'achievement', 'success', 'failure', 'progress', 'plan']
+}
+
+_KEYWORD_TRIGGERS = {
+    keyword: trigger for trigger, keywords in TRIGGER_KEYWORDS.items() for keyword in keywords
+}
+
+# One pass over the text for every keyword. Word boundaries stop "work" from
+# matching "network"; an optional plural "s" keeps "deadlines" and "friends".
+_TRIGGER_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, _KEYWORD_TRIGGERS), key=len, reverse=True)) + r")s?\b",
+    re.IGNORECASE,
+)
+
+
+def match_triggers(text: Optional[str]) -> Dict[str, int]:
+    """Count keyword occurrences per trigger type in one entry's text"""
+    if not text:
+        return {}
+    return dict(Counter(_KEYWORD_TRIGGERS[m.group(1).lower()] for m in _TRIGGER_PATTERN.finditer(text)))
+
+
+def aggregate_triggers(tags: Iterable[Optional[Dict[str, int]]]) -> Dict[str, int]:
+    """Sum stored per-entry trigger tags"""
+    totals = Counter()
+    for entry_tags in tags:
+        totals.update(entry_tags or {})
+    return dict(totals)
+
+
+# Upper edges of each sentiment bucket; scores above the last edge are very_positive
+SENTIMENT_BUCKETS = [
+    (-0.6, "very_negative"),
+    (-0.2, "negative"),
+    (0.2, "neutral"),
+    (0.6, "positive"),
+]
+
+
+def sentiment_bucket(score: Optional[float]) -> Optional[str]:
+    if score is None:
+        return None
+    for upper, name in SENTIMENT_BUCKETS:
+        if score < upper:
+            return name
+    return "very_positive"
+
+
+def derive_features(text: Optional[str], sentiment_score: Optional[float], timestamp: Optional[datetime]) -> Dict:
+    """Column values to store alongside a new or rescored entry"""
+    return {
+        "weekday": timestamp.weekday() if timestamp is not None else None,
+        "sentiment_bucket": sentiment_bucket(sentiment_score),
+        "trigger_tags": match_triggers(text),
+    }
+
+
+# The columns the backfill touches, independent of the current ORM model
+_journal_entries = sa.table(
+    "journal_entries",
+    sa.column("id", sa.Integer),
+    sa.column("text", sa.String),
+    sa.column("sentiment_score", sa.Float),
+    sa.column("timestamp", sa.DateTime),
+    sa.column("trigger_tags", sa.JSON),
+    sa.column("weekday", sa.SmallInteger),
+    sa.column("sentiment_bucket", sa.String),
+)
+
+
+def backfill_batch(connection, after_id: int = 0, batch_size: int = 1000) -> Optional[int]:
+    """Derive the feature columns for the next batch_size entries after after_id on a sync connection; returns the last id, None when done"""
+    entries = _journal_entries
+    rows = connection.execute(
+        sa.select(entries.c.id, entries.c.text, entries.c.sentiment_score, entries.c.timestamp)
+        .where(entries.c.id > after_id)
+        .order_by(entries.c.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return None
+    connection.execute(
+        entries.update()
+        .where(entries.c.id == sa.bindparam("entry_id"))
+        .values(
+            trigger_tags=sa.bindparam("trigger_tags"),
+            weekday=sa.bindparam("weekday"),
+            sentiment_bucket=sa.bindparam("sentiment_bucket"),
+        ),
+        [{"entry_id": row.id, **derive_features(row.text, row.sentiment_score, row.timestamp)} for row in rows],
+    )
+    return rows[-1].id
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, SmallInteger, String, Float, Date, DateTime, JSON, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -6,6 +6,10 @@ Base = declarative_base()
 
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
+    __table_args__ = (
+        # Lets bulk imports be retried: a client id is stored once per user
+        UniqueConstraint("user_id", "client_entry_id", name="uq_journal_entries_user_client_entry"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, index=True)
@@ -16,3 +20,52 @@ class JournalEntry(Base):
     reflection_question = Column(String, nullable=True)
     progress_summary = Column(String, nullable=True)
     progress_score = Column(Float, nullable=True)
+    client_entry_id = Column(String, nullable=True)
+    # Derived once when the entry is written (see db/features.py)
+    trigger_tags = Column(JSON, nullable=True)
+    weekday = Column(SmallInteger, nullable=True)  # 0 = Monday
+    sentiment_bucket = Column(String, nullable=True)
+
+
+class DailyUserMood(Base):
+    """Per user-day rollup of journal entries, maintained on insert (see db/rollups.py)"""
+    __tablename__ = "daily_user_mood"
+
+    user_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    entry_count = Column(Integer, nullable=False, default=0)
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    sentiment_sq_sum = Column(Float, nullable=False, default=0.0)
+    mood_counts = Column(JSON, nullable=False, default=dict)
+    trigger_counts = Column(JSON, nullable=False, default=dict)
+    # Average progress for the day is progress_sum / progress_count
+    progress_sum = Column(Float, nullable=False, default=0.0)
+    progress_count = Column(Integer, nullable=False, default=0)
+    first_entry_at = Column(DateTime, nullable=True)
+    first_sentiment = Column(Float, nullable=True)
+    last_entry_at = Column(DateTime, nullable=True)
+    last_sentiment = Column(Float, nullable=True)
+
+
+class ProgressReport(Base):
+    """Latest progress report per user, generated nightly by scripts/generate_progress_reports.py"""
+    __tablename__ = "progress_reports"
+
+    user_id = Column(String, primary_key=True)
+    # Model, prompts and analysis window the report was generated with
+    version = Column(String, nullable=False)
+    generated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    summary = Column(String, nullable=True)
+    score = Column(Float, nullable=True)
+    patterns = Column(JSON, nullable=True)
+
+
+class BulkImport(Base):
+    """Progress of a bulk import, shared by every worker that may be polled for it"""
+    __tablename__ = "bulk_imports"
+
+    import_id = Column(String, primary_key=True)
+    status = Column(String, nullable=False)
+    # The BulkImportResponse fields as last reported by the importing worker
+    progress = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,81 @@
+"""
+Per user-day aggregates of journal entries (the daily_user_mood table).
+
+Rollups are plain dicts here so the same arithmetic serves the insert path
+and the compaction job. Sums rather than averages are stored so
+two rollups of the same day can always be merged.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Mapping, Optional
+
+# Query ranges accepted by /v1/progress and /v1/insights; None = all history
+RANGE_DAYS = {"7d": 7, "30d": 30, "90d": 90, "all": None}
+
+
+def range_start(range_name: str, today: Optional[date] = None) -> Optional[date]:
+    """First day included in a range, e.g. 7d = today and the six days before it"""
+    days = RANGE_DAYS[range_name]
+    if days is None:
+        return None
+    today = today or datetime.utcnow().date()
+    return today - timedelta(days=days - 1)
+
+
+def empty_rollup() -> Dict:
+    return {
+        "entry_count": 0,
+        "sentiment_sum": 0.0,
+        "sentiment_sq_sum": 0.0,
+        "mood_counts": {},
+        "trigger_counts": {},
+        "progress_sum": 0.0,
+        "progress_count": 0,
+        "first_entry_at": None,
+        "first_sentiment": None,
+        "last_entry_at": None,
+        "last_sentiment": None,
+    }
+
+
+def add_entry(rollup: Dict, entry: Mapping) -> Dict:
+    """Fold one entry (timestamp, mood, sentiment_score, progress_score, trigger_tags) into a rollup"""
+    score = entry["sentiment_score"]
+    rollup["entry_count"] += 1
+    rollup["sentiment_sum"] += score
+    rollup["sentiment_sq_sum"] += score * score
+    rollup["mood_counts"][entry["mood"]] = rollup["mood_counts"].get(entry["mood"], 0) + 1
+    for trigger, count in (entry.get("trigger_tags") or {}).items():
+        rollup["trigger_counts"][trigger] = rollup["trigger_counts"].get(trigger, 0) + count
+    if entry.get("progress_score") is not None:
+        rollup["progress_sum"] += entry["progress_score"]
+        rollup["progress_count"] += 1
+
+    timestamp = entry["timestamp"]
+    if rollup["first_entry_at"] is None or timestamp < rollup["first_entry_at"]:
+        rollup["first_entry_at"], rollup["first_sentiment"] = timestamp, score
+    if rollup["last_entry_at"] is None or timestamp >= rollup["last_entry_at"]:
+        rollup["last_entry_at"], rollup["last_sentiment"] = timestamp, score
+    return rollup
+
+
+def merge_rollups(stored: Mapping, new: Mapping) -> Dict:
+    """Combine a stored rollup with one built from newly inserted entries"""
+    merged = {
+        "entry_count": stored["entry_count"] + new["entry_count"],
+        "sentiment_sum": stored["sentiment_sum"] + new["sentiment_sum"],
+        "sentiment_sq_sum": stored["sentiment_sq_sum"] + new["sentiment_sq_sum"],
+        "mood_counts": dict(Counter(stored["mood_counts"]) + Counter(new["mood_counts"])),
+        "trigger_counts": dict(Counter(stored["trigger_counts"]) + Counter(new["trigger_counts"])),
+        "progress_sum": stored["progress_sum"] + new["progress_sum"],
+        "progress_count": stored["progress_count"] + new["progress_count"],
+    }
+    if stored["first_entry_at"] is not None and (new["first_entry_at"] is None or stored["first_entry_at"] <= new["first_entry_at"]):
+        merged["first_entry_at"], merged["first_sentiment"] = stored["first_entry_at"], stored["first_sentiment"]
+    else:
+        merged["first_entry_at"], merged["first_sentiment"] = new["first_entry_at"], new["first_sentiment"]
+    if new["last_entry_at"] is not None and (stored["last_entry_at"] is None or new["last_entry_at"] >= stored["last_entry_at"]):
+        merged["last_entry_at"], merged["last_sentiment"] = new["last_entry_at"], new["last_sentiment"]
+    else:
+        merged["last_entry_at"], merged["last_sentiment"] = stored["last_entry_at"], stored["last_sentiment"]
+    return merged
@@ -1,4 +1,8 @@
 import os
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Optional
 from dotenv import load_dotenv
 
 # Load .env manually from the root directory
@@ -6,17 +10,142 @@ from pathlib import Path
 env_path = Path(__file__).resolve().parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set or loaded.")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+DB_ECHO = _env_bool("DB_ECHO", False)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+
+class PoolStats:
+    """Running counters for connection checkouts and time spent waiting on the pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        if seconds > self.wait_seconds_max:
+            self.wait_seconds_max = seconds
+
+
+pool_stats = PoolStats()
+
+# Seconds spent opening new connections during the current checkout. Every async
+# checkout runs in its own greenlet, and each greenlet has its own context.
+_checkout_connect_seconds: ContextVar[Optional[float]] = ContextVar("checkout_connect_seconds", default=None)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a free connection"""
+
+    def _do_get(self):
+        if _checkout_connect_seconds.get() is not None:
+            # QueuePool retries itself after losing an overflow race; the outer call is timed
+            return super()._do_get()
+        start = time.perf_counter()
+        token = _checkout_connect_seconds.set(0.0)
+        try:
+            return super()._do_get()
+        finally:
+            connect_seconds = _checkout_connect_seconds.get()
+            _checkout_connect_seconds.reset(token)
+            # Opening an overflow connection is connect latency, not waiting on the pool
+            pool_stats.record_wait(max(time.perf_counter() - start - connect_seconds, 0.0))
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            connect_seconds = _checkout_connect_seconds.get()
+            if connect_seconds is not None:
+                _checkout_connect_seconds.set(connect_seconds + time.perf_counter() - start)
+
+
+def _connect_args() -> dict:
+    if DATABASE_URL.startswith("postgresql+asyncpg"):
+        # asyncpg's own statement cache plus SQLAlchemy's prepared statement cache
+        # on the adapted connection; both are per connection.
+        return {
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        }
+    if DATABASE_URL.startswith("sqlite"):
+        # Local/benchmark databases: wait for the write lock instead of failing
+        return {"timeout": DB_POOL_TIMEOUT}
+    return {}
+
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=DB_ECHO,
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args=_connect_args(),
+)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+
+def _reset_pool_after_fork():
+    # Connections inherited from the parent belong to it; start with an empty pool
+    engine.sync_engine.dispose(close=False)
+    pool_stats.__init__()
+
+
+os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+def get_pool_stats() -> dict:
+    """Snapshot of pool saturation for the status endpoints"""
+    pool = engine.pool
+    checkouts = pool_stats.checkouts
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts_total": checkouts,
+        "wait_seconds_total": round(pool_stats.wait_seconds_total, 6),
+        "wait_seconds_avg": round(pool_stats.wait_seconds_total / checkouts, 6) if checkouts else 0.0,
+        "wait_seconds_max": round(pool_stats.wait_seconds_max, 6),
+    }
+
+async def prefill_pool(connections: int) -> int:
+    """Open up to `connections` pooled connections so the first requests skip the handshake"""
+    connections = min(connections, engine.pool.size())
+
+    async def _checkout():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(_checkout() for _ in range(connections)))
+    return connections
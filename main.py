@@ -1,13 +1,39 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from agents.rag.knowledge_index import KNOWLEDGE_RELOAD_INTERVAL, watch_knowledge_base
+from agents.rag_response_agent import rag_retriever
+from db.session import engine
+from monitoring.llm_usage import tag_route
+from monitoring.warmup import warm_up
 from router import api_routers_v1, status
 
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so the liveness probe answers immediately;
+    # /ready flips to 200 once every component has been touched once.
+    warmup_task = asyncio.create_task(warm_up())
+    # Pick up newly published knowledge base versions without a restart
+    reload_task = None
+    if KNOWLEDGE_RELOAD_INTERVAL > 0:
+        reload_task = asyncio.create_task(watch_knowledge_base(rag_retriever))
+    yield
+    warmup_task.cancel()
+    if reload_task is not None:
+        reload_task.cancel()
+    # In-flight requests have finished by now; close pooled connections cleanly
+    await engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan, dependencies=[Depends(tag_route)])
 
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1 @@
+# Runtime health, readiness and metrics helpers
@@ -0,0 +1,186 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import Request
+
+LLM_USAGE_BUFFER_SIZE = int(os.getenv("LLM_USAGE_BUFFER_SIZE", "10000"))
+LLM_USAGE_LOG_PATH = os.getenv("LLM_USAGE_LOG_PATH")
+
+# Set per request by tag_route so agent calls deep in the stack know which
+# endpoint they were made for.
+current_route: ContextVar[str] = ContextVar("current_route", default="background")
+
+
+async def tag_route(request: Request):
+    """App-level dependency that records the matched route template for attribution"""
+    template = getattr(request.scope.get("route"), "path", None)
+    if template is None:
+        current_route.set(request.url.path)
+        return
+    # Depending on the FastAPI version the matched template may or may not
+    # carry the include_router prefix; rebuild it from the concrete path so
+    # "/v1/progress/{user_id}" is reported the same way everywhere.
+    template_parts = [p for p in template.split("/") if p]
+    path_parts = [p for p in request.url.path.split("/") if p]
+    prefix = path_parts[:max(len(path_parts) - len(template_parts), 0)]
+    current_route.set("/" + "/".join(prefix + template_parts))
+
+
+def _metric_value(metrics: Any, name: str) -> Optional[float]:
+    """Read one metric from an agno run response, whichever shape it comes in"""
+    if metrics is None:
+        return None
+    value = metrics.get(name) if isinstance(metrics, dict) else getattr(metrics, name, None)
+    if isinstance(value, (list, tuple)):
+        values = [v for v in value if v is not None]
+        return sum(values) if values else None
+    return value
+
+
+class LLMUsageLog:
+    """Bounded in-memory log of LLM calls with an optional JSONL file sink"""
+
+    def __init__(self, max_records: int = LLM_USAGE_BUFFER_SIZE, log_path: Optional[str] = LLM_USAGE_LOG_PATH):
+        self.records = deque(maxlen=max_records)
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        # Lines for the file sink, written by a background thread so the event loop never does file I/O
+        self._lines: Optional[queue.SimpleQueue] = None
+        self._writer: Optional[threading.Thread] = None
+        self._writer_pid: Optional[int] = None
+
+    def _write_lines(self, lines: queue.SimpleQueue):
+        with open(self.log_path, "a") as f:
+            while True:
+                line = lines.get()
+                # Write whatever else is already queued before flushing once
+                while line is not None:
+                    f.write(line)
+                    try:
+                        line = lines.get_nowait()
+                    except queue.Empty:
+                        break
+                f.flush()
+                if line is None:
+                    return
+
+    def _sink(self) -> queue.SimpleQueue:
+        # Threads don't survive a fork, so each worker process starts its own writer
+        if self._writer_pid != os.getpid():
+            self._lines = queue.SimpleQueue()
+            self._writer = threading.Thread(
+                target=self._write_lines, args=(self._lines,), name="llm-usage-writer", daemon=True
+            )
+            self._writer.start()
+            self._writer_pid = os.getpid()
+        return self._lines
+
+    def close(self):
+        """Flush the file sink and stop its writer"""
+        with self._lock:
+            if self._writer is None or self._writer_pid != os.getpid():
+                return
+            self._lines.put(None)
+            writer, self._writer, self._writer_pid = self._writer, None, None
+        writer.join(timeout=5)
+
+    def record(
+        self,
+        agent: str,
+        latency_s: float,
+        response: Any = None,
+        error: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        metrics = getattr(response, "metrics", None)
+        ttft = _metric_value(metrics, "time_to_first_token")
+        entry = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "agent": agent,
+            "route": current_route.get(),
+            "model": model,
+            "input_tokens": _metric_value(metrics, "input_tokens"),
+            "output_tokens": _metric_value(metrics, "output_tokens"),
+            "latency_ms": round(latency_s * 1000, 2),
+            "time_to_first_token_ms": round(ttft * 1000, 2) if ttft is not None else None,
+            "error": error,
+        }
+        with self._lock:
+            self.records.append(entry)
+            if self.log_path:
+                self._sink().put(json.dumps(entry) + "\n")
+        return entry
+
+    def query(self, agent: Optional[str] = None, route: Optional[str] = None, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = list(self.records)
+        since_iso = since.isoformat() if since else None
+        return [
+            r for r in records
+            if (agent is None or r["agent"] == agent)
+            and (route is None or r["route"] == route)
+            and (since_iso is None or r["timestamp"] >= since_iso)
+        ]
+
+    def summarize(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Aggregate calls, tokens and latency per (agent, route)"""
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for r in records:
+            groups.setdefault((r["agent"], r["route"]), []).append(r)
+
+        summary = []
+        for (agent, route), rows in sorted(groups.items()):
+            latencies = sorted(r["latency_ms"] for r in rows)
+            ttfts = [r["time_to_first_token_ms"] for r in rows if r["time_to_first_token_ms"] is not None]
+            summary.append({
+                "agent": agent,
+                "route": route,
+                "calls": len(rows),
+                "errors": sum(1 for r in rows if r["error"]),
+                "input_tokens": sum(r["input_tokens"] or 0 for r in rows),
+                "output_tokens": sum(r["output_tokens"] or 0 for r in rows),
+                "avg_latency_ms": round(sum(latencies) / len(latencies), 2),
+                "p95_latency_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+                "avg_time_to_first_token_ms": round(sum(ttfts) / len(ttfts), 2) if ttfts else None,
+            })
+        return summary
+
+
+llm_usage = LLMUsageLog()
+atexit.register(llm_usage.close)
+
+
+def _model_id(agent) -> Optional[str]:
+    return getattr(getattr(agent, "model", None), "id", None)
+
+
+def run_agent(name: str, agent, prompt: str):
+    """agent.run() with token and latency accounting under `name`"""
+    start = time.perf_counter()
+    try:
+        response = agent.run(prompt)
+    except Exception as e:
+        llm_usage.record(name, time.perf_counter() - start, error=str(e), model=_model_id(agent))
+        raise
+    llm_usage.record(name, time.perf_counter() - start, response, model=_model_id(agent))
+    return response
+
+
+async def arun_agent(name: str, agent, prompt: str):
+    """agent.arun() with token and latency accounting under `name`"""
+    start = time.perf_counter()
+    try:
+        response = await agent.arun(prompt)
+    except Exception as e:
+        llm_usage.record(name, time.perf_counter() - start, error=str(e), model=_model_id(agent))
+        raise
+    llm_usage.record(name, time.perf_counter() - start, response, model=_model_id(agent))
+    return response
@@ -0,0 +1,167 @@
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Tuple
+
+# Latency buckets in seconds, tuned for a pipeline of LLM calls and DB round trips
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# The intent is only known after classification, so intent detection sets it
+# here as it finishes; its own stage and every stage timed further down the
+# same request pick it up when they record.
+current_intent: ContextVar[str] = ContextVar("current_intent", default="unknown")
+
+
+class StageHistogram:
+    """Prometheus-style histogram with count, sum and error count per (stage, intent)"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, str], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, intent: str, seconds: float, error: bool = False):
+        key = (stage, intent)
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [bucket counts..., +Inf count], sum, count, errors
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+            if error:
+                series[3] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, str], Dict]:
+        with self._lock:
+            return {
+                key: {"buckets": list(s[0]), "sum": s[1], "count": s[2], "errors": s[3]}
+                for key, s in self._series.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name}_seconds {self.help_text}",
+            f"# TYPE {self.name}_seconds histogram",
+        ]
+        error_lines = [
+            f"# HELP {self.name}_errors_total Stage invocations that raised an exception",
+            f"# TYPE {self.name}_errors_total counter",
+        ]
+        for (stage, intent), data in sorted(self.snapshot().items()):
+            labels = f'stage="{stage}",intent="{intent}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, data["buckets"]):
+                cumulative += count
+                lines.append(f'{self.name}_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_seconds_bucket{{{labels},le="+Inf"}} {data["count"]}')
+            lines.append(f"{self.name}_seconds_sum{{{labels}}} {data['sum']:.6f}")
+            lines.append(f"{self.name}_seconds_count{{{labels}}} {data['count']}")
+            error_lines.append(f"{self.name}_errors_total{{{labels}}} {data['errors']}")
+        return lines + error_lines
+
+
+stage_latency = StageHistogram("coach_stage_latency", "Latency of each /v1/chat pipeline stage")
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Time a block of code as one pipeline stage; cancellations are timed but not errors"""
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        stage_latency.observe(stage, current_intent.get(), time.perf_counter() - start, error)
+
+
+def timed_stage(stage: str):
+    """Decorator form of track_stage for both sync and async functions"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track_stage(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _gauge(name: str, help_text: str, value) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+
+
+def render_metrics() -> str:
+    """Render every metric in the Prometheus text exposition format"""
+    from agents.context_budget import prompt_budget_stats
+    from agents.llm_cache import llm_cache
+    from agents.rag_response_agent import rag_retriever
+    from agents.registry import registry
+    from db.session import get_pool_stats
+    from monitoring.warmup import readiness
+
+    lines = stage_latency.render()
+
+    pool = get_pool_stats()
+    lines += _gauge("coach_db_pool_size", "Configured pool size", pool["pool_size"])
+    lines += _gauge("coach_db_pool_checked_out", "Connections currently checked out", pool["checked_out"])
+    lines += _gauge("coach_db_pool_overflow", "Overflow connections currently open", pool["overflow"])
+    lines += [
+        "# HELP coach_db_pool_wait_seconds Time spent waiting for a pooled connection",
+        "# TYPE coach_db_pool_wait_seconds summary",
+        f"coach_db_pool_wait_seconds_sum {pool['wait_seconds_total']}",
+        f"coach_db_pool_wait_seconds_count {pool['checkouts_total']}",
+    ]
+
+    llm = registry.stats()
+    scopes = [("global", llm["global"])] + list(llm["agents"].items())
+    for metric, help_text, field in (
+        ("coach_llm_in_flight", "LLM calls currently running", "in_flight"),
+        ("coach_llm_waiting", "LLM calls queued on a concurrency limit", "waiting"),
+        ("coach_llm_concurrency_limit", "Configured LLM concurrency limit", "limit"),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+        lines += [f'{metric}{{scope="{scope}"}} {stats[field]}' for scope, stats in scopes]
+    lines += [
+        "# HELP coach_llm_queue_wait_seconds Time LLM calls spent queued on concurrency limits",
+        "# TYPE coach_llm_queue_wait_seconds summary",
+    ]
+    for scope, stats in scopes:
+        lines.append(f'coach_llm_queue_wait_seconds_sum{{scope="{scope}"}} {stats["wait_seconds_total"]}')
+        lines.append(f'coach_llm_queue_wait_seconds_count{{scope="{scope}"}} {stats["acquired_total"]}')
+
+    lines += prompt_budget_stats.render()
+    lines += [
+        "# HELP coach_llm_cache_requests_total LLM cache lookups by outcome (hit, miss, coalesced, error; rejected = misses not stored as invalid)",
+        "# TYPE coach_llm_cache_requests_total counter",
+    ]
+    for agent, counts in llm_cache.stats()["agents"].items():
+        lines += [f'coach_llm_cache_requests_total{{agent="{agent}",result="{result}"}} {n}' for result, n in counts.items()]
+    lines += [
+        "# HELP coach_retrieval_total Knowledge base retrievals by path (lexical fast path, hybrid, vector only)",
+        "# TYPE coach_retrieval_total counter",
+    ]
+    lines += [f'coach_retrieval_total{{path="{path}"}} {n}' for path, n in rag_retriever.path_counts.items()]
+    lines += _gauge("coach_ready", "1 once the warm-up routine has completed", int(readiness.ready))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", "5"))
+WARMUP_QUERY = "How can I manage stress?"
+
+
+class ReadinessState:
+    """Tracks warm-up progress so /ready can report it without doing any work"""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.components: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, latency_ms: float, ok: bool, detail: Any = None):
+        self.components[name] = {
+            "ok": ok,
+            "latency_ms": round(latency_ms, 2),
+            "detail": detail,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        total_ms = None
+        if self.started_at is not None and self.finished_at is not None:
+            total_ms = round((self.finished_at - self.started_at) * 1000, 2)
+        return {
+            "status": "ready" if self.ready else ("failed" if self.finished_at else "warming_up"),
+            "total_warmup_ms": total_ms,
+            "components": self.components,
+        }
+
+
+readiness = ReadinessState()
+
+
+async def _timed(name: str, step: Callable[[], Awaitable[Any]]):
+    start = time.perf_counter()
+    try:
+        detail = await step()
+        readiness.record(name, (time.perf_counter() - start) * 1000, True, detail)
+    except Exception as e:
+        print(f"⚠️  Warm-up step '{name}' failed: {e}")
+        readiness.record(name, (time.perf_counter() - start) * 1000, False, str(e))
+
+
+async def _warm_vector_store():
+    # Importing the agent opens the Chroma client; the first query loads the
+    # local embedding model used by the collection.
+    from agents.rag_response_agent import rag_retriever
+
+    results = await asyncio.to_thread(rag_retriever.retrieve_relevant_chunks, WARMUP_QUERY, 1)
+    return {"index_type": rag_retriever.get_vector_store_stats().get("index_type"), "hits": len(results)}
+
+
+async def _warm_db_pool():
+    from db.session import prefill_pool
+
+    opened = await prefill_pool(WARMUP_DB_CONNECTIONS)
+    return {"connections": opened}
+
+
+async def _warm_token_counter():
+    # tiktoken downloads its encoding on first use; do that before traffic arrives
+    from agents.context_budget import _get_encoder
+
+    encoder = await asyncio.to_thread(_get_encoder)
+    return {"encoding": encoder.name if encoder is not None else "length estimate"}
+
+
+async def warm_up():
+    """Run every warm-up step once and mark the worker ready"""
+    readiness.started_at = time.perf_counter()
+    await _timed("vector_store", _warm_vector_store)
+    await _timed("db_pool", _warm_db_pool)
+    await _timed("token_counter", _warm_token_counter)
+    readiness.finished_at = time.perf_counter()
+    readiness.ready = all(c["ok"] for c in readiness.components.values())
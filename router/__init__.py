@@ -2,5 +2,7 @@ from router.v1.chat import router as chat
 from router.v1.progress import router as progress
 from router.v1.history import router as history
 from router.v1.insights import router as insights
+from router.v1.entries import router as entries
+from router.v1.admin import router as admin
 
-api_routers_v1 = [chat, progress, history, insights]
+api_routers_v1 = [chat, progress, history, insights, entries, admin]
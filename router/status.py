@@ -1,5 +1,8 @@
 from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from db.session import get_pool_stats
+from monitoring.metrics import render_metrics
+from monitoring.warmup import readiness
 
 router = APIRouter(prefix="", tags=["status"])
 
@@ -7,3 +10,22 @@ router = APIRouter(prefix="", tags=["status"])
 @router.get("/")
 async def root():
     return JSONResponse(status_code=200, content={"status": "ok"})
+
+
+@router.get("/ready")
+async def ready():
+    """Readiness probe: 200 only once the warm-up routine has completed"""
+    status_code = 200 if readiness.ready else 503
+    return JSONResponse(status_code=status_code, content=readiness.to_dict())
+
+
+@router.get("/pool")
+async def pool():
+    """Connection pool saturation: checked-out, overflow and checkout wait time"""
+    return JSONResponse(status_code=200, content=get_pool_stats())
+
+
+@router.get("/metrics")
+async def metrics():
+    """Per-stage latency histograms and pool gauges in Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,129 @@
+import asyncio
+import hmac
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from agents.llm_cache import llm_cache
+from agents.rag_response_agent import rag_retriever
+from agents.registry import registry
+from db.analytics import COHORT_VIEWS, get_cohort_view
+from db.session import get_db
+from monitoring.llm_usage import llm_usage
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin routes need the X-Admin-Token header to match ADMIN_TOKEN; without ADMIN_TOKEN they are closed"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin routes are disabled: ADMIN_TOKEN is not set")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/llm-usage", status_code=status.HTTP_200_OK)
+async def get_llm_usage(
+    agent: Optional[str] = None,
+    route: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = Query(100, ge=0, le=10000),
+):
+    """Token and latency totals per (agent, route) plus the most recent raw calls"""
+    records = llm_usage.query(agent=agent, route=route, since=since)
+    return {
+        "total_calls": len(records),
+        "summary": llm_usage.summarize(records),
+        "recent": records[-limit:] if limit else [],
+    }
+
+
+@router.get("/llm-usage/export")
+async def export_llm_usage(
+    agent: Optional[str] = None,
+    route: Optional[str] = None,
+    since: Optional[datetime] = None,
+):
+    """Every buffered LLM call as JSONL for offline analysis"""
+    records = llm_usage.query(agent=agent, route=route, since=since)
+    return StreamingResponse(
+        (json.dumps(r) + "\n" for r in records),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=llm_usage.jsonl"},
+    )
+
+
+@router.get("/llm-concurrency", status_code=status.HTTP_200_OK)
+async def get_llm_concurrency():
+    """In-flight calls, queue depth and queue wait time for the global and per-agent limits"""
+    return registry.stats()
+
+
+@router.get("/llm-cache", status_code=status.HTTP_200_OK)
+async def get_llm_cache():
+    """Hits, misses and coalesced waits per agent for the shared LLM response cache, plus each agent's TTL"""
+    stats = llm_cache.stats()
+    stats["ttl_seconds"] = {name: spec.cache_ttl if spec.cached else 0 for name, spec in sorted(registry.specs.items())}
+    return stats
+
+
+@router.post("/llm-cache/purge", status_code=status.HTTP_200_OK)
+async def purge_llm_cache():
+    """Delete expired responses and stale fill leases"""
+    return {"removed": await asyncio.to_thread(llm_cache.purge_expired)}
+
+
+@router.get("/knowledge", status_code=status.HTTP_200_OK)
+async def get_knowledge_version():
+    """Knowledge index version serving this worker, versions still draining and versions on disk"""
+    return rag_retriever.get_version_stats()
+
+
+@router.post("/knowledge/reload", status_code=status.HTTP_200_OK)
+async def reload_knowledge():
+    """Check for a newly published version now instead of waiting for the watcher (this worker only)"""
+    version = await asyncio.to_thread(rag_retriever.reload)
+    return {"reloaded": version is not None, "active": rag_retriever.index.version}
+
+
+@router.get("/analytics/cohort/{view}", status_code=status.HTTP_200_OK)
+async def get_cohort_analytics(
+    view: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=1000),
+    refresh: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Aggregates across all users: weekday_moods, weekly_sentiment or triggers.
+
+    Computed in SQL and cached (COHORT_ANALYTICS_TTL); pages are served from
+    the cached result. refresh=true recomputes it.
+    """
+    if view not in COHORT_VIEWS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown view {view!r}; expected one of {sorted(COHORT_VIEWS)}",
+        )
+    result = await get_cohort_view(db, view, since=since, until=until, refresh=refresh)
+    start = (page - 1) * page_size
+    return {
+        "view": view,
+        "since": since,
+        "until": until,
+        "computed_at": result["computed_at"],
+        "compute_seconds": result["compute_seconds"],
+        "total_items": len(result["items"]),
+        "page": page,
+        "page_size": page_size,
+        "items": result["items"][start:start + page_size],
+    }
@@ -1,15 +1,19 @@
+from datetime import datetime
 from sqlalchemy import select, desc
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from agents.chat_router_agent import detect_intent_with_history, handle_off_topic, handle_small_talk, handle_mood_entry_with_rag
 from agents.reflection_agent import get_reflection_question
 from db.session import get_db
+from db.crud import record_daily_mood
 from db.models import JournalEntry
 from agents.mood_tracker import analyze_mood
 from schemas.api_requests import JournalEntryRequest
 from schemas.api_responses import ChatResponse
 from agents.progress_agent import get_progress_summary
 from agents.rag.retriever import RAGRetriever
+from db.features import derive_features
+from monitoring.metrics import track_stage
 
 router = APIRouter(tags=["chat"])
 
@@ -19,14 +23,14 @@ async def stream_chat(entry: JournalEntryRequest, db: AsyncSession = Depends(get
     intent = intent_data["intent"]
 
     if intent == "small_talk":
-        reply = handle_small_talk(entry.text)
+        reply = await handle_small_talk(entry.text)
         return ChatResponse(reply=reply, intent=intent)
 
     elif intent == "off_topic":
-        reply = handle_off_topic(entry.text)
+        reply = await handle_off_topic(entry.text)
         return ChatResponse(reply=reply, intent=intent)
 
-    result = analyze_mood(entry.text)
+    result = await analyze_mood(entry.text)
     
     rag_response = await handle_mood_entry_with_rag(
         message=entry.text,
@@ -41,6 +45,7 @@ async def stream_chat(entry: JournalEntryRequest, db: AsyncSession = Depends(get
     summary = progress_data.get("summary")
     score = progress_data.get("score")
 
+    timestamp = datetime.utcnow()
     journal_entry = JournalEntry(
         user_id=entry.user_id,
         text=entry.text,
@@ -49,11 +54,22 @@ async def stream_chat(entry: JournalEntryRequest, db: AsyncSession = Depends(get
         reflection_question=reflection_question,
         progress_summary=summary,
         progress_score=score,
+        timestamp=timestamp,
+        **derive_features(entry.text, result["sentiment_score"], timestamp),
     )
 
-    db.add(journal_entry)
-    await db.commit()
-    await db.refresh(journal_entry)
+    with track_stage("db_commit"):
+        db.add(journal_entry)
+        await record_daily_mood(db, [{
+            "user_id": entry.user_id,
+            "timestamp": timestamp,
+            "mood": result["mood"],
+            "sentiment_score": result["sentiment_score"],
+            "progress_score": score,
+            "trigger_tags": journal_entry.trigger_tags,
+        }])
+        await db.commit()
+        await db.refresh(journal_entry)
 
     return ChatResponse(
         reply=rag_response["reply"],
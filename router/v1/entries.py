@@ -0,0 +1,162 @@
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from agents.mood_tracker import analyze_mood_batch
+from db.features import derive_features
+from db.crud import (
+    bulk_insert_entries,
+    delete_old_imports,
+    get_existing_client_ids,
+    get_import_progress,
+    save_import_progress,
+)
+from db.session import get_db
+from schemas.api_requests import BulkJournalEntry
+from schemas.api_responses import BulkImportResponse
+
+router = APIRouter(tags=["entries"])
+
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "500"))
+MAX_REPORTED_ERRORS = 50
+# Progress rows are kept in bulk_imports so any worker can answer a poll
+BULK_IMPORT_RETENTION_DAYS = float(os.getenv("BULK_IMPORT_RETENTION_DAYS", "7"))
+
+
+async def _analyze_in_batches(entries: List[BulkJournalEntry]) -> int:
+    """Fill in mood/sentiment for entries that came without one; returns how many were analysed"""
+    pending = [e for e in entries if e.mood is None or e.sentiment_score is None]
+    if not pending:
+        return 0
+    # Index-based ids: client ids are only unique per user
+    results = await analyze_mood_batch([(str(i), e.text) for i, e in enumerate(pending)])
+    for i, entry in enumerate(pending):
+        result = results[str(i)]
+        entry.mood = result["mood"]
+        entry.sentiment_score = result["sentiment_score"]
+    return len(pending)
+
+
+async def _flush(db: AsyncSession, chunk: List[BulkJournalEntry], progress: Dict):
+    keys = {(e.user_id, e.client_id) for e in chunk}
+    existing = await get_existing_client_ids(db, keys)
+
+    fresh, seen = [], set()
+    for entry in chunk:
+        key = (entry.user_id, entry.client_id)
+        if key in existing or key in seen:
+            progress["skipped_existing"] += 1
+            continue
+        seen.add(key)
+        fresh.append(entry)
+
+    # Analysis errors propagate before anything is written: the chunk fails as a
+    # whole, and re-sending the file analyses its entries again
+    progress["analyzed"] += await _analyze_in_batches(fresh)
+
+    rows = []
+    for e in fresh:
+        timestamp = e.timestamp or datetime.utcnow()
+        rows.append({
+            "user_id": e.user_id,
+            "client_entry_id": e.client_id,
+            "text": e.text,
+            "mood": e.mood,
+            "sentiment_score": e.sentiment_score,
+            "timestamp": timestamp,
+            **derive_features(e.text, e.sentiment_score, timestamp),
+        })
+    inserted = await bulk_insert_entries(db, rows)
+    progress["inserted"] += inserted
+    # Rows that lost a race with a concurrent import of the same ids
+    progress["skipped_existing"] += len(rows) - inserted
+    if chunk:
+        progress["last_client_id"] = chunk[-1].client_id
+    await save_import_progress(db, progress)
+    await db.commit()
+
+
+@router.post("/entries/bulk", status_code=status.HTTP_200_OK, response_model=BulkImportResponse)
+async def bulk_import(request: Request, import_id: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    """
+    Import journal entries from an NDJSON body, one BulkJournalEntry per line.
+
+    The body is processed as it streams in: entries are buffered into chunks,
+    mood is analysed in batches for entries that don't carry one, and each
+    chunk is written with a single multi-row INSERT. Client ids already stored
+    for a user are skipped, so an interrupted import can simply be re-sent.
+    Reflection questions, RAG replies and progress summaries are not
+    generated for imported entries.
+    """
+    import_id = import_id or uuid.uuid4().hex
+    progress = {
+        "import_id": import_id,
+        "status": "running",
+        "processed": 0,
+        "inserted": 0,
+        "skipped_existing": 0,
+        "failed": 0,
+        "analyzed": 0,
+        "last_client_id": None,
+        "errors": [],
+    }
+    await delete_old_imports(db, BULK_IMPORT_RETENTION_DAYS)
+    await save_import_progress(db, progress)
+    await db.commit()
+
+    chunk: List[BulkJournalEntry] = []
+    buffer = b""
+    line_number = 0
+
+    def parse(line: bytes):
+        nonlocal line_number
+        line_number += 1
+        if not line.strip():
+            return
+        progress["processed"] += 1
+        try:
+            chunk.append(BulkJournalEntry(**json.loads(line)))
+        except (ValueError, TypeError, ValidationError) as e:
+            progress["failed"] += 1
+            if len(progress["errors"]) < MAX_REPORTED_ERRORS:
+                progress["errors"].append({"line": line_number, "error": str(e)[:200]})
+
+    try:
+        async for data in request.stream():
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                parse(line)
+            if len(chunk) >= BULK_IMPORT_CHUNK_SIZE:
+                await _flush(db, chunk, progress)
+                chunk = []
+        parse(buffer)
+        await _flush(db, chunk, progress)
+    except Exception as e:
+        progress["status"] = "failed"
+        progress["errors"].append({"line": line_number, "error": f"import aborted: {e}"[:200]})
+        # The failed chunk's statements are rolled back; only the progress row is written
+        await db.rollback()
+        await save_import_progress(db, progress)
+        await db.commit()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=progress)
+
+    progress["status"] = "completed"
+    await save_import_progress(db, progress)
+    await db.commit()
+    return BulkImportResponse(**progress)
+
+
+@router.get("/entries/bulk/{import_id}", status_code=status.HTTP_200_OK, response_model=BulkImportResponse)
+async def bulk_import_progress(import_id: str, db: AsyncSession = Depends(get_db)):
+    """Progress of a running or finished import, as of its last committed chunk"""
+    progress = await get_import_progress(db, import_id)
+    if progress is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown import id")
+    return BulkImportResponse(**progress)
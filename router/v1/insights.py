@@ -1,83 +1,88 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from collections import defaultdict
+from collections import Counter
 from datetime import datetime, timedelta
 from db.session import get_db
-from db.models import JournalEntry
+from db.crud import get_daily_mood
+from db.rollups import range_start
+from schemas.api_requests import TimeRange
 from schemas.api_responses import InsightsResponse
 
 router = APIRouter(tags=["insights"])
 
+# Longest streak reported, and so the oldest day the streak needs to look at
+MAX_STREAK_DAYS = 30
+
 @router.get("/insights", status_code=status.HTTP_200_OK, response_model=InsightsResponse)
-async def get_insights(user_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(JournalEntry).where(JournalEntry.user_id == user_id).order_by(JournalEntry.timestamp.asc())
-    )
-    entries = result.scalars().all()
+async def get_insights(
+    user_id: str,
+    time_range: TimeRange = Query(TimeRange.all, alias="range"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Mood insights for a time range, answered from the daily_user_mood rollups"""
+    today = datetime.utcnow().date()
+    since = range_start(time_range.value, today)
+    streak_since = today - timedelta(days=MAX_STREAK_DAYS - 1)
+    rows = await get_daily_mood(db, user_id, since=min(since, streak_since) if since else None)
+
+    # Entry streak (days in a row with entries), independent of the range
+    dates = {row.day for row in rows if row.entry_count}
+    streak = 0
+    for i in range(0, MAX_STREAK_DAYS):
+        day = today - timedelta(days=i)
+        if day in dates:
+            streak += 1
+        else:
+            break
 
-    if not entries:
+    days = [row for row in rows if row.entry_count and (since is None or row.day >= since)]
+    if not days:
         return InsightsResponse(
             average_sentiment_score=0.0,
             most_common_mood="none",
             mood_trend="none",
-            entry_streak_days=0,
+            entry_streak_days=streak,
             total_entries=0,
             last_entry_date=None,
             progress_trend=[]
         )
 
     # Calculate average sentiment
-    avg_sentiment = sum(e.sentiment_score for e in entries) / len(entries)
+    total_entries = sum(day.entry_count for day in days)
+    avg_sentiment = sum(day.sentiment_sum for day in days) / total_entries
 
     # Most common mood
-    mood_counts = defaultdict(int)
-    for entry in entries:
-        mood_counts[entry.mood] += 1
+    mood_counts = Counter()
+    for day in days:
+        mood_counts.update(day.mood_counts)
     most_common_mood = max(mood_counts.items(), key=lambda x: x[1])[0]
 
     # Mood trend (simple: compare first and last mood score)
     mood_trend = "stable"
-    if len(entries) >= 2:
-        first = entries[0].sentiment_score
-        last = entries[-1].sentiment_score
+    if total_entries >= 2:
+        first = days[0].first_sentiment
+        last = days[-1].last_sentiment
         if last > first + 0.1:
             mood_trend = "improving"
         elif last < first - 0.1:
             mood_trend = "declining"
 
-    # Entry streak (days in a row with entries)
-    dates = {entry.timestamp.date() for entry in entries}
-    today = datetime.utcnow().date()
-    streak = 0
-    for i in range(0, 30):  # max streak of 30 days
-        day = today - timedelta(days=i)
-        if day in dates:
-            streak += 1
-        else:
-            break
-
     # Progress trend by date
-    daily_scores = defaultdict(list)
-    for entry in entries:
-        if entry.progress_score is not None:
-            day = entry.timestamp.date().isoformat()
-            daily_scores[day].append(entry.progress_score)
-
-    progress_trend = []
-    for day, scores in sorted(daily_scores.items()):
-        avg = sum(scores) / len(scores)
-        progress_trend.append({
-            "date": day,
-            "progress_score": round(avg, 2)
-        })
+    progress_trend = [
+        {
+            "date": day.day.isoformat(),
+            "progress_score": round(day.progress_sum / day.progress_count, 2)
+        }
+        for day in days
+        if day.progress_count
+    ]
 
     return InsightsResponse(
         average_sentiment_score=round(avg_sentiment, 2),
         most_common_mood=most_common_mood,
         mood_trend=mood_trend,
         entry_streak_days=streak,
-        total_entries=len(entries),
-        last_entry_date=entries[-1].timestamp,
+        total_entries=total_entries,
+        last_entry_date=days[-1].last_entry_at,
         progress_trend=progress_trend
     )
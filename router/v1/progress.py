@@ -1,18 +1,34 @@
-from fastapi import APIRouter, Depends, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.session import get_db
-from agents.progress_agent import get_progress_summary
+from agents.progress_agent import get_progress_summary_for_range, get_stored_progress_summary
+from schemas.api_requests import TimeRange
 from schemas.api_responses import EnhancedProgressResponse
 
 router = APIRouter(tags=["progress"])
 
+async def _summary(db: AsyncSession, user_id: str, time_range: Optional[TimeRange]):
+    # Without a range, serve the nightly report (generated live when missing or stale)
+    if time_range is None:
+        return await get_stored_progress_summary(db, user_id)
+    return await get_progress_summary_for_range(db, user_id, time_range.value)
+
 @router.get("/progress/{user_id}", status_code=status.HTTP_200_OK, response_model=EnhancedProgressResponse)
-async def progress(user_id: str, db: AsyncSession = Depends(get_db)):
-    result = await get_progress_summary(db, user_id)
+async def progress(
+    user_id: str,
+    time_range: Optional[TimeRange] = Query(None, alias="range"),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await _summary(db, user_id, time_range)
     return EnhancedProgressResponse(**result)
 
 @router.get("/progress/{user_id}/enhanced", status_code=status.HTTP_200_OK, response_model=EnhancedProgressResponse)
-async def enhanced_progress(user_id: str, db: AsyncSession = Depends(get_db)):
+async def enhanced_progress(
+    user_id: str,
+    time_range: Optional[TimeRange] = Query(None, alias="range"),
+    db: AsyncSession = Depends(get_db),
+):
     """Get enhanced progress analysis with detailed patterns and trends"""
-    result = await get_progress_summary(db, user_id)
+    result = await _summary(db, user_id, time_range)
     return EnhancedProgressResponse(**result)
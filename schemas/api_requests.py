@@ -1,5 +1,35 @@
-from pydantic import BaseModel
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Optional
+from pydantic import BaseModel, field_validator
 
 class JournalEntryRequest(BaseModel):
     user_id: str
     text: str
+
+
+class BulkJournalEntry(BaseModel):
+    """One NDJSON line of a bulk import"""
+    client_id: str
+    user_id: str
+    text: str
+    timestamp: Optional[datetime] = None
+    # Entries that already carry a mood from the source app skip analysis
+    mood: Optional[str] = None
+    sentiment_score: Optional[float] = None
+
+    @field_validator("timestamp")
+    @classmethod
+    def naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # journal_entries.timestamp is a naive UTC column; "...Z" or "+02:00" must not reach it aware
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class TimeRange(str, Enum):
+    """Query ranges served from the daily rollups"""
+    last_7_days = "7d"
+    last_30_days = "30d"
+    last_90_days = "90d"
+    all = "all"
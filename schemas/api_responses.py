@@ -61,3 +61,15 @@ class InsightsResponse(BaseModel):
     total_entries: int
     last_entry_date: Optional[datetime]
     progress_trend: List[Dict[str, Union[str, float]]]
+
+
+class BulkImportResponse(BaseModel):
+    import_id: str
+    status: str
+    processed: int
+    inserted: int
+    skipped_existing: int
+    failed: int
+    analyzed: int
+    last_client_id: Optional[str] = None
+    errors: List[Dict[str, Union[str, int]]] = []
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Derive weekday, sentiment_bucket and trigger_tags for existing journal
+entries.
+
+`alembic upgrade` runs this backfill itself; it is needed when the schema
+was applied from an offline script (`alembic upgrade head --sql`), which
+can't read rows. Safe to rerun: every value is derived from the entry.
+Each batch commits on its own and prints the last id it covered; pass that
+as --after-id to resume after an interruption.
+
+    python scripts/backfill_entry_features.py
+    python scripts/backfill_entry_features.py --after-id 250000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from db.features import backfill_batch
+from db.session import engine
+
+
+async def backfill(batch_size: int, after_id: int):
+    start = time.perf_counter()
+    last_id, batches = after_id, 0
+    while True:
+        async with engine.begin() as conn:
+            batch_last_id = await conn.run_sync(backfill_batch, last_id, batch_size)
+        if batch_last_id is None:
+            break
+        last_id, batches = batch_last_id, batches + 1
+        print(f"📦 Committed batch {batches}, last id {last_id}")
+    await engine.dispose()
+    print(f"✅ Derived features for entries after id {after_id} up to id {last_id} in {batches} batches, {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill derived feature columns on journal entries")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Entries per SELECT and UPDATE")
+    parser.add_argument("--after-id", type=int, default=0, help="Only entries with a higher id")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size, args.after_id))
+
+
+if __name__ == "__main__":
+    main()
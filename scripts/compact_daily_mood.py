@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Rebuild the daily_user_mood rollups from journal_entries.
+
+The rollups are maintained incrementally on insert; this repairs them after
+entries are rescored, edited or deleted outside those write paths. Each user
+is rebuilt in its own transaction.
+
+    python scripts/compact_daily_mood.py
+    python scripts/compact_daily_mood.py --user-id alice
+    python scripts/compact_daily_mood.py --days 7
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from db.crud import rebuild_daily_mood
+from db.session import AsyncSessionLocal
+
+
+async def compact(user_id, since):
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        days = await rebuild_daily_mood(session, user_id=user_id, since=since)
+    scope = f"user {user_id}" if user_id else "all users"
+    window = f"since {since.isoformat()}" if since else "all days"
+    print(f"✅ Rebuilt {days} daily_user_mood rows for {scope}, {window} in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild daily_user_mood rollups from journal entries")
+    parser.add_argument("--user-id", default=None, help="Only rebuild this user's rollups")
+    window = parser.add_mutually_exclusive_group()
+    window.add_argument("--since", type=date.fromisoformat, default=None, help="First day to rebuild (YYYY-MM-DD)")
+    window.add_argument("--days", type=int, default=None, help="Rebuild today and the N-1 days before it")
+    args = parser.parse_args()
+
+    since = args.since
+    if args.days is not None:
+        since = datetime.utcnow().date() - timedelta(days=args.days - 1)
+    asyncio.run(compact(args.user_id, since))
+
+
+if __name__ == "__main__":
+    main()
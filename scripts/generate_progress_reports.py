@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Generate and store progress reports for recently active users.
+
+Meant to run nightly (cron, a Kubernetes CronJob, ...) outside peak hours:
+every user with entries in the last --hours gets a fresh report, at most
+--concurrency at a time, each in its own database session. /v1/progress then
+serves the stored report instead of calling the LLM while the user waits.
+
+    python scripts/generate_progress_reports.py
+    python scripts/generate_progress_reports.py --hours 48 --concurrency 4
+    python scripts/generate_progress_reports.py --user-id alice --fake-llm
+
+    # crontab: 03:15 UTC every night
+    15 3 * * * cd /app && python scripts/generate_progress_reports.py
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+MAX_REPORTED_ERRORS = 10
+
+
+async def generate_reports(args):
+    from agents.progress_agent import generate_progress_report, progress_report_version
+    from agents.registry import registry
+    from db.crud import get_active_user_ids
+    from db.session import AsyncSessionLocal
+
+    if args.fake_llm:
+        from benchmarks.fake_llm import FakeLLMBackend
+        registry.set_agent_factory(FakeLLMBackend(scale=0.01).build_agent)
+
+    if args.user_id:
+        user_ids = args.user_id
+    else:
+        async with AsyncSessionLocal() as session:
+            user_ids = await get_active_user_ids(session, datetime.utcnow() - timedelta(hours=args.hours))
+    print(f"📊 Generating {progress_report_version()} reports for {len(user_ids)} users, {args.concurrency} at a time")
+
+    limit = asyncio.Semaphore(args.concurrency)
+    counts = {"generated": 0, "no_entries": 0, "failed": 0}
+    errors = []
+
+    async def generate(user_id: str):
+        async with limit:
+            try:
+                async with AsyncSessionLocal() as session:
+                    report = await generate_progress_report(session, user_id)
+            except Exception as e:
+                counts["failed"] += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(f"{user_id}: {e}")
+                return
+            counts["generated" if report["summary"] is not None else "no_entries"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(generate(user_id) for user_id in user_ids))
+    print(
+        f"✅ {counts['generated']} generated, {counts['no_entries']} without entries, "
+        f"{counts['failed']} failed in {time.perf_counter() - start:.1f}s"
+    )
+    for error in errors:
+        print(f"❌ {error}")
+    if counts["failed"]:
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate stored progress reports for recently active users")
+    parser.add_argument("--hours", type=float, default=24, help="Users with entries in this many hours (by day)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Reports generated at once")
+    parser.add_argument("--user-id", action="append", default=None, help="Only these users (repeatable)")
+    parser.add_argument("--fake-llm", action="store_true", help="Rehearse against the offline fake backend")
+    asyncio.run(generate_reports(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
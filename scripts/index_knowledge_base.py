@@ -1,32 +1,81 @@
-import numpy as np
+import argparse
 import os
+import shutil
 import sys
-import json
 
 # Add the project root to the path so we can import from agents
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-from agents.rag.embedder import embed_texts
-from agents.rag.loader import load_and_split
+from agents.rag.dedup import DEDUP_REPORT_FILENAME, DEDUP_THRESHOLD
+from agents.rag.ingest import EMBED_BATCH_SIZE, build_index
+from agents.rag.knowledge_index import new_version_name, publish_version, version_dir
+from agents.rag.projection import REDUCTION_METHODS
+from agents.rag.quantized import QUANTIZED_DTYPES
 
 def main():
+    parser = argparse.ArgumentParser(description="Build a new knowledge index version and publish it to the running workers")
+    parser.add_argument("--version", default=None, help="Version name (defaults to the UTC time)")
+    parser.add_argument("--no-publish", action="store_true", help="Build the version without making it live")
+    parser.add_argument("--activate", default=None, metavar="VERSION", help="Only publish an existing version (rollback)")
+    parser.add_argument("--source", action="append", default=None, help="Files or directories of .md/.txt sources (repeatable; defaults to knowledge/)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes splitting files")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Chunks per embedding call")
+    parser.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD,
+                        help="Drop chunks at least this similar to an earlier one before embedding (0 keeps them)")
+    parser.add_argument("--quantize", default=",".join(QUANTIZED_DTYPES),
+                        help="Comma-separated quantized embedding copies to write for RAG_VECTOR_DTYPE ('' for none)")
+    parser.add_argument("--dimensions", type=int, default=0,
+                        help="Store embeddings with this many dimensions instead of the model's full size (numpy backend)")
+    parser.add_argument("--reduction", choices=REDUCTION_METHODS, default="pca",
+                        help="pca: project with a PCA fitted to the corpus; native: ask the model for shorter vectors")
+    args = parser.parse_args()
+    quantize = [dtype for dtype in args.quantize.split(",") if dtype]
+    unknown = set(quantize) - set(QUANTIZED_DTYPES)
+    if unknown:
+        raise SystemExit(f"❌ Unknown --quantize dtype: {', '.join(sorted(unknown))} (choose from {', '.join(QUANTIZED_DTYPES)})")
+
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.abspath(os.path.join(script_dir, '..'))
-    knowledge_path = os.path.join(project_root, 'knowledge', 'mental_health_tips.md')
+    knowledge_path = os.path.join(project_root, 'knowledge')
     embeddings_dir = os.path.join(project_root, 'knowledge', 'embeddings')
-    embeddings_path = os.path.join(embeddings_dir, 'mental_health_embeddings.npy')
-    chunks_path = os.path.join(embeddings_dir, 'mental_health_chunks.json')
+    if args.activate:
+        publish_version(embeddings_dir, args.activate)
+        print(f"Published '{args.activate}'.")
+        return
+    version = args.version or new_version_name()
+    # Every build goes into its own directory; workers serving the previous one are never touched
+    output_dir = version_dir(embeddings_dir, version)
+    if os.path.exists(output_dir):
+        raise SystemExit(f"❌ Knowledge version '{version}' already exists")
 
-    chunks = load_and_split(knowledge_path)
-    embeddings = embed_texts(chunks)
-    
-    os.makedirs(embeddings_dir, exist_ok=True)
-    np.save(embeddings_path, embeddings)
-    with open(chunks_path, 'w') as f:
-        json.dump(chunks, f)
+    # Chunks stream from a process pool into batched embedding calls, the
+    # BM25 index and the version's own Chroma collection
+    try:
+        stats = build_index(
+            args.source or [knowledge_path], output_dir, workers=args.workers, batch_size=args.batch_size,
+            dedup_threshold=args.dedup_threshold, quantize=quantize,
+            reduce_dimensions=args.dimensions, reduction=args.reduction,
+        )
+    except BaseException:
+        # A half-written version must never be published or activated later
+        shutil.rmtree(output_dir, ignore_errors=True)
+        raise
     
-    print(f"Saved {len(embeddings)} embeddings and {len(chunks)} chunks.")
+    print(
+        f"Saved {stats['chunks']} chunks from {stats['files']} files with embeddings and a BM25 index of "
+        f"{stats['lexical_terms']} terms as version '{version}' in {stats['seconds']:.1f}s "
+        f"({stats['embed_seconds']:.1f}s embedding)."
+    )
+    if stats["reduction"]:
+        reduction = stats["reduction"]
+        kept = f", {reduction['explained_variance']:.0%} of the variance kept" if "explained_variance" in reduction else ""
+        print(f"Reduced embeddings to {reduction['dimensions']} dimensions ({reduction['method']}{kept}).")
+    if args.dedup_threshold > 0:
+        print(f"Dropped {stats['duplicates_dropped']} near-duplicate chunks; clusters in {os.path.join(output_dir, DEDUP_REPORT_FILENAME)}")
+    if not args.no_publish:
+        publish_version(embeddings_dir, version)
+        print(f"Published '{version}'; workers pick it up within KNOWLEDGE_RELOAD_INTERVAL seconds.")
 
 if __name__ == "__main__":
     main()
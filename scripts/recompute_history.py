@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Recompute stored mood, sentiment and progress values after a prompt or
+scoring change.
+
+Entry ids are streamed from the database with a server-side cursor and
+handed out in chunks to a pool of worker processes. Each worker runs its
+own event loop, database engine and agent registry, so LLM calls inside a
+chunk run concurrently under the usual registry limits (--concurrency).
+Results are written back with one batched UPDATE per chunk.
+
+Progress is checkpointed per phase as the highest id below which every
+chunk has been committed; rerunning the same command resumes from there.
+
+    python scripts/recompute_history.py --dry-run
+    python scripts/recompute_history.py --phases mood,progress --workers 4 --concurrency 8
+    python scripts/recompute_history.py --user-id alice --restart
+
+Phases:
+    mood      re-analyses every entry with analyze_mood_batch; entries the
+              model returns no valid result for keep their stored mood
+    progress  regenerates progress_summary/progress_score as of each entry's
+              timestamp, for entries that have a stored summary or score
+
+The daily_user_mood rollups are rebuilt for the affected users afterwards.
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import func, or_, select, update
+
+from db.features import sentiment_bucket
+from db.models import JournalEntry
+
+PHASES = ("mood", "progress")
+# Agent called by each phase, and a per-call latency guess when no usage log is available
+PHASE_AGENTS = {"mood": "mood_batch", "progress": "progress"}
+DEFAULT_CALL_SECONDS = {"mood_batch": 2.5, "progress": 1.4}
+DEFAULT_CHECKPOINT = os.path.join(project_root, "recompute_checkpoint.json")
+
+
+class Checkpoint:
+    """Per-phase high-water mark of committed entry ids, persisted as JSON"""
+
+    def __init__(self, path: str, config: Dict, restart: bool = False):
+        self.path = path
+        self.state = {"config": config, "phases": {}}
+        if os.path.exists(path) and not restart:
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get("config") != config:
+                raise SystemExit(
+                    f"❌ {path} was written for {saved.get('config')}; pass --restart to discard it"
+                )
+            self.state = saved
+
+    def phase(self, name: str) -> Dict:
+        return self.state["phases"].setdefault(name, {"last_id": 0, "updated": 0, "completed": False})
+
+    def advance(self, name: str, last_id: int, updated: int):
+        phase = self.phase(name)
+        phase["last_id"] = last_id
+        phase["updated"] += updated
+        self.save()
+
+    def complete(self, name: str):
+        self.phase(name)["completed"] = True
+        self.save()
+
+    def save(self):
+        # Write-then-rename so a crash never leaves a truncated checkpoint
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def phase_filter(phase: str, user_id: Optional[str]):
+    conditions = []
+    if phase == "progress":
+        # Imported entries never had a progress summary; keep it that way
+        conditions.append(or_(JournalEntry.progress_summary.isnot(None), JournalEntry.progress_score.isnot(None)))
+    if user_id:
+        conditions.append(JournalEntry.user_id == user_id)
+    return conditions
+
+
+# --- worker process -------------------------------------------------------
+
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker(fake_llm: bool):
+    """Runs once per worker: one long-lived loop so pooled connections stay usable"""
+    global _worker_loop
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    if fake_llm:
+        from agents.registry import registry
+        from benchmarks.fake_llm import FakeLLMBackend
+        registry.set_agent_factory(FakeLLMBackend(scale=0.01, seed=os.getpid()).build_agent)
+
+
+async def _recompute_mood(ids: List[int]) -> int:
+    from agents.mood_tracker import analyze_mood_batch
+    from db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(
+            select(JournalEntry.id, JournalEntry.text).where(JournalEntry.id.in_(ids))
+        )).all()
+        # The session is released while the LLM calls run
+        await session.rollback()
+
+        # A failed LLM call raises here, before anything is written, so the chunk
+        # fails and the checkpoint stays below it. Entries the model never
+        # answered validly keep their stored values rather than going neutral.
+        results = await analyze_mood_batch([(str(row.id), row.text or "") for row in rows], fallback=False)
+        updates = [
+            {
+                "id": row.id,
+                "mood": results[str(row.id)]["mood"],
+                "sentiment_score": results[str(row.id)]["sentiment_score"],
+                "sentiment_bucket": sentiment_bucket(results[str(row.id)]["sentiment_score"]),
+            }
+            for row in rows
+            if str(row.id) in results
+        ]
+        if updates:
+            await session.execute(update(JournalEntry), updates)
+            await session.commit()
+    return len(updates)
+
+
+async def _recompute_progress(ids: List[int]) -> int:
+    from agents.progress_agent import get_progress_summary
+    from agents.registry import registry
+    from db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(
+            select(JournalEntry.id, JournalEntry.user_id, JournalEntry.timestamp).where(JournalEntry.id.in_(ids))
+        )).all()
+
+    # Bound open sessions to the LLM concurrency, since each one waits on a call
+    limit = asyncio.Semaphore(registry.specs["progress"].max_concurrency)
+
+    async def recompute(row) -> Dict:
+        async with limit:
+            async with AsyncSessionLocal() as session:
+                data = await get_progress_summary(session, row.user_id, before=row.timestamp)
+        return {"id": row.id, "progress_summary": data["summary"], "progress_score": data["score"]}
+
+    updates = await asyncio.gather(*(recompute(row) for row in rows))
+    if updates:
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(JournalEntry), list(updates))
+            await session.commit()
+    return len(updates)
+
+
+def process_chunk(phase: str, ids: List[int]) -> int:
+    """Worker entry point; returns the number of rows updated"""
+    handler = _recompute_mood if phase == "mood" else _recompute_progress
+    return _worker_loop.run_until_complete(handler(ids))
+
+
+# --- coordinator ----------------------------------------------------------
+
+async def count_pending(phase: str, after_id: int, user_id: Optional[str]) -> Dict:
+    from db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(func.count(JournalEntry.id), func.coalesce(func.sum(func.length(JournalEntry.text)), 0))
+            .where(JournalEntry.id > after_id, *phase_filter(phase, user_id))
+        )
+        entries, characters = result.one()
+    return {"entries": entries, "characters": int(characters)}
+
+
+def average_call_seconds(agent: str, usage_log: Optional[str]) -> float:
+    """Mean latency of past calls from an LLM usage JSONL log, else a default guess"""
+    if usage_log and os.path.exists(usage_log):
+        latencies = []
+        with open(usage_log) as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("agent") == agent and not record.get("error"):
+                    latencies.append(record["latency_ms"] / 1000)
+        if latencies:
+            return sum(latencies) / len(latencies)
+    return DEFAULT_CALL_SECONDS[agent]
+
+
+def estimate_calls(phase: str, pending: Dict) -> int:
+    if phase == "progress":
+        return pending["entries"]
+    from agents.mood_tracker import MOOD_BATCH_MAX_ENTRIES, MOOD_BATCH_TOKEN_BUDGET
+    # Same per-entry overhead pack_batches assumes for the id and JSON punctuation
+    tokens = pending["characters"] // 4 + pending["entries"] * 10
+    return max(math.ceil(pending["entries"] / MOOD_BATCH_MAX_ENTRIES), math.ceil(tokens / MOOD_BATCH_TOKEN_BUDGET))
+
+
+async def dry_run(args, checkpoint: Checkpoint):
+    print(f"{'phase':10} {'entries':>9} {'LLM calls':>10} {'s/call':>7} {'est. time':>10}")
+    for phase in args.phases:
+        state = checkpoint.phase(phase)
+        if state["completed"]:
+            print(f"{phase:10} {'done':>9}")
+            continue
+        pending = await count_pending(phase, state["last_id"], args.user_id)
+        calls = estimate_calls(phase, pending)
+        seconds_per_call = average_call_seconds(PHASE_AGENTS[phase], args.usage_log)
+        parallel_calls = args.workers * args.concurrency
+        minutes = calls * seconds_per_call / parallel_calls / 60
+        print(f"{phase:10} {pending['entries']:>9} {calls:>10} {seconds_per_call:>7.2f} {minutes:>8.1f} m")
+    print(f"\nAssuming {args.workers} workers x {args.concurrency} concurrent calls; no writes were made.")
+
+
+async def run_phase(phase: str, args, checkpoint: Checkpoint, executor: ProcessPoolExecutor):
+    from db.session import AsyncSessionLocal
+
+    state = checkpoint.phase(phase)
+    if state["completed"]:
+        print(f"⏭️  {phase}: already completed")
+        return
+    total = (await count_pending(phase, state["last_id"], args.user_id))["entries"]
+    print(f"🔄 {phase}: {total} entries after id {state['last_id']}")
+
+    loop = asyncio.get_running_loop()
+    # Chunks in submission order; the checkpoint only moves past a chunk once
+    # every chunk before it has been committed too.
+    in_flight = deque()
+    done_entries, start = 0, time.perf_counter()
+    max_in_flight = args.workers * 2
+
+    async def drain(block: bool):
+        nonlocal done_entries
+        if block and in_flight:
+            await asyncio.wait([f for _, _, f in in_flight], return_when=asyncio.FIRST_COMPLETED)
+        while in_flight and in_flight[0][2].done():
+            last_id, size, future = in_flight.popleft()
+            updated = future.result()  # re-raises a worker failure
+            checkpoint.advance(phase, last_id, updated)
+            done_entries += size
+            rate = done_entries / (time.perf_counter() - start)
+            print(f"   {phase}: {done_entries}/{total} entries (ids ≤ {last_id}), {rate:.1f}/s")
+
+    query = (
+        select(JournalEntry.id)
+        .where(JournalEntry.id > state["last_id"], *phase_filter(phase, args.user_id))
+        .order_by(JournalEntry.id)
+        .execution_options(yield_per=args.chunk_size)
+    )
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query)
+        async for partition in result.partitions(args.chunk_size):
+            ids = [row.id for row in partition]
+            future = loop.run_in_executor(executor, process_chunk, phase, ids)
+            in_flight.append((ids[-1], len(ids), future))
+            await drain(block=len(in_flight) >= max_in_flight)
+
+    while in_flight:
+        await drain(block=True)
+    checkpoint.complete(phase)
+    print(f"✅ {phase}: {state['updated']} entries recomputed")
+
+
+async def main_async(args):
+    config = {"phases": args.phases, "user_id": args.user_id}
+    checkpoint = Checkpoint(args.checkpoint, config, restart=args.restart)
+
+    if args.dry_run:
+        await dry_run(args, checkpoint)
+        return
+
+    from db.session import engine
+    if engine.dialect.name == "sqlite":
+        # The coordinator keeps a read cursor open for the whole phase; without
+        # WAL that read lock would block every worker's UPDATE.
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+    # Spawned, not forked: a forked worker would share the parent's database
+    # connections and event loop state.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=context, initializer=_init_worker, initargs=(args.fake_llm,)
+    ) as executor:
+        for phase in args.phases:
+            try:
+                await run_phase(phase, args, checkpoint, executor)
+            except Exception as e:
+                last_id = checkpoint.phase(phase)["last_id"]
+                print(f"❌ {phase} failed after id {last_id}: {e}\n   Rerun the same command to resume.")
+                raise SystemExit(1)
+
+    # Rescored sentiment and progress invalidate the daily rollups
+    from db.crud import rebuild_daily_mood
+    from db.session import AsyncSessionLocal
+    async with AsyncSessionLocal() as session:
+        days = await rebuild_daily_mood(session, user_id=args.user_id)
+    print(f"✅ Rebuilt {days} daily_user_mood rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute historical mood, sentiment and progress values")
+    parser.add_argument("--phases", default="mood,progress", help="Comma separated: mood, progress (run in this order)")
+    parser.add_argument("--user-id", default=None, help="Only recompute this user's entries")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Worker processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent LLM calls per worker")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Entries per worker task and per UPDATE")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    parser.add_argument("--dry-run", action="store_true", help="Only estimate LLM calls and duration")
+    parser.add_argument("--usage-log", default=os.getenv("LLM_USAGE_LOG_PATH"),
+                        help="LLM usage JSONL used for per-call latency in --dry-run")
+    parser.add_argument("--fake-llm", action="store_true", help="Rehearse against the offline fake backend")
+    args = parser.parse_args()
+
+    args.phases = [p.strip() for p in args.phases.split(",") if p.strip()]
+    unknown = set(args.phases) - set(PHASES)
+    if unknown:
+        parser.error(f"Unknown phases: {sorted(unknown)}")
+    args.phases.sort(key=PHASES.index)
+
+    # Read by the registry in each spawned worker
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.concurrency)
+    os.environ["LLM_AGENT_CONCURRENCY"] = str(args.concurrency)
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
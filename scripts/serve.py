@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Production server: one pre-forking master and N uvicorn workers.
+
+The master imports the app and preloads everything read-only (the agent
+modules, the knowledge base chunks, the tiktoken encoding) and then forks the
+workers, so those pages are shared copy-on-write instead of being loaded once
+per worker. Nothing that holds a connection or a thread is opened before the
+fork: Chroma clients, database connections and the LLM cache are opened
+lazily in each worker.
+
+The listening socket is bound once by the master and shared. On SIGTERM or
+SIGINT the workers stop accepting, finish in-flight requests (up to
+--graceful-timeout) and exit; a worker that dies is replaced.
+
+    python scripts/serve.py --workers 4
+    WEB_CONCURRENCY=8 python scripts/serve.py --host 0.0.0.0 --port 8000
+
+For development with auto-reload use `python -m main`.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Workers that die this soon after starting count as crashing on boot
+MIN_WORKER_UPTIME = 5.0
+MAX_BOOT_FAILURES = 5
+
+
+def rss_mib() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def preload(args):
+    """Import the app and load the shared read-only state in the master"""
+    start = time.perf_counter()
+    from main import app
+    from agents.context_budget import _get_encoder
+    from agents.rag_response_agent import rag_retriever
+
+    if args.fake_llm:
+        from agents.registry import registry
+        from benchmarks.fake_llm import FakeLLMBackend
+        registry.set_agent_factory(FakeLLMBackend(scale=args.fake_llm_scale).build_agent)
+
+    _get_encoder()
+    chunks = len(rag_retriever.vector_store.chunks) if rag_retriever.vector_store else len(rag_retriever.chunks or [])
+    # Move everything loaded so far out of the collector's reach, so a
+    # collection in a worker doesn't touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+    print(f"📦 Preloaded app and {chunks} knowledge chunks in {time.perf_counter() - start:.1f}s ({rss_mib():.0f} MiB)")
+    return app
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, args):
+    import uvicorn
+
+    # uvicorn installs its own SIGINT/SIGTERM handlers for graceful shutdown
+    for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+    config = uvicorn.Config(
+        app,
+        log_level=args.log_level,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(app, sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(app, sock, args)
+        except BaseException as e:
+            print(f"❌ Worker {os.getpid()} failed: {e}")
+            code = 1
+        finally:
+            sys.stdout.flush()
+            os._exit(code)
+    print(f"🚀 Worker {pid} started")
+    return pid
+
+
+def serve(args):
+    sock = bind_socket(args.host, args.port)
+    app = preload(args)
+    print(f"🌐 Listening on {args.host}:{args.port} with {args.workers} workers")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    workers = {spawn(app, sock, args): time.monotonic() for _ in range(args.workers)}
+    boot_failures = 0
+    while not stopping:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if not pid:
+            time.sleep(0.2)
+            continue
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"⚠️ Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; replacing it")
+        if time.monotonic() - started < MIN_WORKER_UPTIME:
+            boot_failures += 1
+            if boot_failures >= MAX_BOOT_FAILURES:
+                print("❌ Workers keep crashing on startup, shutting down")
+                break
+        workers[spawn(app, sock, args)] = time.monotonic()
+
+    print(f"🛑 Stopping {len(workers)} workers (up to {args.graceful_timeout:.0f}s for in-flight requests)")
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + args.graceful_timeout + 5
+    while workers and time.monotonic() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            workers.pop(pid, None)
+        else:
+            time.sleep(0.1)
+    for pid in workers:
+        print(f"⚠️ Worker {pid} did not stop in time, killing it")
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+    sock.close()
+    print("✅ Server stopped")
+    if boot_failures >= MAX_BOOT_FAILURES:
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-forking production server for the coach API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY, help="Defaults to $WEB_CONCURRENCY or the CPU count")
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT, help="Seconds in-flight requests get on shutdown")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    parser.add_argument("--fake-llm", action="store_true", help="Serve with the offline fake backend (benchmarks)")
+    parser.add_argument("--fake-llm-scale", type=float, default=0.01, help="Fake backend latency multiplier")
+    serve(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,5 @@
-python -m main
+# Production: pre-forking server, $WEB_CONCURRENCY workers. RELOAD=1 for the development server.
+if [ "${RELOAD:-0}" = "1" ]; then
+    exec python -m main
+fi
+exec python scripts/serve.py "$@"
@@ -0,0 +1,100 @@
+"""Scrape /metrics through the app and check the per-stage latency series"""
+
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+WORKDIR = tempfile.mkdtemp(prefix="coach_test_")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{WORKDIR}/test.db")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["LLM_CACHE_ENABLED"] = "0"
+os.environ["KNOWLEDGE_EMBEDDINGS_DIR"] = WORKDIR
+os.environ["KNOWLEDGE_RELOAD_INTERVAL"] = "0"
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from agents.registry import registry  # noqa: E402
+from benchmarks.fake_llm import FakeLLMBackend  # noqa: E402
+from db.models import Base  # noqa: E402
+from db.session import engine  # noqa: E402
+from main import app  # noqa: E402
+from monitoring.metrics import current_intent, stage_latency, track_stage  # noqa: E402
+
+
+def series(text: str, metric: str, stage: str, intent: str):
+    match = re.search(rf'^{metric}{{stage="{stage}",intent="{intent}"}} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else None
+
+
+async def scrape(*messages: str) -> str:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for text in messages:
+            response = await client.post("/v1/chat", json={"user_id": "metrics_user", "text": text})
+            assert response.status_code == 200, response.text
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        return response.text
+
+
+@pytest.fixture(autouse=True)
+def fake_llm():
+    backend = FakeLLMBackend(scale=0.0, intent_for_message=lambda message: "off_topic")
+    registry.set_agent_factory(backend.build_agent)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    stage_latency.reset()
+    yield
+    registry.set_agent_factory(None)
+    stage_latency.reset()
+
+
+def test_metrics_reports_chat_stages_per_intent():
+    text = asyncio.run(scrape("Which laptop should I buy?", "Who won the game last night?"))
+
+    assert "# TYPE coach_stage_latency_seconds histogram" in text
+    for stage in ("intent_detection", "off_topic_reply"):
+        assert series(text, "coach_stage_latency_seconds_count", stage, "off_topic") == 2
+        assert series(text, "coach_stage_latency_seconds_sum", stage, "off_topic") >= 0
+        assert series(text, "coach_stage_latency_errors_total", stage, "off_topic") == 0
+    assert re.search(
+        r'^coach_stage_latency_seconds_bucket\{stage="intent_detection",intent="off_topic",le="\+Inf"\} 2$',
+        text,
+        re.M,
+    )
+
+
+def test_stage_errors_exclude_cancellation():
+    async def record():
+        current_intent.set("small_talk")
+        with pytest.raises(ValueError):
+            with track_stage("probe"):
+                raise ValueError("boom")
+
+        async def cancelled():
+            with track_stage("probe"):
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(cancelled())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(record())
+    text = asyncio.run(scrape())
+
+    assert series(text, "coach_stage_latency_seconds_count", "probe", "small_talk") == 2
+    assert series(text, "coach_stage_latency_errors_total", "probe", "small_talk") == 1